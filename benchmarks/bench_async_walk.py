@@ -0,0 +1,68 @@
+"""
+Walk time on a simulated high-latency mount: every directory listing and every
+stat sleeps --latency-ms first, like a round trip to an SMB/NFS server, and the
+threaded walker (core.walker) is compared with the asyncio one (core.async_walker).
+
+    python -m benchmarks.bench_async_walk --files 5000 --latency-ms 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import core.async_walker as async_walker
+import core.walker as walker
+from benchmarks.tree_gen import add_tree_args, generate_tree, tree_kwargs
+
+
+def slow_list_dir(list_dir, latency):
+    """core.walker.list_dir with one round trip for the listing and one per file stat'ed."""
+    def slow(*args, **kwargs):
+        listing = list_dir(*args, **kwargs)
+        time.sleep(latency * (1 + len(listing[0])))
+        return listing
+    return slow
+
+
+def slow_call(func, latency, per_item=False):
+    """func after one round trip, or one per item of its first argument (a stat batch)."""
+    def slow(*args):
+        time.sleep(latency * (len(args[0]) if per_item else 1))
+        return func(*args)
+    return slow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_tree_args(parser)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--walk-workers", type=int, default=walker.DEFAULT_WALK_WORKERS)
+    parser.add_argument("--async-workers", type=int, default=async_walker.DEFAULT_ASYNC_WORKERS)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+
+    workdir = tempfile.mkdtemp(prefix="dupedoctor-bench-")
+    try:
+        root = os.path.join(workdir, "tree")
+        manifest = generate_tree(root, **tree_kwargs(args))
+        print(f"🌐 {manifest['files']} files in {manifest['dirs']} folders, {args.latency_ms} ms per round trip")
+        walker.list_dir = slow_list_dir(walker.list_dir, latency)
+        started = time.perf_counter()
+        threaded = sum(1 for _ in walker.walk_files(root, workers=args.walk_workers))
+        threaded_seconds = time.perf_counter() - started
+
+        async_walker._list = slow_call(async_walker._list, latency)
+        async_walker._stat_batch = slow_call(async_walker._stat_batch, latency, per_item=True)
+        limits = dict.fromkeys(async_walker.MOUNT_LIMITS, args.async_workers)
+        started = time.perf_counter()
+        found = sum(1 for _ in async_walker.walk_files_async(root, workers=args.async_workers, mount_limits=limits))
+        async_seconds = time.perf_counter() - started
+        print(f"   threads ({args.walk_workers})  {threaded_seconds:8.2f}s  {threaded} files")
+        print(f"   asyncio ({args.async_workers})  {async_seconds:8.2f}s  {found} files  "
+              f"({threaded_seconds / async_seconds:.1f}x)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
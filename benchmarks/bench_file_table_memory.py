@@ -0,0 +1,74 @@
+"""
+Compare the memory used by the old one-dict-per-file scan records with
+core.file_table.FileTable. No files are touched; records are synthetic.
+
+    python -m benchmarks.bench_file_table_memory --files 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import tracemalloc
+from core.file_table import FileTable
+
+ROOT = os.path.join(os.sep, "data", "share", "photos")
+
+
+def synthetic_files(count, files_per_dir=100, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        folder = os.path.join(ROOT, f"year_{i // 100_000}", f"album_{i // files_per_dir}")
+        name = f"IMG_{i:08d}{rng.choice(['', ' - Copy', ' (1)'])}.jpg"
+        yield os.path.join(folder, name), rng.randrange(1, 10_000_000), 1.7e9 + i, 1.6e9 + i, i + 1
+
+
+def build_dicts(count):
+    files_data = []
+    for path, size, mtime, ctime, _ in synthetic_files(count):
+        base_name, ext = os.path.splitext(os.path.basename(path))
+        files_data.append({
+            "path": path,
+            "name": base_name,
+            "ext": ext.lower(),
+            "size": size,
+            "created": ctime,
+            "modified": mtime
+        })
+    return files_data
+
+
+def build_table(count):
+    table = FileTable()
+    for path, size, mtime, ctime, inode in synthetic_files(count):
+        table.append(path, size, mtime, ctime, inode)
+    return table
+
+
+def measure(builder, count):
+    gc.collect()
+    tracemalloc.start()
+    result = builder(count)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"📏 Memory for {args.files:,} file records")
+    results = {}
+    for label, builder in (("dict per file", build_dicts), ("FileTable", build_table)):
+        current, peak = measure(builder, args.files)
+        results[label] = current
+        print(f"   {label:<14} {current / 1_048_576:8.1f} MB retained "
+              f"({current / args.files:6.1f} B/file), peak {peak / 1_048_576:8.1f} MB")
+    ratio = results["dict per file"] / max(results["FileTable"], 1)
+    print(f"   FileTable uses {ratio:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Hashing throughput (GB/s) per read method and digest algorithm on a generated
+corpus of files. Files are read once before timing, so this measures the
+hashing path with a warm page cache, not the disk.
+
+    python -m benchmarks.bench_hashing --files 8 --size-mb 256
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from core.hashing import available_algorithms, hash_file
+
+CASES = [("read", 8192), ("readinto", None), ("file_digest", None), ("mmap", None), ("auto", None)]
+
+
+def make_corpus(folder, files, size_mb, seed=0):
+    rng = random.Random(seed)
+    block = rng.getrandbits(8 * 1024 * 1024).to_bytes(1024 * 1024, "little")  # randbytes needs Python 3.9
+    paths = []
+    for i in range(files):
+        path = os.path.join(folder, f"video_{i}.bin")
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(block)
+                block = block[1:] + block[:1]  # keep blocks distinct without generating new randomness
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=128)
+    parser.add_argument("--algorithms", default=",".join(available_algorithms()))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dupedoctor-bench-") as folder:
+        paths = make_corpus(folder, args.files, args.size_mb)
+        total = args.files * args.size_mb * 1024 * 1024
+        for path in paths:
+            hash_file(path, "sha256", "read")  # warm the page cache
+
+        print(f"⚡ Hashing {args.files} x {args.size_mb} MB")
+        print(f"   {'algorithm':<10} " + " ".join(f"{m + (f'/{c}' if c else ''):>14}" for m, c in CASES))
+        for algorithm in args.algorithms.split(","):
+            cells = []
+            for method, chunk_size in CASES:
+                if method == "file_digest" and algorithm not in ("sha256", "blake2b"):
+                    cells.append(f"{'-':>14}")
+                    continue
+                started = time.perf_counter()
+                for path in paths:
+                    hash_file(path, algorithm, method, chunk_size)
+                elapsed = time.perf_counter() - started
+                cells.append(f"{total / elapsed / 1e9:>9.2f} GB/s")
+            print(f"   {algorithm:<10} " + " ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cluster synthetic 64-bit perceptual hashes with core.perceptual.cluster_hashes
+(multi-index hashing or a BK-tree, plus union-find) and with brute-force
+pairwise comparison, check they find the same groups, and compare run times.
+No images are needed.
+
+    python -m benchmarks.bench_perceptual_index --images 20000 --distance 6
+"""
+import argparse
+import random
+import time
+from core.perceptual import cluster_hashes, popcount
+
+
+def synthetic_hashes(count, copies=3, max_flips=4, seed=0):
+    """Random 'originals' plus a few near copies of each, as re-encoding would produce."""
+    rng = random.Random(seed)
+    hashes = {}
+    while len(hashes) < count:
+        original = rng.getrandbits(64)
+        hashes[f"img_{len(hashes)}.jpg"] = original
+        for _ in range(rng.randrange(copies + 1)):
+            copy = original
+            for bit in rng.sample(range(64), rng.randrange(max_flips + 1)):
+                copy ^= 1 << bit
+            hashes[f"img_{len(hashes)} (1).jpg"] = copy
+    return hashes
+
+
+def brute_force(hashes, max_distance):
+    items = list(hashes)
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(items)):
+        for j in range(i + 1, len(items)):
+            if popcount(hashes[items[i]] ^ hashes[items[j]]) <= max_distance:
+                parent[find(i)] = find(j)
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(find(i), []).append(item)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+METHODS = {
+    "multi-index": lambda hashes, distance: cluster_hashes(hashes, distance, "mih"),
+    "bk-tree": lambda hashes, distance: cluster_hashes(hashes, distance, "bktree"),
+    "brute-force": brute_force,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=5000)
+    parser.add_argument("--distance", type=int, default=6)
+    parser.add_argument("--methods", default=",".join(METHODS),
+                        help="comma-separated; drop brute-force (and bk-tree) for large --images")
+    args = parser.parse_args()
+
+    hashes = synthetic_hashes(args.images)
+    print(f"🖼️ Clustering {len(hashes):,} perceptual hashes within {args.distance} bits")
+    results = {}
+    for method in args.methods.split(","):
+        results[method] = timed(METHODS[method], hashes, args.distance)
+        print(f"   {method:<12} {results[method][1]:8.2f} s  {len(results[method][0]):,} groups", flush=True)
+
+    reference = {frozenset(g) for g in next(iter(results.values()))[0]}
+    slowest = max(seconds for _, seconds in results.values())
+    for method, (groups, seconds) in results.items():
+        same = {frozenset(g) for g in groups} == reference
+        print(f"   {method:<12} {slowest / max(seconds, 1e-9):6.1f}x vs slowest  {'✅' if same else '❌ groups differ'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+End-to-end benchmark: generate a synthetic tree (see benchmarks.tree_gen), then
+time each stage of a scan on it and save the results as JSON.
+
+    python -m benchmarks.run_suite --files 50000
+    python -m benchmarks.run_suite --files 50000 --compare benchmarks/results/<old>.json
+
+Stages:
+  walk  – core.walker.walk_files over the tree
+  stat  – one os.stat per file (what the size/ext pass used to do)
+  group – FileTable + group_rows on name, size and extension
+  hash  – refine_by_content on same-size groups (partial, then full hash)
+  move  – move_files of every duplicate into a quarantine folder in the tree
+
+Each stage records seconds, items/s and peak memory: the process's peak RSS
+after the stage, plus the stage's own peak Python allocations with
+--trace-memory (slower, so off by default). Results are named after the
+current git commit so runs on different commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.tree_gen import add_tree_args, generate_tree, tree_kwargs
+from core.file_table import FileTable
+from core.find_duplicates_hash import refine_by_content
+from core.grouping import group_rows, iter_groups
+from core.hash_service import HashService
+from core.mover import move_files, quarantine_path
+from core.walker import walk_files
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not available
+    resource = None
+
+# === CONFIG ===
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+QUARANTINE_NAME = "_quarantine_bench"
+STAGES = ("walk", "stat", "group", "hash", "move")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_stage(results, name, func, trace_memory=False):
+    """Run func() -> (value, items), record its timing under results[name] and return value."""
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    value, items = func()
+    seconds = time.perf_counter() - started
+    record = {"seconds": round(seconds, 4), "items": items,
+              "items_per_sec": round(items / seconds, 1) if seconds else None,
+              "peak_rss_mb": peak_rss_mb()}
+    if trace_memory:
+        record["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    results[name] = record
+    print(f"⏱️ {name:<6} {seconds:>8.3f}s  {items:>9} items  {record['items_per_sec'] or 0:>12,.0f}/s")
+    return value
+
+
+def run_suite(root, hash_workers=0, trace_memory=False, move=True):
+    """Time every stage on the tree at root and return {stage: record}."""
+    results = {}
+
+    def walk():
+        entries = list(walk_files(root))
+        return entries, len(entries)
+
+    entries = run_stage(results, "walk", walk, trace_memory)
+
+    def stat():
+        for e in entries:
+            os.stat(e.path)
+        return None, len(entries)
+
+    run_stage(results, "stat", stat, trace_memory)
+
+    def group():
+        table = FileTable()
+        table.extend(entries)
+        rows, offsets = group_rows(table, ("name", "size", "ext"))
+        return (table, rows, offsets), len(table)
+
+    table, rows, offsets = run_stage(results, "group", group, trace_memory)
+    results["group"]["groups"] = len(offsets) - 1
+
+    def hash_stage():
+        size_rows, size_offsets = group_rows(table, ("size",))
+        groups = [[table.path(i) for i in g] for g in iter_groups(size_rows, size_offsets)]
+        if hash_workers:
+            with HashService(workers=hash_workers) as service:
+                return refine_by_content(groups, hash_service=service), sum(len(g) for g in groups)
+        return refine_by_content(groups), sum(len(g) for g in groups)
+
+    duplicates = run_stage(results, "hash", hash_stage, trace_memory)
+    results["hash"]["duplicate_groups"] = len(duplicates)
+
+    if move:
+        qdir = os.path.join(root, QUARANTINE_NAME)
+
+        def move_stage():
+            moves = [(p, quarantine_path(p, root, qdir)) for g in duplicates for p in sorted(g, key=len)[1:]]
+            move_files(moves, os.path.join(qdir, "move_journal.ndjson"), root=root)
+            return None, len(moves)
+
+        run_stage(results, "move", move_stage, trace_memory)
+    return results
+
+
+def print_comparison(old, new):
+    print(f"📊 Compared with {old.get('commit')} ({old.get('timestamp')})")
+    for stage in STAGES:
+        before, after = old["stages"].get(stage), new["stages"].get(stage)
+        if not before or not after:
+            continue
+        change = (after["seconds"] - before["seconds"]) / before["seconds"] * 100 if before["seconds"] else 0
+        print(f"   {stage:<6} {before['seconds']:>8.3f}s -> {after['seconds']:>8.3f}s  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_tree_args(parser)
+    parser.add_argument("--tree", help="benchmark an existing tree instead of generating one (skips the move stage)")
+    parser.add_argument("--hash-workers", type=int, default=0, help="hash on a HashService pool (0 = serial)")
+    parser.add_argument("--trace-memory", action="store_true", help="also record each stage's peak Python allocations")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to print the change against")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    record = {"commit": commit, "timestamp": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform()}
+    workdir = None
+    try:
+        if args.tree:
+            root = args.tree
+            record["tree"] = {"root": root}
+        else:
+            workdir = tempfile.mkdtemp(prefix="dupedoctor-bench-")
+            root = os.path.join(workdir, "tree")
+            started = time.perf_counter()
+            manifest = generate_tree(root, **tree_kwargs(args))
+            print(f"🌳 Generated {manifest['files']} files ({manifest['bytes'] / 1e6:.1f} MB, "
+                  f"{manifest['duplicate_groups']} duplicate groups) in {time.perf_counter() - started:.1f}s")
+            record["tree"] = {k: v for k, v in manifest.items() if k not in ("root", "groups")}
+        record["hash_workers"] = args.hash_workers
+        record["stages"] = run_suite(root, args.hash_workers, args.trace_memory, move=not args.tree)
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(record, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), record)
+
+
+if __name__ == "__main__":
+    main()
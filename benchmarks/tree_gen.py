@@ -0,0 +1,138 @@
+"""
+Reproducible synthetic directory trees for benchmarks.
+
+    python -m benchmarks.tree_gen /tmp/bench_tree --files 50000 --dup-ratio 0.3
+
+The same arguments and seed always produce the same tree. A share of the files
+(--dup-ratio) are copies of earlier ones: byte-identical, same extension, and
+named like the copies Windows and browsers make ("name - Copy", "name (1)",
+"name - Copy (2)"), so they also group under core.normalize.normalize_name.
+"""
+import argparse
+import json
+import math
+import os
+import random
+
+# === CONFIG ===
+EXTENSIONS = [".jpg", ".png", ".pdf", ".docx", ".mp4", ".txt", ".zip"]
+COPY_SUFFIXES = [" - Copy", " (1)", " (2)", " - Copy (2)"]
+SIZE_DISTRIBUTIONS = ("lognormal", "uniform", "fixed")
+MAX_FILE_SIZE = 256 * 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+
+
+def file_size(rng, distribution, mean_size):
+    if distribution == "fixed":
+        return mean_size
+    if distribution == "uniform":
+        return rng.randint(0, 2 * mean_size)
+    # Lognormal: mostly small files with a long tail of big ones, like real disks
+    sigma = 1.5
+    return min(MAX_FILE_SIZE, int(rng.lognormvariate(0, sigma) * mean_size / math.exp(sigma ** 2 / 2)))
+
+
+def _directories(root, rng, depth, fanout):
+    dirs = [root]
+    level = [root]
+    for d in range(depth):
+        level = [os.path.join(parent, f"dir_{d}_{i}") for parent in level for i in range(fanout)]
+        dirs.extend(level)
+    rng.shuffle(dirs)
+    return dirs
+
+
+def _write(path, size, seed, block):
+    """Content is determined by seed, so copies are written from the same seed."""
+    rng = random.Random(seed)
+    with open(path, "wb") as f:
+        offset = rng.randrange(len(block))
+        remaining = size
+        # First bytes are unique per seed so equal-size originals still differ
+        header = seed.to_bytes(8, "little")[:remaining]
+        f.write(header)
+        remaining -= len(header)
+        while remaining > 0:
+            piece = block[offset:offset + remaining]
+            f.write(piece)
+            remaining -= len(piece)
+            offset = 0
+
+
+def generate_tree(root, files=10_000, depth=3, fanout=4, size_distribution="lognormal", mean_size=64 * 1024,
+                  dup_ratio=0.2, seed=0):
+    """
+    Create files under root (which must not exist yet) and return a manifest dict:
+    counts, total bytes and the expected duplicate groups (lists of paths).
+    """
+    if size_distribution not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"Unknown size distribution: {size_distribution}")
+    os.makedirs(root)
+    rng = random.Random(seed)
+    # Same bytes as Random.randbytes (Python 3.9+), which is built on getrandbits
+    block = random.Random(seed ^ 0x5EED).getrandbits(8 * BLOCK_SIZE).to_bytes(BLOCK_SIZE, "little")
+    dirs = _directories(root, rng, depth, fanout)
+    for d in dirs:
+        os.makedirs(d, exist_ok=True)
+
+    originals = []   # (stem, ext, size, content_seed, [paths])
+    total_bytes = 0
+    for i in range(files):
+        folder = rng.choice(dirs)
+        if originals and rng.random() < dup_ratio:
+            stem, ext, size, content_seed, paths = rng.choice(originals)
+            name = stem + COPY_SUFFIXES[(len(paths) - 1) % len(COPY_SUFFIXES)] + ext
+            if len(paths) > len(COPY_SUFFIXES):
+                name = f"{stem} ({len(paths)}){ext}"
+        else:
+            stem, ext = f"file_{i:07d}", rng.choice(EXTENSIONS)
+            size, content_seed, paths = file_size(rng, size_distribution, mean_size), i + 1, []
+            originals.append((stem, ext, size, content_seed, paths))
+            name = stem + ext
+        path = os.path.join(folder, name)
+        if os.path.exists(path):  # same copy name landed in the same folder again
+            path = os.path.join(folder, f"{stem} ({i}){ext}")
+        _write(path, size, content_seed, block)
+        paths.append(path)
+        total_bytes += size
+
+    groups = [paths for *_, paths in originals if len(paths) > 1]
+    return {
+        "root": root,
+        "files": files,
+        "dirs": len(dirs),
+        "bytes": total_bytes,
+        "duplicate_groups": len(groups),
+        "duplicate_files": sum(len(g) - 1 for g in groups),
+        "groups": groups,
+        "params": {"files": files, "depth": depth, "fanout": fanout, "size_distribution": size_distribution,
+                   "mean_size": mean_size, "dup_ratio": dup_ratio, "seed": seed},
+    }
+
+
+def add_tree_args(parser):
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--sizes", choices=SIZE_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-size", type=int, default=64 * 1024, help="bytes (default: %(default)s)")
+    parser.add_argument("--dup-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def tree_kwargs(args):
+    return {"files": args.files, "depth": args.depth, "fanout": args.fanout, "size_distribution": args.sizes,
+            "mean_size": args.mean_size, "dup_ratio": args.dup_ratio, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    add_tree_args(parser)
+    args = parser.parse_args()
+    manifest = generate_tree(args.root, **tree_kwargs(args))
+    print(json.dumps({k: v for k, v in manifest.items() if k != "groups"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
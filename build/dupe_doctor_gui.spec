@@ -1,16 +1,25 @@
 # -*- mode: python ; coding: utf-8 -*-
+# pyinstaller build/dupe_doctor_gui.spec  ->  dist/dupe_doctor_gui/dupe_doctor_gui(.exe)
+#
+# One-folder build: a one-file EXE unpacks everything to a temp folder on every
+# start, which is most of its cold-start time. UPX is off for the same reason
+# (compressed DLLs are inflated on each load).
+import os
 
+ROOT = os.path.dirname(SPECPATH)
 
 a = Analysis(
-    ['dupe_doctor_gui.py'],
-    pathex=[],
+    [os.path.join(ROOT, 'dupe_doctor_gui.py')],
+    pathex=[ROOT],
     binaries=[],
     datas=[],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # The GUI never imports the CLI or the test and benchmark code. Standard-library
+    # modules stay in: dependencies may import them lazily at run time.
+    excludes=['core.cli', 'tests', 'benchmarks', 'pytest'],
     noarchive=False,
     optimize=0,
 )
@@ -19,16 +28,13 @@ pyz = PYZ(a.pure)
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='dupe_doctor_gui',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +42,11 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name='dupe_doctor_gui',
+)
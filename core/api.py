@@ -0,0 +1,66 @@
+# api.py
+"""
+DupeDoctor's engine as one import, for scripts and other front ends:
+
+    from core import api
+
+    table, _, _, _ = api.scan_table("/srv/photos")
+    with api.HashService() as hash_service:
+        for rows in api.iter_duplicate_groups(table, ["size", "content"], hash_service=hash_service):
+            print([table.path(i) for i in rows])
+
+Names are imported on first use (PEP 562), so `import core.api` costs next to
+nothing and each name loads only the module it lives in. Nothing under core
+imports tkinter or customtkinter; the GUI lives in the gui package.
+"""
+
+import importlib
+
+# === CONFIG ===
+EXPORTS = {  # name -> module it lives in
+    # walk and scan
+    "walk_files": "core.walker",
+    "walk_files_async": "core.async_walker",
+    "FileTable": "core.file_table",
+    "walk_options": "core.snapshot",
+    "scan_table": "core.snapshot",
+    "iter_duplicate_groups": "core.scan",
+    "ScanCancelled": "core.scan",
+    "ScanResult": "core.scan_result",
+    # hashing
+    "HashService": "core.hash_service",
+    "HashCache": "core.hash_cache",
+    "hash_file": "core.hashing",
+    "refine_by_content": "core.find_duplicates_hash",
+    "find_duplicates_staged": "core.find_duplicates_hash",
+    # acting on duplicates
+    "pick_keeper": "core.keep",
+    "default_quarantine_dir": "core.mover",
+    "journal_path_for": "core.mover",
+    "move_files": "core.mover",
+    "restore_quarantine": "core.restore",
+    "link_group": "core.linker",
+    # indexes and other finders
+    "ReferenceIndex": "core.reference_index",
+    "write_shard": "core.shard_index",
+    "shard_folder": "core.shard_index",
+    "merge_shards": "core.shard_index",
+    "ChunkIndex": "core.chunk_index",
+    "find_similar_images": "core.perceptual",
+    "Metrics": "core.metrics",
+}
+
+__all__ = sorted(EXPORTS)
+
+
+def __getattr__(name):
+    module = EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,308 @@
+# async_walker.py
+"""
+Walker for high-latency file systems (SMB/NFS shares, cloud-backed folders).
+
+walk_files_async() yields the same FileEntry records as core.walker.walk_files,
+but an asyncio loop keeps many directory listings and stat batches in flight on
+a thread pool, so a walk over a slow share waits on many round trips at once
+instead of one after another. Each blocking call gets a timeout and is retried
+with exponential backoff on transient errors; each device (st_dev) has its own
+in-flight limit by kind (see MOUNT_LIMITS and core.hash_service).
+
+Cloud placeholders (OneDrive/Dropbox/iCloud files whose data is not on disk) are
+skipped by default and reported, since anything that reads them later, such as
+hashing, would download them.
+
+asyncio is imported inside the functions that run the loop: importing it costs
+more than the rest of the CLI together, and most commands never walk this way.
+"""
+
+import os
+import time
+import errno
+import queue
+import random
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.hash_service import detect_device_kind
+from core.walker import FileEntry, QUARANTINE_PREFIX, normalize_exts
+
+# === CONFIG ===
+DEFAULT_ASYNC_WORKERS = 64   # directories being worked on at once (and pool threads)
+MOUNT_LIMITS = {             # blocking calls in flight per device, by kind
+    "hdd": 4,
+    "ssd": 32,
+    "network": 64,
+}
+DEFAULT_TIMEOUT = 30.0       # seconds per listing or stat batch
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.25          # seconds before the first retry; doubles each time
+BACKOFF_MAX = 8.0
+STAT_BATCH = 32              # files stat'ed per call on POSIX (Windows gets stats from the listing)
+# Errors worth another try: the server or network hiccuped, not "no such file"
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EINTR, errno.EIO, errno.EBUSY, errno.ETIMEDOUT,
+                    errno.ECONNRESET, errno.ECONNABORTED, errno.EHOSTDOWN, errno.EHOSTUNREACH,
+                    errno.ENETDOWN, errno.ENETRESET, errno.ENETUNREACH}
+
+# Windows attributes of files whose data lives in the cloud
+FILE_ATTRIBUTE_OFFLINE = 0x1000
+FILE_ATTRIBUTE_RECALL_ON_OPEN = 0x40000
+FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS = 0x400000
+PLACEHOLDER_ATTRIBUTES = FILE_ATTRIBUTE_OFFLINE | FILE_ATTRIBUTE_RECALL_ON_OPEN | FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS
+SF_DATALESS = 0x40000000     # macOS st_flags: iCloud "optimized storage" file
+
+
+def is_placeholder(stat):
+    """True for a stat result of a file whose contents are not stored locally."""
+    if getattr(stat, "st_file_attributes", 0) & PLACEHOLDER_ATTRIBUTES:
+        return True
+    return bool(getattr(stat, "st_flags", 0) & SF_DATALESS)
+
+
+def _list(folder, follow_symlinks, skip_quarantine, exclude_dirs, exclude_exts, with_mtime):
+    """
+    One directory listing (runs on a pool thread). Returns (files, subdirs,
+    skipped, errors, mtime_ns): files are DirEntry objects, already stat'ed on
+    Windows where the listing carries the stat data.
+    """
+    files, subdirs, errors, skipped = [], [], [], 0
+    mtime_ns = os.stat(folder).st_mtime_ns if with_mtime else None
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if (skip_quarantine and name.startswith(QUARANTINE_PREFIX)) or \
+                            any(fnmatch.fnmatch(name, pattern) for pattern in exclude_dirs):
+                        skipped += 1
+                        continue
+                    key = None
+                    if follow_symlinks:
+                        st = entry.stat()
+                        key = (st.st_dev, st.st_ino)
+                    subdirs.append((entry.path, key))
+                elif entry.is_file(follow_symlinks=follow_symlinks):
+                    if exclude_exts and os.path.splitext(name)[1][1:].lower() in exclude_exts:
+                        skipped += 1
+                        continue
+                    if os.name == "nt":
+                        entry.stat(follow_symlinks=follow_symlinks)  # cached on the entry, no extra call
+                    files.append(entry)
+            except OSError as e:
+                errors.append((entry.path, e))
+    return files, subdirs, skipped, errors, mtime_ns
+
+
+def _stat_batch(entries, follow_symlinks):
+    """[(entry, stat_result or OSError)] for a batch of DirEntry objects (runs on a pool thread)."""
+    results = []
+    for entry in entries:
+        try:
+            results.append((entry, entry.stat(follow_symlinks=follow_symlinks)))
+        except OSError as e:
+            results.append((entry, e))
+    return results
+
+
+class _AsyncWalk:
+    def __init__(self, emit, stopped, follow_symlinks, skip_quarantine, exclude_dirs, exclude_exts, with_mtime,
+                 workers, timeout, retries, mount_limits, include_placeholders, metrics, report):
+        self.emit = emit
+        self.stopped = stopped
+        self.list_args = (follow_symlinks, skip_quarantine, exclude_dirs, exclude_exts, with_mtime)
+        self.follow_symlinks = follow_symlinks
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.mount_limits = dict(MOUNT_LIMITS, **(mount_limits or {}))
+        self.include_placeholders = include_placeholders
+        self.metrics = metrics
+        self.report = report
+        self.semaphores = {}
+        self.visited = set()
+
+    def _count(self, name, n=1):
+        self.report[name] = self.report.get(name, 0) + n
+        if self.metrics:
+            self.metrics.count(name, n)
+
+    def _semaphore(self, dev):
+        import asyncio
+        sem = self.semaphores.get(dev)
+        if sem is None:
+            kind = "network" if dev is None else detect_device_kind(dev)  # None: the root, not stat'ed yet
+            sem = self.semaphores[dev] = asyncio.Semaphore(self.mount_limits[kind])
+        return sem
+
+    async def call(self, dev, func, *args):
+        """func(*args) on the pool, under dev's limit, with a timeout and retries on transient errors."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            async with self._semaphore(dev):
+                try:
+                    return await asyncio.wait_for(loop.run_in_executor(self.pool, func, *args), self.timeout)
+                except asyncio.TimeoutError:
+                    # The stuck call keeps its thread until the OS gives up; only the wait is abandoned
+                    self._count("timeouts")
+                    error = TimeoutError(errno.ETIMEDOUT, f"No answer within {self.timeout}s")
+                except OSError as e:
+                    if e.errno not in TRANSIENT_ERRNOS:
+                        raise
+                    error = e
+            if attempt == self.retries:
+                raise error
+            self._count("retries")
+            await asyncio.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    async def stat_files(self, dev, entries):
+        import asyncio
+        batches = [entries[i:i + STAT_BATCH] for i in range(0, len(entries), STAT_BATCH)]
+
+        async def one(batch):
+            started = time.perf_counter()
+            try:
+                results = await self.call(dev, _stat_batch, batch, self.follow_symlinks)
+            except OSError as e:
+                return [(entry, e) for entry in batch]
+            if self.metrics:
+                self.metrics.observe("stat_batch", time.perf_counter() - started)
+            return results
+
+        return [r for results in await asyncio.gather(*map(one, batches)) for r in results]
+
+    async def walk_dir(self, folder, dev, dirs):
+        started = time.perf_counter()
+        try:
+            files, subdirs, skipped, errors, mtime_ns = await self.call(dev, _list, folder, *self.list_args)
+        except OSError as e:
+            self._count("errors")
+            self.emit("error", (folder, e))
+            return
+        if self.metrics:
+            self.metrics.observe("list_dir", time.perf_counter() - started)
+            self.metrics.count("dirs")
+        if skipped:
+            self._count("skipped", skipped)
+        for path, key in subdirs:
+            if key is not None:
+                if key in self.visited:
+                    continue
+                self.visited.add(key)
+            dirs.put_nowait((path, dev))  # a subdirectory is assumed to be on its parent's device
+
+        if os.name == "nt":
+            stats = [(entry, entry.stat(follow_symlinks=self.follow_symlinks)) for entry in files]
+        else:
+            stats = await self.stat_files(dev, files)
+        records = []
+        for entry, st in stats:
+            if isinstance(st, OSError):
+                errors.append((entry.path, st))
+            elif not self.include_placeholders and is_placeholder(st):
+                self._count("placeholders")
+                self.emit("placeholder", entry.path)
+            else:
+                records.append(FileEntry(entry.path, entry.name, st.st_size, st.st_mtime, st.st_ctime,
+                                         st.st_ino or entry.inode(), st.st_dev))
+        if errors:
+            self._count("errors", len(errors))
+            for error in errors:
+                self.emit("error", error)
+        if mtime_ns is not None:
+            self.emit("dir", (folder, mtime_ns))
+        if records:
+            if self.metrics:
+                self.metrics.count("files", len(records))
+            self.emit("files", records)
+
+    async def run(self, root):
+        import asyncio
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            try:
+                st = await self.call(None, os.stat, root)
+            except OSError as e:
+                self.emit("error", (root, e))
+                return
+            if self.follow_symlinks:
+                self.visited.add((st.st_dev, st.st_ino))
+            dirs = asyncio.Queue()
+            dirs.put_nowait((root, st.st_dev))
+
+            async def worker():
+                while True:
+                    folder, dev = await dirs.get()
+                    try:
+                        if not self.stopped.is_set():
+                            await self.walk_dir(folder, dev, dirs)
+                    finally:
+                        dirs.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.workers)]
+            await dirs.join()
+            for task in workers:
+                task.cancel()
+        finally:
+            # Queued calls are cancelled along with the tasks awaiting them; only running ones are left to finish
+            self.pool.shutdown(wait=False)
+
+
+def walk_files_async(folder, exclude_exts=None, exclude_dirs=None, follow_symlinks=False, skip_quarantine=True,
+                     workers=DEFAULT_ASYNC_WORKERS, on_error=None, on_dir=None, metrics=None,
+                     timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, mount_limits=None,
+                     include_placeholders=False, on_placeholder=None, report=None):
+    """
+    Yield a FileEntry for every regular file under folder, like core.walker.walk_files
+    (same arguments and callbacks), from an asyncio walk with up to `workers`
+    directories in progress. Also:
+
+    timeout              – seconds before a listing or stat batch counts as failed
+    retries              – further attempts after a timeout or transient error, with backoff
+    mount_limits         – {"hdd"|"ssd"|"network": calls in flight per device} overrides
+    include_placeholders – also yield cloud placeholders instead of skipping them
+    on_placeholder       – called as on_placeholder(path) for every placeholder skipped
+    report               – dict that gets placeholders, retries, timeouts, errors and skipped counts
+
+    Callbacks run in the thread iterating the generator, never in the walk's threads.
+    """
+    report = {} if report is None else report
+    for key in ("placeholders", "retries", "timeouts", "errors", "skipped"):
+        report.setdefault(key, 0)
+    items = queue.Queue()
+    stopped = threading.Event()
+    walk = _AsyncWalk(lambda kind, value: items.put((kind, value)), stopped, follow_symlinks, skip_quarantine,
+                      list(exclude_dirs or ()), normalize_exts(exclude_exts), on_dir is not None, workers,
+                      timeout, retries, mount_limits, include_placeholders, metrics, report)
+
+    def run():
+        import asyncio
+        try:
+            asyncio.run(walk.run(folder))
+        except BaseException as e:  # surfaced in the consuming thread
+            items.put(("crash", e))
+        finally:
+            items.put(("done", None))
+
+    thread = threading.Thread(target=run, name="dupedoctor-async-walk", daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == "files":
+                yield from value
+            elif kind == "error":
+                if on_error:
+                    on_error(*value)
+            elif kind == "dir":
+                on_dir(*value)
+            elif kind == "placeholder":
+                if on_placeholder:
+                    on_placeholder(value)
+            elif kind == "crash":
+                raise value
+            else:
+                return
+    finally:
+        stopped.set()  # a consumer that stops early (cancelled scan) ends the walk too
@@ -0,0 +1,299 @@
+# chunk_index.py
+
+import os
+import sqlite3
+import hashlib
+from collections import Counter
+from core.file_table import np
+
+# === CONFIG ===
+CHUNK_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".dupedoctor", "chunks")
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK_BITS = 16                  # ~64 KiB average chunk past MIN_CHUNK
+MAX_CHUNK = 256 * 1024
+READ_SIZE = 4 * 1024 * 1024
+CHUNK_DIGEST_SIZE = 16               # bytes of BLAKE2b kept per chunk
+MAX_CHUNK_FANOUT = 1000              # chunks seen more often than this (zero pages...) are left out of pair scoring
+COMMIT_EVERY = 200                   # files between commits
+
+MASK64 = (1 << 64) - 1
+# Boundary test on the top bits: those depend on the last 64 bytes, the low bits only on the last few
+CUT_MASK = ((1 << AVG_CHUNK_BITS) - 1) << (64 - AVG_CHUNK_BITS)
+# Gear table for the rolling hash; derived from BLAKE2b so chunk boundaries never change between runs
+GEAR = [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=8).digest(), "big") for i in range(256)]
+GEAR_ARRAY = None if np is None else np.array(GEAR, dtype=np.uint64)
+WINDOW = 64                          # bytes the hash depends on once it has run that long
+HITS_BLOCK = 64 * 1024               # bytes per vectorized boundary search pass
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id       INTEGER PRIMARY KEY,
+    path     TEXT UNIQUE NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    digest BLOB PRIMARY KEY,
+    size   INTEGER NOT NULL,
+    refs   INTEGER NOT NULL          -- occurrences across all files, repeats included
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS occurrences (
+    digest  BLOB NOT NULL,
+    file_id INTEGER NOT NULL,
+    n       INTEGER NOT NULL,        -- times the chunk occurs in that file
+    PRIMARY KEY (digest, file_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences (file_id);
+"""
+
+
+def default_index_path(folder):
+    """Per-folder chunk index under ~/.dupedoctor/chunks."""
+    key = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CHUNK_INDEX_DIR, f"{key}.sqlite3")
+
+
+def _scan(buf, i, h, end):
+    """Run the gear hash from buf[i] with state h; (cut or -1, next i, h)."""
+    gear = GEAR
+    while i < end:
+        h = ((h << 1) + gear[buf[i]]) & MASK64
+        i += 1
+        if not h & CUT_MASK:
+            return i, i, h
+    return -1, i, h
+
+
+def _window_hits(buf, lo):
+    """
+    Positions p >= lo of buf whose 64-byte gear window passes the boundary test,
+    found with NumPy. After 64 steps the rolling hash only depends on the last
+    64 bytes, sum(GEAR[buf[p - k]] << k), which six shift-and-add passes
+    compute for a whole block at once. Blocks of HITS_BLOCK bytes keep those
+    passes in the CPU cache.
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    mask = np.uint64(CUT_MASK)
+    shifted = np.empty(HITS_BLOCK + WINDOW, dtype=np.uint64)
+    found = []
+    for block in range(lo, len(data), HITS_BLOCK):
+        base = max(block - WINDOW + 1, 0)
+        h = GEAR_ARRAY.take(data[base:block + HITS_BLOCK])
+        n, shift = len(h), 1
+        while shift < WINDOW:
+            np.left_shift(h[:-shift], np.uint64(shift), out=shifted[:n - shift])
+            h[shift:] += shifted[:n - shift]
+            shift *= 2
+        hits = np.flatnonzero((h & mask) == 0) + base
+        found.append(hits[hits >= max(block, WINDOW - 1)])
+    return np.concatenate(found) if found else np.zeros(0, dtype=np.intp)
+
+
+def _cut_point(buf, start, end, final, state, hits=None):
+    """
+    End of the chunk starting at buf[start], or -1 when more data is needed to
+    tell. state is [next position, hash] of the scan so far (None for a new
+    chunk) and is updated in place, so a refill resumes where the scan stopped.
+    hits (from _window_hits) replaces the per-byte loop once the hash window
+    is full.
+    """
+    if end - start <= MIN_CHUNK:
+        return end if final else -1
+    if state[0] is None:
+        state[:] = [start + MIN_CHUNK, 0]
+    limit = min(end, start + MAX_CHUNK)
+    i, h = state
+    head = limit if hits is None else min(limit, start + MIN_CHUNK + WINDOW - 1)
+    cut, i, h = _scan(buf, i, h, head)
+    if cut < 0 and hits is not None and i < limit:
+        k = hits.searchsorted(i)
+        if k < len(hits) and hits[k] < limit:
+            cut = int(hits[k]) + 1
+        i = limit
+    state[:] = [i, h]
+    if cut >= 0:
+        return cut
+    if limit == start + MAX_CHUNK or final:
+        return limit
+    return -1
+
+
+def iter_chunks(f):
+    """
+    Yield the content-defined chunks of a binary file object. Boundaries come
+    from a gear rolling hash, so an insert or delete only changes the chunks
+    around it and the rest of the file still matches the original's chunks.
+    With NumPy the boundary search is vectorized (same boundaries either way).
+    """
+    buf = bytearray()
+    hits = None if np is None else np.zeros(0, dtype=np.intp)
+    state = [None, 0]
+    start = 0
+    while True:
+        data = f.read(READ_SIZE)
+        final = not data
+        if start:
+            # Drop the chunks already yielded; the pending chunk's scan state moves with the buffer
+            del buf[:start]
+            if state[0] is not None:
+                state[0] -= start
+            if hits is not None:
+                hits = hits[hits.searchsorted(start):] - start
+            start = 0
+        filled = len(buf)
+        buf += data
+        if hits is not None and data:
+            hits = np.concatenate((hits, _window_hits(buf, filled)))
+        while start < len(buf):
+            cut = _cut_point(buf, start, len(buf), final, state, hits)
+            if cut < 0:
+                break
+            with memoryview(buf) as view:
+                chunk = bytes(view[start:cut])
+            yield chunk
+            start = cut
+            state[0] = None
+        if final:
+            return
+
+
+def chunk_file(path):
+    """List of (digest, size) for path's chunks, or None if it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            return [(hashlib.blake2b(c, digest_size=CHUNK_DIGEST_SIZE).digest(), len(c)) for c in iter_chunks(f)]
+    except OSError:
+        return None
+
+
+class ChunkIndex:
+    """
+    On-disk index of chunk digests per file (SQLite, so it is bounded by disk,
+    not RAM). Files are re-chunked only when their size or mtime changed.
+    """
+
+    def __init__(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._pending = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_current(self, path, stat):
+        row = self.conn.execute("SELECT size, mtime_ns FROM files WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        return row == (stat.st_size, stat.st_mtime_ns)
+
+    def add_file(self, path, stat, chunks):
+        """Record chunks (from chunk_file) for path as of stat, replacing what was there."""
+        key = os.path.abspath(path)
+        self.remove_file(key)
+        cur = self.conn.execute("INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)",
+                                (key, stat.st_size, stat.st_mtime_ns))
+        file_id = cur.lastrowid
+        counts = Counter(d for d, _ in chunks)
+        sizes = dict(chunks)
+        self.conn.executemany(
+            "INSERT INTO chunks (digest, size, refs) VALUES (?, ?, ?) "
+            "ON CONFLICT (digest) DO UPDATE SET refs = refs + excluded.refs",
+            ((d, sizes[d], n) for d, n in counts.items()))
+        self.conn.executemany("INSERT INTO occurrences (digest, file_id, n) VALUES (?, ?, ?)",
+                              ((d, file_id, n) for d, n in counts.items()))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def remove_file(self, path):
+        row = self.conn.execute("SELECT id FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+        if not row:
+            return
+        occurrences = self.conn.execute("SELECT digest, n FROM occurrences WHERE file_id = ?", row).fetchall()
+        self.conn.executemany("UPDATE chunks SET refs = refs - ? WHERE digest = ?",
+                              ((n, d) for d, n in occurrences))
+        self.conn.executemany("DELETE FROM chunks WHERE digest = ? AND refs <= 0",
+                              ((d,) for d, _ in occurrences))
+        self.conn.execute("DELETE FROM occurrences WHERE file_id = ?", row)
+        self.conn.execute("DELETE FROM files WHERE id = ?", row)
+
+    def retain(self, paths):
+        """Drop every file not in paths (e.g. everything the latest walk did not see)."""
+        keep = {os.path.abspath(p) for p in paths}
+        gone = [p for (p,) in self.conn.execute("SELECT path FROM files").fetchall() if p not in keep]
+        for path in gone:
+            self.remove_file(path)
+        self.commit()
+        return len(gone)
+
+    def similar_pairs(self, min_ratio=0.5, min_shared=1, max_fanout=MAX_CHUNK_FANOUT):
+        """
+        Yield file pairs sharing chunks, most shared bytes first, as dicts with
+        a, b, a_size, b_size, shared_bytes and ratio = shared_bytes / smaller size.
+        Each distinct shared chunk counts once. Pairing runs inside SQLite, which
+        spills to temp files, so it does not need the index in memory.
+        """
+        rows = self.conn.execute("""
+            SELECT fa.path, fb.path, fa.size, fb.size, p.shared
+            FROM (SELECT a.file_id AS a_id, b.file_id AS b_id, SUM(c.size) AS shared
+                  FROM chunks c
+                  JOIN occurrences a ON a.digest = c.digest
+                  JOIN occurrences b ON b.digest = c.digest AND b.file_id > a.file_id
+                  WHERE c.refs > 1 AND c.refs <= ?
+                  GROUP BY a.file_id, b.file_id) p
+            JOIN files fa ON fa.id = p.a_id
+            JOIN files fb ON fb.id = p.b_id
+            WHERE p.shared >= ? AND p.shared >= ? * MIN(fa.size, fb.size)
+            ORDER BY p.shared DESC
+        """, (max_fanout, min_shared, min_ratio))
+        for a, b, a_size, b_size, shared in rows:
+            yield {"a": a, "b": b, "a_size": a_size, "b_size": b_size, "shared_bytes": shared,
+                   "ratio": round(shared / max(1, min(a_size, b_size)), 4)}
+
+    def savings(self):
+        """Bytes indexed, bytes left after block-level dedupe, and the difference."""
+        total, unique, count = self.conn.execute(
+            "SELECT COALESCE(SUM(size * refs), 0), COALESCE(SUM(size), 0), COUNT(*) FROM chunks").fetchone()
+        return {"chunks": count, "total_bytes": total, "unique_bytes": unique,
+                "dedupe_savings_bytes": total - unique}
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        if self.conn:
+            self.commit()
+            self.conn.close()
+            self.conn = None
+
+
+def update_index(index, paths, hash_service=None):
+    """
+    Chunk every path the index does not have an up-to-date entry for (on
+    hash_service's pool when given) and drop files that are no longer in paths.
+    Returns the number of files chunked.
+    """
+    stats = {}
+    for path in paths:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            continue
+    index.retain(stats)
+    todo = [p for p, st in stats.items() if not index.is_current(p, st)]
+    results = hash_service.imap(chunk_file, todo) if hash_service else ((p, chunk_file(p)) for p in todo)
+    chunked = 0
+    for path, chunks in results:
+        if chunks is not None:
+            index.add_file(path, stats[path], chunks)
+            chunked += 1
+    index.commit()
+    return chunked
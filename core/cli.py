@@ -0,0 +1,770 @@
+"""
+Headless DupeDoctor scanner.
+
+    python dupedoctor.py scan /srv/photos --match name,size,ext --exclude py,pyc
+    python dupedoctor.py scan /srv/photos --hash full --incremental > groups.ndjson
+    python dupedoctor.py move /srv/photos --dry-run --report plan.csv
+    python dupedoctor.py link /srv/builds --mode reflink --dry-run
+    python dupedoctor.py similar /srv/vm-images --min-ratio 0.8
+    python dupedoctor.py images /srv/photos --algo phash --distance 8
+    python dupedoctor.py scan /srv/photos --hash full --stats stats.json --profile sample
+    python dupedoctor.py shard /archive --out-dir /shared/shards --jobs 16
+    python dupedoctor.py merge /shared/shards > groups.ndjson
+    python dupedoctor.py scan /srv/archive /srv/incoming && \
+        python dupedoctor.py move /srv/archive /srv/incoming --reference /srv/archive
+    python dupedoctor.py check /drops/* --reference /srv/archive --move
+    python dupedoctor.py restore /srv/photos/_quarantine_photos --verify hash --conflict rename
+
+Output is NDJSON, one object per line, flushed as soon as it is known:
+    {"type": "scan", ...}     – the options the scan runs with
+    {"type": "error", ...}    – a path that could not be read
+    {"type": "group", ...}    – one duplicate group (files in scan order)
+    {"type": "summary", ...}  – totals, written last
+move acts on the groups the last scan of the folder saved (no new walk):
+a "move" header, a {"type": "stale", ...} per file changed since that scan,
+one {"type": "file", ...} per duplicate moved (or planned, with --dry-run),
+then the summary. restore takes a quarantine folder, its move journal or a
+legacy dupe_log.csv and writes a "restore" header, one {"type": "file", ...}
+per file with its status ("restored", "missing", "changed", "conflict" or
+"failed"), then the summary. link writes a "link" header, then one {"type": "file", ...}
+per duplicate it linked or skipped, then the summary. similar writes one
+{"type": "pair", ...} per pair of files sharing blocks, and the summary carries
+the estimated block-level dedupe savings.
+--stats FILE writes per-stage timings, rates (files/s, bytes hashed/s), counters
+and stat latency histograms as JSON; --profile adds a cProfile or sampled-stack
+profile of each stage under --profile-dir.
+shard writes one partial index per subtree (see core.shard_index for the
+format), a {"type": "shard", ...} record for each, then the summary; merge
+combines shard files into {"type": "group", ...} records without walking.
+scan and move take several roots; --reference marks folders whose copies are
+always kept. index builds a size + digest index of a reference tree (see
+core.reference_index); check walks new roots and writes a {"type": "match", ...}
+per file already in it, moving those into quarantine with --move.
+--async-walk walks slow network or cloud-backed folders with many listings and
+stats in flight (see core.async_walker); cloud placeholders are skipped, each
+reported as {"type": "placeholder", ...}.
+--max-memory keeps scan and link within a memory budget: the walk stops if the
+file table alone would outgrow it, grouping sorts in the memory left over and
+spills sorted runs to disk (see core.external_group), and scan spools the groups
+found to a temporary file and streams them into the snapshot. Hashing read
+buffers (one per hash worker) come on top. It cannot be combined with
+--incremental, which has to load the previous snapshot whole.
+--partial-algorithm/--full-algorithm (scan, link, shard, index, check) pick the
+digests of the two content tiers; the defaults never depend on what is installed,
+so cached digests stay valid. An index must be checked with the algorithms it
+was built with, or its stored digests are dropped.
+This module must not import tkinter/customtkinter so it starts fast on servers;
+tests/test_import_time.py holds it (and asyncio/multiprocessing) to an import budget.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+import tempfile
+from core.chunk_index import ChunkIndex, default_index_path, update_index
+from core.external_group import parse_memory
+from core.async_walker import DEFAULT_ASYNC_WORKERS, DEFAULT_RETRIES, DEFAULT_TIMEOUT, walk_files_async
+from core.find_duplicates_hash import FULL_ALGORITHM, PARTIAL_ALGORITHM, is_image_file
+from core.hash_cache import DEFAULT_CACHE_PATH, HashCache
+from core.hash_service import DEFAULT_WORKERS, HashService
+from core.hashing import FAST_ALGORITHM, available_algorithms
+from core.keep import DEFAULT_KEEP_POLICY, KEEP_POLICIES, in_reference, keep_key
+from core.linker import LINK_MODES, link_group
+from core.metrics import PROFILE_MODES, Metrics, stage
+from core.mover import default_quarantine_dir, journal_path_for, move_files, roots_quarantine_path
+from core.normalize import DEFAULT_RULE_SETS, RULE_SETS, parse_rule_sets
+from core.perceptual import DEFAULT_MAX_DISTANCE, HASH_KINDS, find_similar_images, require_pillow
+from core.scan import CRITERIA, DEFAULT_CRITERIA, group_buffer_for, iter_duplicate_groups, recheck_groups, \
+    table_budget
+from core.reference_index import DIGEST_LEVELS, ReferenceIndex, default_reference_path
+from core.restore import CONFLICT_MODES, RESTORE_WORKERS, VERIFY_MODES, restore_quarantine
+from core.scan_result import ScanResult
+from core.shard_index import DEFAULT_HASH_LEVEL, HASH_LEVELS, find_shards, merge_shards, shard_folder, shard_name, \
+    write_shard
+from core.snapshot import check_roots, default_snapshot_path, diff_groups, root_list, save_snapshot, scan_table, \
+    walk_options
+from core.walker import DEFAULT_WALK_WORKERS
+
+DEFAULT_EXCLUDE = "py,pyc,ipynb"  # same default as the GUI's exclude box
+DEFAULT_SIMILAR_MIN_SIZE = 1024 * 1024  # smaller files rarely matter for block-level savings
+DEFAULT_PROFILE_DIR = "dupedoctor-profile"
+
+
+def _split(value):
+    return [v.strip().lower() for v in value.split(",") if v.strip()]
+
+
+def _add_walk_args(command, multi_root=False):
+    if multi_root:
+        command.add_argument("folder", nargs="+", help="one or more roots, scanned as one tree")
+    else:
+        command.add_argument("folder")
+    command.add_argument("--exclude", default=DEFAULT_EXCLUDE,
+                         help="comma-separated file extensions to skip (default: %(default)s; '' for none)")
+    command.add_argument("--exclude-dir", action="append", default=[], metavar="PATTERN",
+                         help="directory name or glob not to descend into (repeatable)")
+    command.add_argument("--follow-symlinks", action="store_true")
+    command.add_argument("--include-quarantine", action="store_true", help="also scan _quarantine_* folders")
+    command.add_argument("--walk-workers", type=int,
+                         help=f"folders listed at once (default: {DEFAULT_WALK_WORKERS}, "
+                              f"{DEFAULT_ASYNC_WORKERS} with --async-walk)")
+    command.add_argument("--async-walk", action="store_true",
+                         help="for slow network/cloud mounts: many listings in flight, timeouts and retries")
+    command.add_argument("--io-timeout", type=float, default=DEFAULT_TIMEOUT,
+                         help="with --async-walk: seconds per listing or stat batch (default: %(default)s)")
+    command.add_argument("--io-retries", type=int, default=DEFAULT_RETRIES,
+                         help="with --async-walk: retries after a timeout or transient error (default: %(default)s)")
+    command.add_argument("--include-placeholders", action="store_true",
+                         help="with --async-walk: also scan cloud files not stored locally (reading them downloads them)")
+    command.add_argument("--hash-workers", type=int, default=DEFAULT_WORKERS)
+    command.add_argument("--processes", action="store_true", help="hash on a process pool instead of threads")
+    command.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    command.add_argument("--stats", metavar="FILE", help="write stage timings, counters and histograms as JSON")
+    command.add_argument("--profile", choices=PROFILE_MODES,
+                         help="profile each stage: cprofile = <stage>.prof of the main thread, "
+                              "sample = <stage>.folded stacks of all threads")
+    command.add_argument("--profile-dir", default=DEFAULT_PROFILE_DIR, help="(default: %(default)s)")
+
+
+def _add_cache_args(command):
+    command.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="hash cache file (default: %(default)s)")
+    command.add_argument("--no-cache", action="store_true")
+
+
+def _add_algorithm_args(command):
+    command.add_argument("--partial-algorithm", choices=available_algorithms(), default=PARTIAL_ALGORITHM,
+                         help=f"digest of the first/last 4 KiB, which only rules files out (fastest installed: "
+                              f"{FAST_ALGORITHM}; default: %(default)s)")
+    command.add_argument("--full-algorithm", choices=available_algorithms(), default=FULL_ALGORITHM,
+                         help="whole-file digest, which proves files identical (default: %(default)s)")
+
+
+def _add_keep_args(command):
+    command.add_argument("--keep", choices=KEEP_POLICIES, default=DEFAULT_KEEP_POLICY,
+                         help="which copy of each group stays (default: %(default)s)")
+    command.add_argument("--prefer-dir", action="append", default=[], metavar="FOLDER",
+                         help="with --keep preferred_dir: keep the copy under this folder (repeatable, first wins)")
+    command.add_argument("--reference", action="append", default=[], metavar="FOLDER",
+                         help="reference folder: a copy inside it is always kept and never touched (repeatable)")
+
+
+def _add_memory_args(command):
+    # --group-buffer is the name this flag had for a while
+    command.add_argument("--max-memory", "--group-buffer", dest="max_memory", type=parse_memory, metavar="SIZE",
+                         help="keep the scan within about SIZE (e.g. 512M, 2G): the file table is budgeted, "
+                              "grouping spills sorted runs to disk and groups are spooled to a temporary file "
+                              "(default: no limit)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dupedoctor", description="Find duplicate files without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="scan folders and stream duplicate groups as NDJSON")
+    _add_walk_args(scan, multi_root=True)
+    _add_cache_args(scan)
+    _add_algorithm_args(scan)
+    scan.add_argument("--match", default=",".join(DEFAULT_CRITERIA),
+                      help=f"comma-separated match criteria from: {', '.join(CRITERIA)} (default: %(default)s)")
+    scan.add_argument("--hash", choices=["off", "partial", "full"], default="off",
+                      help="also compare content: partial = first/last 4 KiB, full = whole file")
+    scan.add_argument("--incremental", action="store_true",
+                      help="only re-list folders changed since the last scan's snapshot "
+                           "(files in the groups found are re-stat'ed)")
+    scan.add_argument("--name-rules", default=",".join(DEFAULT_RULE_SETS),
+                      help=f"copy-name rules the name criterion ignores, from: {', '.join(RULE_SETS)} "
+                           "(default: %(default)s)")
+    _add_memory_args(scan)
+    scan.set_defaults(run=run_scan)
+
+    shard = commands.add_parser("shard", help="write a partial index of a folder for a later merge")
+    _add_walk_args(shard)
+    _add_cache_args(shard)
+    _add_algorithm_args(shard)
+    shard.add_argument("--out-dir", required=True, help="directory the shard files are written to (may be shared)")
+    shard.add_argument("--jobs", type=int, default=1,
+                       help="local processes; above 1, one shard per top-level subfolder (no hash cache)")
+    shard.add_argument("--hash", choices=HASH_LEVELS, default=DEFAULT_HASH_LEVEL,
+                       help="digests computed up front: local = only for sizes repeated in the shard, "
+                            "all = partial for every file, full = partial and full for every file "
+                            "(default: %(default)s)")
+    shard.add_argument("--images-only", action="store_true", help="only index image files, like the hash finder")
+    shard.set_defaults(run=run_shard)
+
+    merge = commands.add_parser("merge", help="combine shard files into global duplicate groups")
+    merge.add_argument("shards", nargs="+", help="shard files or directories holding them")
+    _add_cache_args(merge)
+    merge.add_argument("--hash-workers", type=int, default=DEFAULT_WORKERS)
+    merge.add_argument("--no-hash", action="store_true",
+                       help="never read files: leave out those whose digests no shard computed")
+    merge.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    merge.set_defaults(run=run_merge)
+
+    move = commands.add_parser("move", help="move the duplicates found by the last scan into a quarantine folder")
+    move.add_argument("folder", nargs="+", help="the root(s) the scan was run on")
+    move.add_argument("--quarantine", help="quarantine folder (default: <first folder>/_quarantine_<name>)")
+    _add_keep_args(move)
+    move.add_argument("--dry-run", action="store_true", help="list what would be moved, but move nothing")
+    move.add_argument("--report", metavar="CSV", help="also write every group, keeper and destination as CSV")
+    move.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    move.set_defaults(run=run_move)
+
+    restore = commands.add_parser("restore", help="move quarantined files back where they came from")
+    restore.add_argument("journal", help="a quarantine folder, its move journal or a legacy dupe_log.csv")
+    restore.add_argument("--verify", choices=VERIFY_MODES, default="size",
+                         help="check each file against the journal before it goes back: mtime = size and mtime, "
+                              "hash = the digest cached when it was scanned (default: %(default)s)")
+    restore.add_argument("--conflict", choices=CONFLICT_MODES, default="skip",
+                         help="when the original path is taken: skip the file, restore it as "
+                              "'name (restored).ext' or overwrite (default: %(default)s)")
+    restore.add_argument("--workers", type=int, default=RESTORE_WORKERS, help="files restored at once")
+    _add_cache_args(restore)
+    restore.add_argument("-o", "--output", default="-", help="NDJSON output file (default: stdout)")
+    restore.set_defaults(run=run_restore)
+
+    index = commands.add_parser("index", help="build or refresh the size + digest index of a reference folder")
+    _add_walk_args(index)
+    _add_cache_args(index)
+    _add_algorithm_args(index)
+    index.add_argument("--index", help="index file (default: one per folder under ~/.dupedoctor/reference)")
+    index.add_argument("--digests", choices=DIGEST_LEVELS, default="none",
+                       help="hash files now instead of when a checked file first needs them (default: %(default)s)")
+    index.set_defaults(run=run_index)
+
+    check = commands.add_parser("check", help="find files in new folders that already exist in a reference folder")
+    _add_walk_args(check, multi_root=True)
+    _add_cache_args(check)
+    _add_algorithm_args(check)
+    check.add_argument("--reference", required=True, metavar="FOLDER", help="the reference folder")
+    check.add_argument("--index", help="its index file (default: one per folder under ~/.dupedoctor/reference)")
+    check.add_argument("--refresh", action="store_true", help="re-walk the reference folder before checking")
+    check.add_argument("--move", action="store_true", help="move every match into a quarantine folder")
+    check.add_argument("--quarantine", help="quarantine folder (default: <first folder>/_quarantine_<name>)")
+    check.set_defaults(run=run_check)
+
+    link = commands.add_parser("link", help="replace identical files with links to one copy, keeping every path")
+    _add_walk_args(link)
+    _add_cache_args(link)
+    _add_algorithm_args(link)
+    link.add_argument("--mode", choices=LINK_MODES, default="auto",
+                      help="auto = reflink where the file system supports it, else hardlink (default: %(default)s)")
+    link.add_argument("--dry-run", action="store_true", help="verify and report, but change nothing")
+    _add_keep_args(link)
+    _add_memory_args(link)
+    link.set_defaults(run=run_link)
+
+    similar = commands.add_parser("similar", help="find files that share blocks (VM images, archives, logs)")
+    _add_walk_args(similar)
+    similar.add_argument("--min-size", type=int, default=DEFAULT_SIMILAR_MIN_SIZE,
+                         help="only chunk files of at least this many bytes (default: %(default)s)")
+    similar.add_argument("--min-ratio", type=float, default=0.5,
+                         help="report pairs sharing at least this fraction of the smaller file (default: %(default)s)")
+    similar.add_argument("--index", help="chunk index file (default: one per folder under ~/.dupedoctor/chunks)")
+    similar.set_defaults(run=run_similar)
+
+    images = commands.add_parser("images", help="group images that look alike (resized, re-encoded copies)")
+    _add_walk_args(images)
+    _add_cache_args(images)
+    images.add_argument("--algo", choices=HASH_KINDS, default="dhash",
+                        help="perceptual hash: dhash is faster, phash copes better with edits (default: %(default)s)")
+    images.add_argument("--distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                        help="max differing bits (of 64) to still call two images alike (default: %(default)s)")
+    images.set_defaults(run=run_images)
+    return parser
+
+
+def _options(args):
+    return walk_options(exclude_exts=_split(args.exclude), exclude_dirs=args.exclude_dir,
+                        follow_symlinks=args.follow_symlinks, skip_quarantine=not args.include_quarantine)
+
+
+def _walk_kwargs(args, out, report):
+    """scan_table's workers/walker for the walk the command line asked for; report gets --async-walk's counts."""
+    if not args.async_walk:
+        return {"workers": args.walk_workers or DEFAULT_WALK_WORKERS}
+
+    def on_placeholder(path):
+        _emit(out, {"type": "placeholder", "path": path})
+
+    walker = functools.partial(walk_files_async, timeout=args.io_timeout, retries=args.io_retries,
+                               include_placeholders=args.include_placeholders, on_placeholder=on_placeholder,
+                               report=report)
+    return {"workers": args.walk_workers or DEFAULT_ASYNC_WORKERS, "walker": walker}
+
+
+def _open_cache(args):
+    return None if args.no_cache else HashCache(args.cache)
+
+
+def _open_metrics(args):
+    """A Metrics when --stats or --profile asks for one; None keeps the hot paths uninstrumented."""
+    if not args.stats and not args.profile:
+        return None
+    return Metrics(profile=args.profile, profile_dir=args.profile_dir)
+
+
+def _save_stats(args, metrics):
+    if metrics is not None and args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(metrics.snapshot(), f, indent=2)
+
+
+def _emit(out, record):
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def run_scan(args, out):
+    started = time.time()
+    criteria = _split(args.match)
+    unknown = set(criteria) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"unknown match criteria: {', '.join(sorted(unknown))}")
+    name_rules = parse_rule_sets(args.name_rules)
+    if args.max_memory and args.incremental:
+        raise ValueError("--incremental cannot be combined with --max-memory: it loads the whole last snapshot")
+    hash_tier = args.hash if args.hash != "off" else "full"
+    if args.hash != "off" and "content" not in criteria:
+        criteria.append("content")
+    options = _options(args)
+    _emit(out, {"type": "scan", "root": args.folder[0], "roots": args.folder, "criteria": criteria,
+                "hash": hash_tier if "content" in criteria else "off", "options": options,
+                "partial_algorithm": args.partial_algorithm, "full_algorithm": args.full_algorithm,
+                "incremental": args.incremental, "max_memory": args.max_memory})
+
+    errors = 0
+
+    def on_error(path, e):
+        nonlocal errors
+        errors += 1
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    snapshot_path = default_snapshot_path(args.folder)
+    walk_report = {}
+    with stage(metrics, "walk"):
+        # Under --max-memory the last snapshot is not loaded: only an incremental scan or the delta needs it
+        table, dir_mtimes, previous, scan_stats = scan_table(
+            args.folder, None if args.max_memory else snapshot_path, incremental=args.incremental,
+            on_error=on_error, metrics=metrics, max_table_bytes=args.max_memory and table_budget(args.max_memory),
+            **_walk_kwargs(args, out, walk_report), **options)
+    group_buffer = args.max_memory and group_buffer_for(table, args.max_memory)
+
+    cache = _open_cache(args) if "content" in criteria else None
+    stage_totals = {}
+    # Under --max-memory the groups go to a temporary file, read back once for the snapshot
+    groups = tempfile.TemporaryFile("w+", encoding="utf-8") if args.max_memory else []
+    group_count, duplicate_files, reclaimable = 0, 0, 0
+    changed_rows = set()
+    try:
+        with HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service:
+            found = iter_duplicate_groups(table, criteria, hash_tier, cache, hash_service, stage_totals, metrics,
+                                          name_rules, group_buffer, args.partial_algorithm, args.full_algorithm)
+            if scan_stats["incremental"]:
+                # Rows reused from the snapshot may be stale; re-stat the ones about to be reported
+                found = recheck_groups(table, found, criteria, options["follow_symlinks"], scan_stats, changed_rows,
+                                       hash_tier=hash_tier, cache=cache, hash_service=hash_service,
+                                       stage_totals=stage_totals, name_rules=name_rules,
+                                       partial_algorithm=args.partial_algorithm,
+                                       full_algorithm=args.full_algorithm)
+            for rows in found:
+                files = [{"path": table.path(i), "size": table.size[i], "mtime": table.mtime[i],
+                          "ctime": table.ctime[i]} for i in rows]
+                size = sum(f["size"] for f in files)
+                # Everything but the largest copy could be reclaimed
+                group_reclaimable = size - max(f["size"] for f in files)
+                paths = [f["path"] for f in files]
+                if args.max_memory:
+                    groups.write(json.dumps(paths) + "\n")
+                else:
+                    groups.append(paths)
+                group_count += 1
+                duplicate_files += len(files)
+                reclaimable += group_reclaimable
+                _emit(out, {"type": "group", "id": group_count, "count": len(files), "bytes": size,
+                            "reclaimable_bytes": group_reclaimable, "files": files})
+    finally:
+        if cache is not None:
+            cache.close()
+
+    summary = {"type": "summary", "files_scanned": len(table), "groups": group_count,
+               "duplicate_files": duplicate_files, "reclaimable_bytes": reclaimable, "errors": errors,
+               "stages": list(stage_totals.values()), "walk": dict(scan_stats, **walk_report),
+               "elapsed_seconds": round(time.time() - started, 3)}
+    if previous and previous.get("criteria") == criteria:
+        delta = diff_groups(previous["groups"], groups)
+        summary["delta"] = {k: len(v) for k, v in delta.items()}
+    if args.max_memory:
+        with groups:
+            groups.seek(0)
+            save_snapshot(snapshot_path, args.folder, table, dir_mtimes, map(json.loads, groups), options,
+                          criteria=criteria, name_rules=name_rules)
+    else:
+        save_snapshot(snapshot_path, args.folder, table, dir_mtimes, groups, options, criteria=criteria,
+                      name_rules=name_rules, base=previous if scan_stats["incremental"] else None,
+                      changed_dirs={table.dirs[table.dir_id[i]] for i in changed_rows})
+    _emit(out, summary)
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_shard(args, out):
+    started = time.time()
+    options = _options(args)
+    _emit(out, {"type": "shard", "root": args.folder, "out_dir": args.out_dir, "jobs": args.jobs,
+                "hash": args.hash, "partial_algorithm": args.partial_algorithm,
+                "full_algorithm": args.full_algorithm, "options": options})
+    kwargs = dict(hash_level=args.hash, file_filter=is_image_file if args.images_only else None,
+                  partial_algorithm=args.partial_algorithm, full_algorithm=args.full_algorithm, **options)
+    totals = {"shards": 0, "files": 0, "errors": 0}
+
+    def on_shard(path, meta):
+        totals["shards"] += 1
+        totals["files"] += meta["files"]
+        totals["errors"] += meta["errors"]
+        _emit(out, {"type": "shard", "path": path, "root": meta["root"], "files": meta["files"],
+                    "bytes": meta["bytes"], "errors": meta["errors"]})
+
+    metrics = _open_metrics(args)
+    if args.jobs > 1:
+        with stage(metrics, "shard"):
+            shard_folder(args.folder, args.out_dir, args.jobs, args.hash_workers, on_shard, **kwargs)
+    else:
+        def on_error(path, e):
+            _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+        path = os.path.join(args.out_dir, shard_name(args.folder))
+        cache = _open_cache(args)
+        try:
+            with HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service, \
+                    stage(metrics, "shard"):
+                meta = write_shard(path, args.folder, cache=cache, hash_service=hash_service, on_error=on_error,
+                                   metrics=metrics, **_walk_kwargs(args, out, {}), **kwargs)
+        finally:
+            if cache is not None:
+                cache.close()
+        on_shard(path, meta)
+    _emit(out, dict({"type": "summary", "elapsed_seconds": round(time.time() - started, 3)}, **totals))
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_merge(args, out):
+    started = time.time()
+    paths = find_shards(args.shards)
+    _emit(out, {"type": "merge", "shards": paths, "hash_missing": not args.no_hash})
+    stats, reclaimable = {}, 0
+    cache = _open_cache(args)
+    try:
+        with HashService(workers=args.hash_workers) as hash_service:
+            for group in merge_shards(paths, not args.no_hash, cache, hash_service, stats):
+                size = sum(s for _, s, _ in group)
+                reclaimable += size - group[0][1]
+                _emit(out, {"type": "group", "id": stats["groups"], "count": len(group), "bytes": size,
+                            "reclaimable_bytes": size - group[0][1],
+                            "files": [{"path": p, "size": s, "mtime": m} for p, s, m in group]})
+    finally:
+        if cache is not None:
+            cache.close()
+    _emit(out, dict({"type": "summary", "reclaimable_bytes": reclaimable,
+                     "elapsed_seconds": round(time.time() - started, 3)}, **stats))
+    return 0
+
+
+def run_move(args, out):
+    started = time.time()
+    keep_key(args.keep, args.prefer_dir)  # reject a bad policy before anything moves
+    result = ScanResult.load(args.folder)
+    if result is None:
+        raise ValueError(f"no saved scan of {', '.join(args.folder)}; run 'scan' on it first")
+    quarantine_dir = os.path.abspath(args.quarantine or default_quarantine_dir(args.folder[0]))
+    _emit(out, {"type": "move", "root": result.root, "quarantine": quarantine_dir, "dry_run": args.dry_run,
+                "keep": args.keep, "criteria": result.criteria, "groups": len(result)})
+
+    stale = 0
+
+    def on_stale(path):
+        nonlocal stale
+        stale += 1
+        _emit(out, {"type": "stale", "path": path})
+
+    moves = result.plan_moves(quarantine_dir, args.keep, args.prefer_dir, on_stale, args.reference)
+    if args.report:
+        result.write_report(args.report, quarantine_dir, args.keep, args.prefer_dir, args.reference)
+    if args.dry_run:
+        for src, dst in moves:
+            _emit(out, {"type": "file", "src": src, "dst": dst, "status": "planned"})
+        stats = {"planned": len(moves)}
+    else:
+        def on_moved(src, dst, how):
+            _emit(out, {"type": "file", "src": src, "dst": dst, "status": "moved", "how": how})
+
+        def on_error(src, e):
+            _emit(out, {"type": "file", "src": src, "status": "failed", "error": str(e)})
+
+        stats = move_files(moves, journal_path_for(quarantine_dir), on_moved=on_moved, on_error=on_error,
+                           root=result.root)
+    _emit(out, dict({"type": "summary", "stale": stale, "elapsed_seconds": round(time.time() - started, 3)},
+                    **stats))
+    return 0
+
+
+def run_restore(args, out):
+    started = time.time()
+    if not os.path.exists(args.journal):
+        raise ValueError(f"no such quarantine folder or journal: {args.journal}")
+    # The journal and a legacy log both live in the quarantine folder they describe
+    quarantine_dir = os.path.abspath(args.journal if os.path.isdir(args.journal) else os.path.dirname(args.journal))
+    if args.verify == "hash" and args.no_cache:
+        raise ValueError("--verify hash compares against the hash cache; it cannot be used with --no-cache")
+    _emit(out, {"type": "restore", "quarantine": quarantine_dir, "verify": args.verify, "conflict": args.conflict})
+
+    def on_file(src, status, detail):
+        _emit(out, {"type": "file", "src": src, "status": status, "detail": detail})
+
+    cache = _open_cache(args) if args.verify == "hash" else None
+    try:
+        stats = restore_quarantine(quarantine_dir, args.workers, args.verify, args.conflict, cache, on_file=on_file)
+    finally:
+        if cache is not None:
+            cache.close()
+    _emit(out, dict({"type": "summary", "elapsed_seconds": round(time.time() - started, 3)}, **stats))
+    return 0
+
+
+def run_index(args, out):
+    started = time.time()
+    options = _options(args)
+    index_path = args.index or default_reference_path(args.folder)
+    _emit(out, {"type": "index", "root": args.folder, "index": index_path, "digests": args.digests,
+                "partial_algorithm": args.partial_algorithm, "full_algorithm": args.full_algorithm,
+                "options": options})
+
+    def on_error(path, e):
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    cache = _open_cache(args)
+    try:
+        with ReferenceIndex(index_path, partial_algorithm=args.partial_algorithm,
+                            full_algorithm=args.full_algorithm) as index, \
+                HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service, \
+                stage(metrics, "index"):
+            stats = index.update(args.folder, args.digests, cache, hash_service, on_error=on_error, metrics=metrics,
+                                 **_walk_kwargs(args, out, {}), **options)
+    finally:
+        if cache is not None:
+            cache.close()
+    _emit(out, dict({"type": "summary", "elapsed_seconds": round(time.time() - started, 3)}, **stats))
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_check(args, out):
+    started = time.time()
+    options = _options(args)
+    check_roots(root_list([args.reference] + args.folder))
+    index_path = args.index or default_reference_path(args.reference)
+    quarantine_dir = os.path.abspath(args.quarantine or default_quarantine_dir(args.folder[0]))
+    _emit(out, {"type": "check", "roots": args.folder, "reference": args.reference, "index": index_path,
+                "move": args.move, "quarantine": quarantine_dir if args.move else None,
+                "partial_algorithm": args.partial_algorithm, "full_algorithm": args.full_algorithm,
+                "options": options})
+
+    errors = 0
+
+    def on_error(path, e):
+        nonlocal errors
+        errors += 1
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    cache = _open_cache(args)
+    matches = []
+    try:
+        with ReferenceIndex(index_path, partial_algorithm=args.partial_algorithm,
+                            full_algorithm=args.full_algorithm) as index, \
+                HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service:
+            if args.refresh or os.path.abspath(args.reference) not in index.roots():
+                with stage(metrics, "index"):
+                    index.update(args.reference, on_error=on_error, metrics=metrics, **_walk_kwargs(args, out, {}),
+                                 **options)
+            with stage(metrics, "walk"):
+                table, _, _, _ = scan_table(args.folder, on_error=on_error, metrics=metrics,
+                                            **_walk_kwargs(args, out, {}), **options)
+            stats = {}
+            with stage(metrics, "match"):
+                files = ((table.path(i), table.size[i]) for i in range(len(table)))
+                for path, ref, size in index.match(files, cache, hash_service, stats, metrics):
+                    matches.append((path, size))
+                    _emit(out, {"type": "match", "path": path, "reference": ref, "size": size})
+    finally:
+        if cache is not None:
+            cache.close()
+
+    summary = {"type": "summary", "files_scanned": len(table), "errors": errors,
+               "bytes": sum(size for _, size in matches), **stats}
+    if args.move:
+        roots = root_list(args.folder)
+        moves = [(p, roots_quarantine_path(p, roots, quarantine_dir)) for p, _ in matches]
+        with stage(metrics, "move"):
+            summary.update(move_files(moves, journal_path_for(quarantine_dir), root=roots[0], metrics=metrics,
+                                      on_error=on_error))
+    summary["elapsed_seconds"] = round(time.time() - started, 3)
+    _emit(out, summary)
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_link(args, out):
+    started = time.time()
+    options = _options(args)
+    key = keep_key(args.keep, args.prefer_dir, args.reference)
+    _emit(out, {"type": "link", "root": args.folder, "mode": args.mode, "dry_run": args.dry_run,
+                "keep": args.keep, "partial_algorithm": args.partial_algorithm,
+                "full_algorithm": args.full_algorithm, "options": options})
+
+    errors = 0
+
+    def on_error(path, e):
+        nonlocal errors
+        errors += 1
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    with stage(metrics, "walk"):
+        table, _, _, _ = scan_table(args.folder, on_error=on_error, metrics=metrics,
+                                    max_table_bytes=args.max_memory and table_budget(args.max_memory),
+                                    **_walk_kwargs(args, out, {}), **options)
+    group_buffer = args.max_memory and group_buffer_for(table, args.max_memory)
+    counts = {"linked": 0, "skipped": 0, "failed": 0}
+
+    def on_result(keep, path, status, how, reclaimed_bytes):
+        counts[status] += 1
+        if metrics:
+            metrics.count(f"files_{status}")
+            metrics.count("bytes_reclaimed", reclaimed_bytes)
+        _emit(out, {"type": "file", "path": path, "keep": keep, "status": status, "how": how,
+                    "reclaimed_bytes": reclaimed_bytes})
+
+    cache = _open_cache(args)
+    groups, reclaimed = 0, 0
+    try:
+        # One "link" stage for the whole run (the group and hash stages nest inside it)
+        with HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service, \
+                stage(metrics, "link"):
+            # Only whole-file hash matches are linked; link_group still byte-compares each file
+            for rows in iter_duplicate_groups(table, ["size", "content"], "full", cache, hash_service,
+                                              metrics=metrics, group_buffer=group_buffer,
+                                              partial_algorithm=args.partial_algorithm,
+                                              full_algorithm=args.full_algorithm):
+                groups += 1
+                # The keeper is picked from the walk's stat data, not by stat'ing the group again
+                keep = min((table.entry(i) for i in rows), key=key).path
+                # Reference copies other than the keeper are left as they are
+                paths = [p for p in map(table.path, rows) if p == keep or not in_reference(p, args.reference)]
+                reclaimed += link_group(paths, args.mode, args.dry_run, on_result, keep)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    _emit(out, dict({"type": "summary", "files_scanned": len(table), "groups": groups,
+                     "reclaimed_bytes": reclaimed, "errors": errors,
+                     "elapsed_seconds": round(time.time() - started, 3)}, **counts))
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_similar(args, out):
+    started = time.time()
+    options = _options(args)
+    index_path = args.index or default_index_path(args.folder)
+    _emit(out, {"type": "similar", "root": args.folder, "index": index_path, "min_size": args.min_size,
+                "min_ratio": args.min_ratio, "options": options})
+
+    errors = 0
+
+    def on_error(path, e):
+        nonlocal errors
+        errors += 1
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    with stage(metrics, "walk"):
+        table, _, _, _ = scan_table(args.folder, on_error=on_error, metrics=metrics,
+                                    **_walk_kwargs(args, out, {}), **options)
+    paths = [table.path(i) for i in range(len(table)) if table.size[i] >= args.min_size]
+    pairs = 0
+    with ChunkIndex(index_path) as index, \
+            HashService(workers=args.hash_workers, use_processes=args.processes) as hash_service:
+        with stage(metrics, "chunk"):
+            chunked = update_index(index, paths, hash_service)
+        with stage(metrics, "pairs"):
+            for pair in index.similar_pairs(args.min_ratio):
+                pairs += 1
+                _emit(out, dict({"type": "pair"}, **pair))
+        savings = index.savings()
+
+    _emit(out, dict({"type": "summary", "files_scanned": len(table), "files_indexed": len(paths),
+                     "files_chunked": chunked, "pairs": pairs, "errors": errors,
+                     "elapsed_seconds": round(time.time() - started, 3)}, **savings))
+    _save_stats(args, metrics)
+    return 0
+
+
+def run_images(args, out):
+    started = time.time()
+    require_pillow()
+    options = _options(args)
+    _emit(out, {"type": "images", "root": args.folder, "algo": args.algo, "distance": args.distance,
+                "options": options})
+
+    errors = 0
+
+    def on_error(path, e):
+        nonlocal errors
+        errors += 1
+        _emit(out, {"type": "error", "path": path, "error": str(e)})
+
+    metrics = _open_metrics(args)
+    with stage(metrics, "walk"):
+        table, _, _, _ = scan_table(args.folder, on_error=on_error, metrics=metrics,
+                                    **_walk_kwargs(args, out, {}), **options)
+    cache = _open_cache(args)
+    try:
+        # Decoding is CPU bound, so images always hash on a process pool, one worker per core
+        workers = min(args.hash_workers, os.cpu_count() or 1)
+        with HashService(workers=workers, use_processes=True) as hash_service, stage(metrics, "hash"):
+            groups = find_similar_images([table.path(i) for i in range(len(table))], args.algo,
+                                         args.distance, cache, hash_service)
+    finally:
+        if cache is not None:
+            cache.close()
+    for n, paths in enumerate(groups, 1):
+        _emit(out, {"type": "group", "id": n, "count": len(paths), "files": paths})
+
+    _emit(out, {"type": "summary", "files_scanned": len(table), "groups": len(groups),
+                "similar_files": sum(len(g) for g in groups), "errors": errors,
+                "elapsed_seconds": round(time.time() - started, 3)})
+    _save_stats(args, metrics)
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        return args.run(args, out)
+    except (ValueError, ImportError) as e:
+        print(f"dupedoctor: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# external_group.py
+"""
+Grouping under a memory budget, for trees whose grouping does not fit in RAM.
+
+ExternalGrouper collects (key, value) records the way a dict of lists would,
+but once its buffer is estimated to reach max_memory bytes it sorts the buffer
+and writes it to a temporary file as one sorted run. groups() merges the runs
+and whatever is still buffered with heapq.merge and streams each key's values,
+in the order they were added: besides the buffer, only the group being built
+and one chunk per run are in memory at a time.
+
+Keys must compare with each other (tuples of numbers and strings); values only
+have to pickle. Run files are deleted by close().
+"""
+
+import os
+import re
+import sys
+import heapq
+import pickle
+import shutil
+import tempfile
+import itertools
+
+# === CONFIG ===
+RUN_CHUNK = 1024        # records per pickle in a run file, and read back at once per run while merging
+MAX_FANIN = 64          # runs merged at once; beyond that, runs are first merged into bigger ones
+RECORD_OVERHEAD = 120   # bytes per buffered record besides its key and value (tuples, sequence number, list slot)
+MEMORY_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+MEMORY_PATTERN = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", re.IGNORECASE)
+
+
+def parse_memory(value):
+    """Bytes for a size such as 512M, 2G, 1.5GiB or 1048576 (K/M/G/T are powers of 1024)."""
+    match = MEMORY_PATTERN.fullmatch(str(value))
+    size = int(float(match.group(1)) * MEMORY_UNITS[match.group(2).upper()]) if match else 0
+    if size <= 0:
+        raise ValueError(f"Invalid memory size: {value}")
+    return size
+
+
+def _record_size(key, value):
+    """Rough bytes a buffered record takes (sys.getsizeof of its parts)."""
+    size = RECORD_OVERHEAD + sys.getsizeof(value)
+    if isinstance(key, tuple):
+        return size + sys.getsizeof(key) + sum(map(sys.getsizeof, key))
+    return size + sys.getsizeof(key)
+
+
+def _read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+class ExternalGrouper:
+    """
+    Sort-based grouping that spills sorted runs to disk at max_memory bytes.
+    add(key, value) records, then iterate groups(). stats (a dict) gets the
+    records added, runs written and records spilled.
+    """
+
+    def __init__(self, max_memory, tmp_dir=None, stats=None):
+        self.max_memory = max_memory
+        self.tmp_dir = tmp_dir
+        self.stats = {} if stats is None else stats
+        self.stats.update(records=0, runs=0, spilled_records=0)
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.runs = []
+        self._seq = itertools.count()  # ties on a key sort by it, so values keep insertion order
+        self._run_ids = itertools.count()
+        self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, key, value):
+        self.buffer.append((key, next(self._seq), value))
+        self.stats["records"] += 1
+        self.buffered_bytes += _record_size(key, value)
+        if self.buffered_bytes >= self.max_memory:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()  # (key, seq) is unique, so values are never compared
+        self.runs.append(self._write_run(self.buffer))
+        self.stats["runs"] += 1
+        self.stats["spilled_records"] += len(self.buffer)
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def _write_run(self, records):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="dupedoctor-groups-", dir=self.tmp_dir)
+        path = os.path.join(self._dir, f"run{next(self._run_ids)}.pickle")
+        records = iter(records)
+        with open(path, "wb") as f:
+            for chunk in iter(lambda: list(itertools.islice(records, RUN_CHUNK)), []):
+                pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+        return path
+
+    def groups(self, min_size=2):
+        """Yield (key, [values]) in key order for every key added at least min_size times."""
+        while len(self.runs) > MAX_FANIN:
+            batch, self.runs = self.runs[:MAX_FANIN], self.runs[MAX_FANIN:]
+            self.runs.append(self._write_run(heapq.merge(*map(_read_run, batch))))
+            for path in batch:
+                os.remove(path)
+        self.buffer.sort()
+        records = heapq.merge(*map(_read_run, self.runs), self.buffer)
+        for key, group in itertools.groupby(records, key=lambda record: record[0]):
+            values = [value for _, _, value in group]
+            if len(values) >= min_size:
+                yield key, values
+
+    def close(self):
+        self.buffer = []
+        self.runs = []
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+def group_external(records, max_memory, tmp_dir=None, stats=None, min_size=2):
+    """Stream (key, [values]) groups of an iterable of (key, value) records; see ExternalGrouper."""
+    with ExternalGrouper(max_memory, tmp_dir, stats) as grouper:
+        for key, value in records:
+            grouper.add(key, value)
+        yield from grouper.groups(min_size)
@@ -0,0 +1,111 @@
+# file_table.py
+
+import os
+import sys
+from array import array
+from core.walker import FileEntry, walk_files
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the packed arrays work without it
+    np = None
+
+
+class FileTable:
+    """
+    Columnar store of scanned files. Instead of one dict per file, each field is
+    one packed array (4-8 bytes per file) and paths are split into an interned
+    directory id plus a basename, so a folder's path prefix is stored once.
+    Rows are plain integers; use entry(i) or path(i) only for rows you display,
+    log or move.
+    """
+
+    __slots__ = ("dirs", "_dir_ids", "dir_id", "names", "size", "mtime", "ctime", "inode", "dev")
+
+    def __init__(self):
+        self.dirs = []
+        self._dir_ids = {}
+        self.dir_id = array("L")
+        self.names = []
+        self.size = array("q")
+        self.mtime = array("d")
+        self.ctime = array("d")
+        self.inode = array("Q")
+        self.dev = array("Q")
+
+    @classmethod
+    def from_walk(cls, folder, **walk_kwargs):
+        """Build a table from core.walker.walk_files(folder, **walk_kwargs)."""
+        table = cls()
+        table.extend(walk_files(folder, **walk_kwargs))
+        return table
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, path, size, mtime, ctime, inode=0, dev=0):
+        folder, name = os.path.split(path)
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None:
+            dir_id = self._dir_ids[folder] = len(self.dirs)
+            self.dirs.append(folder)
+        self.dir_id.append(dir_id)
+        self.names.append(name)
+        self.size.append(size)
+        self.mtime.append(mtime)
+        self.ctime.append(ctime)
+        self.inode.append(inode)
+        self.dev.append(dev)
+        return len(self.names) - 1
+
+    def extend(self, entries):
+        for e in entries:
+            self.append(e.path, e.size, e.mtime, e.ctime, e.inode, e.dev)
+
+    def path(self, i):
+        return os.path.join(self.dirs[self.dir_id[i]], self.names[i])
+
+    def entry(self, i):
+        """Materialize row i as a walker FileEntry."""
+        return FileEntry(self.path(i), self.names[i], self.size[i], self.mtime[i],
+                         self.ctime[i], self.inode[i], self.dev[i])
+
+    def record(self, i):
+        """Materialize row i as the metadata dict used by the quarantine scripts."""
+        name, ext = os.path.splitext(self.names[i])
+        return {
+            "Full Path": self.path(i),
+            "File Name": name.lower(),
+            "Extension": ext.lower(),
+            "Size": self.size[i],
+            "Date Modified": self.mtime[i],
+            "Date Created": self.ctime[i]
+        }
+
+    def __iter__(self):
+        return (self.entry(i) for i in range(len(self)))
+
+    def column(self, name):
+        """Return a numeric column as a zero-copy NumPy array when NumPy is installed."""
+        values = getattr(self, name)
+        if np is None:
+            return values
+        return np.frombuffer(values, dtype=values.typecode) if len(values) else np.array([], values.typecode)
+
+    def estimated_nbytes(self, sample=1000):
+        """nbytes() without visiting every string: names are sized from the last `sample` rows."""
+        n = len(self)
+        arrays = n * sum(a.itemsize for a in (self.dir_id, self.size, self.mtime, self.ctime, self.inode, self.dev))
+        recent = self.names[-sample:]
+        names = sum(map(sys.getsizeof, recent)) * n // len(recent) if recent else 0
+        # Each folder's path is stored once; sized like the names, from the latest ones
+        dirs = sum(map(sys.getsizeof, self.dirs[-sample:])) * len(self.dirs) // max(len(self.dirs[-sample:]), 1)
+        return (arrays + names + dirs + sys.getsizeof(self.names) + sys.getsizeof(self.dirs)
+                + sys.getsizeof(self._dir_ids))
+
+    def nbytes(self):
+        """Rough in-memory size of the table, strings included."""
+        arrays = sum(a.itemsize * len(a) for a in (self.dir_id, self.size, self.mtime,
+                                                     self.ctime, self.inode, self.dev))
+        strings = sum(sys.getsizeof(s) for s in self.names) + sum(sys.getsizeof(d) for d in self.dirs)
+        return arrays + strings + sys.getsizeof(self.names) + sys.getsizeof(self.dirs)
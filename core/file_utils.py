@@ -1,34 +1,35 @@
-import os
 import csv
 from datetime import datetime
+from core.file_table import FileTable
+from core.normalize import normalize_name  # noqa: F401  (kept importable from here)
 
 # === CONFIG ===
 TARGET_FOLDER = r"C:\Users\Rick_DellXPS\OneDrive\Pictures"
 OUTPUT_FILE = r"C:\Users\Rick_DellXPS\Python\PythonProject\prj_dup_file_check\file_metadata.csv"
+FIELDNAMES = ["Full Path", "File Name", "Size (Bytes)", "Date Created", "Date Modified"]
+
+def get_file_metadata(entry):
+    """Build the report row for one walker FileEntry."""
+    return {
+        "Full Path": entry.path,
+        "File Name": entry.name,
+        "Size (Bytes)": entry.size,
+        "Date Created": datetime.fromtimestamp(entry.ctime),
+        "Date Modified": datetime.fromtimestamp(entry.mtime)
+    }
 
 def collect_metadata(folder):
-    metadata = []
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            try:
-                stat = os.stat(full_path)
-                metadata.append({
-                    "Full Path": full_path,
-                    "File Name": file,
-                    "Size (Bytes)": stat.st_size,
-                    "Date Created": datetime.fromtimestamp(stat.st_ctime),
-                    "Date Modified": datetime.fromtimestamp(stat.st_mtime)
-                })
-            except Exception as e:
-                print(f"Skipped (no access): {full_path} — {e}")
-    return metadata
+    def skipped(path, e):
+        print(f"Skipped (no access): {path} — {e}")
+
+    return FileTable.from_walk(folder, skip_quarantine=False, on_error=skipped)
 
 def write_csv(metadata):
     with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=metadata[0].keys())
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
         writer.writeheader()
-        writer.writerows(metadata)
+        # Rows are built one at a time from the FileTable while writing
+        writer.writerows(get_file_metadata(entry) for entry in metadata)
     print(f"\n✅ Metadata saved to: {OUTPUT_FILE}")
 
 def main():
@@ -1,42 +1,205 @@
 # find_duplicates_hash.py
 
 import os
-import hashlib
+import argparse
+import functools
 from datetime import datetime
+from core.find_duplicates_size_ext import find_duplicates_by_size_and_ext
+from core.hash_cache import HashCache
+from core.hash_service import HashService
+from core.hashing import algorithm_of, hash_edges, hash_file
+from core.snapshot import default_snapshot_path, diff_groups, save_snapshot, scan_table
 
 # === CONFIG ===
 TARGET_FOLDER = r"C:\Users\Rick_DellXPS\OneDrive\Pictures"
-HASH_CHUNK_SIZE = 8192
+PARTIAL_HASH_SIZE = 4096  # bytes hashed from each end of the file in the partial stage
+# Fixed defaults, so cached digests stay valid whether or not xxhash/blake3 get
+# installed; core.hashing.FAST_ALGORITHM is the fast choice for partial digests.
+PARTIAL_ALGORITHM = "sha256"  # partial digests only rule files out
+FULL_ALGORITHM = "sha256"     # full digests prove files identical
 LOG_FILE = r"C:\Users\Rick_DellXPS\Python\PythonProject\prj_dup_file_check\photo_duplicates_log.txt"
 
 # File extensions to include
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heic', '.raw'}
 
-def get_file_hash(path, chunk_size=HASH_CHUNK_SIZE):
-    hasher = hashlib.sha256()
-    try:
-        with open(path, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                hasher.update(chunk)
-    except (PermissionError, OSError):
-        return None
-    return hasher.hexdigest()
+def get_file_hash(path, chunk_size=None, algorithm=FULL_ALGORITHM):
+    """Whole-file digest (see core.hashing.hash_file); chunk_size forces readinto with that buffer."""
+    return hash_file(path, algorithm, method="readinto" if chunk_size else "auto", chunk_size=chunk_size)
+
+def get_partial_hash(path, edge_size=PARTIAL_HASH_SIZE, algorithm=PARTIAL_ALGORITHM):
+    """Hash the first and last edge_size bytes of a file (all of it if it is small)."""
+    return hash_edges(path, edge_size, algorithm)
 
 def is_image_file(file_path):
     return os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
 
-def find_duplicates_by_hash(folder):
-    hash_map = {}
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            if not is_image_file(full_path):
+def compute_digests(paths, compute, kind, edge_size=None, cache=None, hash_service=None, algorithm=None,
+                    metrics=None, read_size=None):
+    """
+    Return {path: digest} for readable paths, using the cache and worker pool when given.
+    Cached digests made with another algorithm than `algorithm` are recomputed.
+    With metrics, counts cache hits, files hashed, hash errors and (via
+    read_size(path)) bytes hashed.
+    """
+    digests, stats, todo = {}, {}, []
+    for path in paths:
+        if cache is not None:
+            digest, stat = cache.lookup(path, kind, edge_size)
+            if stat is None:
+                continue
+            if digest and (algorithm is None or algorithm_of(digest) == algorithm):
+                digests[path] = digest
+                if metrics:
+                    metrics.count("cache_hits")
                 continue
-            file_hash = get_file_hash(full_path)
-            print(f"Scanning: {full_path}")
-            if file_hash:
-                hash_map.setdefault(file_hash, []).append(full_path)
-    return [paths for paths in hash_map.values() if len(paths) > 1]
+            stats[path] = stat
+        todo.append(path)
+
+    results = hash_service.imap(compute, todo) if hash_service else ((p, compute(p)) for p in todo)
+    for path, digest in results:
+        if metrics:
+            if digest:
+                metrics.count("files_hashed")
+                metrics.count("bytes_hashed", read_size(path) if read_size else 0)
+            else:
+                metrics.count("hash_errors")
+        if digest:
+            digests[path] = digest
+            if cache is not None:
+                cache.store(path, kind, digest, stats[path], edge_size)
+    return digests
+
+def split_by_digest(groups, digests):
+    """Split each candidate group by digest, dropping unreadable files and singletons."""
+    refined = []
+    for group in groups:
+        by_digest = {}
+        for path in group:
+            digest = digests.get(path)
+            if digest:
+                by_digest.setdefault(digest, []).append(path)
+        refined.extend(paths for paths in by_digest.values() if len(paths) > 1)
+    return refined
+
+def _group_size(group):
+    try:
+        return os.lstat(group[0]).st_size
+    except OSError:
+        return 0
+
+def _stage(name, files_in, groups_out, bytes_read):
+    files_out = sum(len(g) for g in groups_out)
+    return {
+        "stage": name,
+        "candidates": files_in,
+        "removed": files_in - files_out,
+        "remaining": files_out,
+        "bytes_read": bytes_read,
+    }
+
+def refine_by_content(groups, stage_stats=None, edge_size=PARTIAL_HASH_SIZE, cache=None, hash_service=None,
+                      full=True, partial_algorithm=PARTIAL_ALGORITHM, full_algorithm=FULL_ALGORITHM, metrics=None):
+    """
+    Split groups of same-size files into groups of byte-identical files: first by
+    a partial hash of both ends, then by a full hash (SHA-256 by default) where the
+    partial hashes still collide. Pass a HashCache to reuse digests and a
+    HashService to hash on a worker pool. full=False stops after the partial hash
+    (likely, not proven, duplicates). metrics (a core.metrics.Metrics) gets the
+    hashing counters.
+    """
+    groups = [g for g in groups if len(g) > 1]
+    files_in = sum(len(g) for g in groups)
+    sizes = [_group_size(g) for g in groups]
+    partial_read = sum(min(s, 2 * edge_size) * len(g) for g, s in zip(groups, sizes))
+    size_of = {p: s for g, s in zip(groups, sizes) for p in g} if metrics else {}
+    partial_hash = functools.partial(get_partial_hash, edge_size=edge_size, algorithm=partial_algorithm)
+    digests = compute_digests([p for g in groups for p in g], partial_hash, "partial",
+                              edge_size, cache, hash_service, partial_algorithm,
+                              metrics, lambda p: min(size_of[p], 2 * edge_size))
+    partial_groups = split_by_digest(groups, digests)
+    partial_stage = _stage("partial", files_in, partial_groups, partial_read)
+    if not full:
+        if stage_stats is not None:
+            stage_stats.append(partial_stage)
+        return partial_groups
+
+    # Files no larger than both edges were hashed completely in the partial stage
+    duplicates, large, full_read = [], [], 0
+    for group in partial_groups:
+        size = _group_size(group)
+        if size <= 2 * edge_size:
+            duplicates.append(group)
+        else:
+            large.append(group)
+            full_read += size * len(group)
+    full_hash = functools.partial(get_file_hash, algorithm=full_algorithm)
+    digests = compute_digests([p for g in large for p in g], full_hash, "full",
+                              cache=cache, hash_service=hash_service, algorithm=full_algorithm,
+                              metrics=metrics, read_size=size_of.get)
+    duplicates.extend(split_by_digest(large, digests))
+    full_stage = _stage("full", sum(len(g) for g in partial_groups), duplicates, full_read)
+
+    if stage_stats is not None:
+        stage_stats.extend([partial_stage, full_stage])
+    return duplicates
+
+def find_duplicates_staged(folder, file_filter=None, match_ext=False, stage_stats=None,
+                           edge_size=PARTIAL_HASH_SIZE, cache=None, hash_service=None, entries=None,
+                           group_buffer=None):
+    """
+    Find byte-identical files in three stages, each one only looking at what the
+    previous stage could not rule out:
+      1. size    – group by size (no file contents read)
+      2. partial – hash the first/last edge_size bytes of same-size files
+      3. full    – full hash of files whose partial hashes still collide
+    If stage_stats is a list, one dict per stage is appended to it.
+    Pass a core.hash_cache.HashCache to reuse digests of files unchanged since the
+    last run, and a core.hash_service.HashService to hash on a worker pool.
+    entries (e.g. a FileTable from an incremental rescan) replaces walking folder.
+    group_buffer (bytes) caps the size grouping's sort buffer, which spills to disk beyond it.
+    Returns a list of lists of duplicate file paths.
+    """
+    walk_stats = {}
+    size_groups = find_duplicates_by_size_and_ext(folder, match_ext=match_ext, file_filter=file_filter,
+                                                  stats=walk_stats, entries=entries, group_buffer=group_buffer)
+    size_stage = _stage("size", walk_stats.get("files", 0), size_groups, 0)
+    size_stage["bytes_skipped"] = walk_stats.get("bytes", 0) - sum(_group_size(g) * len(g) for g in size_groups)
+
+    content_stats = []
+    duplicates = refine_by_content(size_groups, content_stats, edge_size, cache, hash_service)
+    if stage_stats is not None:
+        stage_stats.append(size_stage)
+        stage_stats.extend(content_stats)
+    return duplicates
+
+def print_stage_report(stage_stats):
+    for stage in stage_stats:
+        print(f"🔎 {stage['stage']:<8} {stage['candidates']:>8} candidate(s), "
+              f"{stage['removed']:>8} removed, {stage['remaining']:>8} left, "
+              f"{round(stage['bytes_read'] / 1_048_576, 2)} MB read")
+        if "bytes_skipped" in stage:
+            print(f"   ↳ {round(stage['bytes_skipped'] / 1_048_576, 2)} MB never read (unique sizes)")
+
+def find_duplicates_by_hash(folder, stage_stats=None, cache=None, hash_service=None):
+    return find_duplicates_staged(folder, file_filter=is_image_file, stage_stats=stage_stats,
+                                  cache=cache, hash_service=hash_service)
+
+def find_duplicates_by_hash_incremental(folder, snapshot_path=None, stage_stats=None, cache=None,
+                                        hash_service=None):
+    """
+    Like find_duplicates_by_hash, but re-lists only directories that changed since
+    the snapshot saved by the previous run, then saves a new snapshot.
+    Returns (duplicates, delta) with delta from core.snapshot.diff_groups.
+    """
+    snapshot_path = snapshot_path or default_snapshot_path(folder, "hash")
+    table, dir_mtimes, previous, scan_stats = scan_table(folder, snapshot_path, incremental=True)
+    print(f"♻️ Re-listed {scan_stats['dirs_relisted']} of {len(dir_mtimes)} folder(s)")
+    duplicates = find_duplicates_staged(folder, file_filter=is_image_file, stage_stats=stage_stats,
+                                        cache=cache, hash_service=hash_service, entries=table)
+    delta = diff_groups(previous["groups"] if previous else [], duplicates)
+    save_snapshot(snapshot_path, folder, table, dir_mtimes, duplicates, criteria=["content"],
+                  base=previous if scan_stats["incremental"] else None)
+    return duplicates, delta
 
 def log_duplicates(duplicates):
     with open(LOG_FILE, "w", encoding="utf-8") as log:
@@ -51,8 +214,26 @@ def log_duplicates(duplicates):
     print(f"\n📄 Log saved to: {LOG_FILE}")
 
 def main():
-    print(f"Scanning for duplicate images in: {TARGET_FOLDER}\n")
-    duplicates = find_duplicates(TARGET_FOLDER)
+    parser = argparse.ArgumentParser(description="Find duplicate images by content hash.")
+    parser.add_argument("folder", nargs="?", default=TARGET_FOLDER)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-list folders changed since the last run's snapshot")
+    args = parser.parse_args()
+
+    print(f"Scanning for duplicate images in: {args.folder}\n")
+    stage_stats = []
+    with HashCache() as cache, HashService() as hash_service:
+        cache.prune_missing(args.folder)
+        if args.incremental:
+            duplicates, delta = find_duplicates_by_hash_incremental(
+                args.folder, stage_stats=stage_stats, cache=cache, hash_service=hash_service)
+            print(f"➕ {len(delta['added'])} new, ➖ {len(delta['removed'])} removed, "
+                  f"🔁 {len(delta['changed'])} changed group(s) since the last scan")
+        else:
+            duplicates = find_duplicates_by_hash(args.folder, stage_stats=stage_stats,
+                                                 cache=cache, hash_service=hash_service)
+        print(f"💾 Hash cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    print_stage_report(stage_stats)
     print(f"\nFound {len(duplicates)} duplicate group(s).")
 
     log_duplicates(duplicates)
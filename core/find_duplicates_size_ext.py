@@ -1,21 +1,54 @@
 import os
 from collections import defaultdict
+from core.external_group import group_external
+from core.walker import walk_files
 
-def find_duplicates_by_size_and_ext(folder):
+def iter_duplicates_by_size_and_ext(folder, match_ext=True, file_filter=None, stats=None, entries=None,
+                                    group_buffer=None):
     """
-    Group files by (size, extension) tuple using os.lstat to avoid OneDrive downloads.
-    Returns a list of lists of duplicate file paths.
+    Yield lists of duplicate file paths grouped by (size, extension) tuple, from
+    the scandir walk (no per-file os.stat). Arguments as for
+    find_duplicates_by_size_and_ext; stats is updated once the walk is done.
+    With group_buffer, each group is yielded as soon as the merge of the sorted
+    runs completes it, so the groups found are never all held at once.
     """
-    grouped = defaultdict(list)
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            try:
-                stat = os.lstat(full_path)  # ✅ This avoids triggering cloud-only downloads
-                size = stat.st_size
-                ext = os.path.splitext(file)[1].lower()
-                grouped[(size, ext)].append(full_path)
-            except Exception:
+    def records():
+        file_count = 0
+        total_bytes = 0
+        # Sizes come from the directory listing, which avoids triggering cloud-only downloads
+        for entry in walk_files(folder) if entries is None else entries:
+            if file_filter and not file_filter(entry.path):
                 continue
+            ext = os.path.splitext(entry.name)[1].lower() if match_ext else ""
+            file_count += 1
+            total_bytes += entry.size
+            yield (entry.size, ext), entry.path
+        if stats is not None:
+            stats["files"] = stats.get("files", 0) + file_count
+            stats["bytes"] = stats.get("bytes", 0) + total_bytes
+
+    if group_buffer:
+        for _, paths in group_external(records(), group_buffer):
+            yield paths
+        return
+    grouped = defaultdict(list)
+    for key, path in records():
+        grouped[key].append(path)
+    for group in grouped.values():
+        if len(group) > 1:
+            yield group
 
-    return [group for group in grouped.values() if len(group) > 1]
+
+def find_duplicates_by_size_and_ext(folder, match_ext=True, file_filter=None, stats=None, entries=None,
+                                    group_buffer=None):
+    """
+    Group files by (size, extension) tuple from the scandir walk (no per-file os.stat).
+    Set match_ext=False to group by size alone; file_filter(path) can skip files.
+    If a stats dict is passed, the number of files and bytes seen is added to it.
+    entries (FileEntry records, e.g. a FileTable) are grouped instead of walking folder.
+    group_buffer (bytes) caps the grouping's sort buffer: beyond it, sorted runs spill
+    to disk (core.external_group) and groups come in (size, ext) order. The returned
+    list still holds every group; iter_duplicates_by_size_and_ext streams them.
+    Returns a list of lists of duplicate file paths.
+    """
+    return list(iter_duplicates_by_size_and_ext(folder, match_ext, file_filter, stats, entries, group_buffer))
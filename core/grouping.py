@@ -0,0 +1,118 @@
+# grouping.py
+
+import os
+from array import array
+from core.normalize import normalize_name
+from core.file_table import np
+from core.external_group import group_external
+
+# Criteria understood by group_rows, in the order the GUI lists them
+CRITERIA = ("name", "size", "ext", "created", "modified")
+
+
+def _interned(values):
+    """Map each distinct value to a small integer id, returned as a packed column."""
+    ids = {}
+    column = array("q")
+    for value in values:
+        column.append(ids.setdefault(value, len(ids)))
+    return column
+
+
+def key_values(table, criterion, name_key=normalize_name):
+    """
+    Return the values of table a match criterion compares, one per row. Names
+    and extensions come as strings (generated on the fly); name_key turns a
+    file's stem into the string that has to match (normalize_name by default).
+    """
+    if criterion == "name":
+        return (name_key(os.path.splitext(n)[0]) for n in table.names)
+    if criterion == "ext":
+        return (os.path.splitext(n)[1].lower() for n in table.names)
+    if criterion == "size":
+        return table.size
+    if criterion == "created":
+        return table.ctime
+    if criterion == "modified":
+        return table.mtime
+    raise ValueError(f"Unknown match criterion: {criterion}")
+
+
+def key_column(table, criterion, name_key=normalize_name):
+    """Return one numeric column of table for a match criterion; names and extensions are interned to ids."""
+    values = key_values(table, criterion, name_key)
+    return _interned(values) if criterion in ("name", "ext") else values
+
+
+def _group_rows_numpy(columns, n):
+    columns = [np.frombuffer(c, dtype=c.typecode) for c in columns]
+    order = np.lexsort(columns[::-1])  # lexsort's primary key is the last one
+    changed = np.zeros(n - 1, dtype=bool)
+    for c in columns:
+        sorted_c = c[order]
+        changed |= sorted_c[1:] != sorted_c[:-1]
+    starts = np.concatenate(([0], np.flatnonzero(changed) + 1))
+    lengths = np.diff(np.concatenate((starts, [n])))
+    keep = lengths > 1
+    keep_rows = np.repeat(keep, lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths[keep])))
+    return array("q", order[keep_rows].astype("q").tobytes()), array("q", offsets.astype("q").tobytes())
+
+
+def _group_rows_python(columns, n):
+    # Successive stable sorts, least significant column first, give a
+    # lexicographic order without building a key tuple per row
+    order = list(range(n))
+    for c in reversed(columns):
+        order.sort(key=c.__getitem__)
+
+    rows, offsets = array("q"), array("q", [0])
+    start = 0
+    for j in range(1, n + 1):
+        if j < n:
+            a, b = order[j - 1], order[j]
+            if all(c[a] == c[b] for c in columns):
+                continue
+        if j - start > 1:
+            rows.extend(order[start:j])
+            offsets.append(len(rows))
+        start = j
+    return rows, offsets
+
+
+def _group_rows_external(table, criteria, name_key, group_buffer, stats):
+    keys = zip(*(key_values(table, c, name_key) for c in criteria))
+    rows, offsets = array("q"), array("q", [0])
+    for _, members in group_external(zip(keys, range(len(table))), group_buffer, stats=stats):
+        rows.extend(members)
+        offsets.append(len(rows))
+    return rows, offsets
+
+
+def group_rows(table, criteria, name_key=normalize_name, group_buffer=None, stats=None):
+    """
+    Group the rows of a FileTable that match on every criterion in criteria.
+
+    Returns (rows, offsets): group g is rows[offsets[g]:offsets[g + 1]], and only
+    groups with at least two files are kept. Rows inside a group stay in scan
+    order. Uses NumPy's lexsort when NumPy is installed. With group_buffer
+    (bytes), rows are grouped by core.external_group instead, whose sort buffer
+    spills to disk past that size rather than holding a sort order and interned
+    names for every row; stats then gets its record and run counts. The table
+    and the returned groups are still in memory.
+    """
+    n = len(table)
+    if n < 2 or not criteria:
+        return array("q"), array("q", [0])
+    if group_buffer:
+        return _group_rows_external(table, criteria, name_key, group_buffer, stats)
+    columns = [key_column(table, c, name_key) for c in criteria]
+    if np is not None:
+        return _group_rows_numpy(columns, n)
+    return _group_rows_python(columns, n)
+
+
+def iter_groups(rows, offsets):
+    """Yield each group from group_rows as a slice of row ids."""
+    for g in range(len(offsets) - 1):
+        yield rows[offsets[g]:offsets[g + 1]]
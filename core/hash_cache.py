@@ -0,0 +1,165 @@
+# hash_cache.py
+
+import os
+import sqlite3
+import time
+
+# === CONFIG ===
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".dupedoctor", "hash_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 5_000_000
+COMMIT_EVERY = 1000
+DIGEST_KINDS = ("partial", "full", "dhash", "phash")  # dhash/phash: perceptual image hashes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    inode        INTEGER NOT NULL,
+    partial_edge INTEGER,
+    partial      TEXT,
+    full         TEXT,
+    dhash        TEXT,
+    phash        TEXT,
+    last_used    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used);
+"""
+
+
+class HashCache:
+    """
+    On-disk cache of digests (see DIGEST_KINDS) keyed by path and validated against
+    the file's current (size, mtime_ns, inode). Stale rows are overwritten on the next
+    lookup, deleted files can be pruned, and the table is capped with LRU eviction.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Caches created before the perceptual hash columns existed
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}
+        for kind in DIGEST_KINDS:
+            if kind not in columns:
+                self.conn.execute(f"ALTER TABLE files ADD COLUMN {kind} TEXT")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write(self, sql, params):
+        self.conn.execute(sql, params)
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.commit()
+
+    def lookup(self, path, kind, edge_size=None):
+        """
+        Return (digest, stat) for path. digest is None when the cache has no
+        valid entry of that kind; stat is None when the file can't be stat'ed.
+        """
+        if kind not in DIGEST_KINDS:
+            raise ValueError(f"Unknown digest kind: {kind}")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+
+        key = os.path.abspath(path)
+        row = self.conn.execute(
+            f"SELECT size, mtime_ns, inode, partial_edge, {kind} FROM files WHERE path = ?",
+            (key,)).fetchone()
+        if not row or row[:3] != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self.misses += 1
+            return None, stat
+
+        cached = row[4] if kind != "partial" or row[3] == edge_size else None
+        if not cached:
+            self.misses += 1
+            return None, stat
+        self.hits += 1
+        self._write("UPDATE files SET last_used = ? WHERE path = ?", (time.time(), key))
+        return cached, stat
+
+    def store(self, path, kind, digest, stat, edge_size=None):
+        """Remember digest for path as of stat (the os.stat result returned by lookup)."""
+        key = os.path.abspath(path)
+        now = time.time()
+        row = self.conn.execute("SELECT size, mtime_ns, inode FROM files WHERE path = ?", (key,)).fetchone()
+        if row != (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            self._write(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, stat.st_ino, now))
+        if kind == "partial":
+            self._write("UPDATE files SET partial_edge = ?, partial = ?, last_used = ? WHERE path = ?",
+                        (edge_size, digest, now, key))
+        else:
+            self._write(f"UPDATE files SET {kind} = ?, last_used = ? WHERE path = ?", (digest, now, key))
+
+    def recorded(self, path):
+        """Return the row stored for path as (size, mtime_ns, inode, full), whether or not it still exists."""
+        return self.conn.execute("SELECT size, mtime_ns, inode, full FROM files WHERE path = ?",
+                                 (os.path.abspath(path),)).fetchone()
+
+    def get_digest(self, path, kind, compute, edge_size=None):
+        """
+        Return the cached digest of that kind for path, calling compute(path)
+        and storing the result when the cache has no valid entry.
+        """
+        digest, stat = self.lookup(path, kind, edge_size)
+        if digest or stat is None:
+            return digest
+        digest = compute(path)
+        if digest is not None:
+            self.store(path, kind, digest, stat, edge_size)
+        return digest
+
+    def prune_missing(self, root=None):
+        """Delete rows whose path no longer exists (optionally only under root)."""
+        if root:
+            prefix = os.path.join(os.path.abspath(root), "")
+            rows = self.conn.execute("SELECT path FROM files WHERE substr(path, 1, ?) = ?",
+                                     (len(prefix), prefix))
+        else:
+            rows = self.conn.execute("SELECT path FROM files")
+        missing = [(p,) for (p,) in rows.fetchall() if not os.path.lexists(p)]
+        self.conn.executemany("DELETE FROM files WHERE path = ?", missing)
+        self.commit()
+        return len(missing)
+
+    def evict(self, max_entries=None):
+        """Drop the least recently used rows until at most max_entries remain."""
+        max_entries = self.max_entries if max_entries is None else max_entries
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()
+        excess = count - max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM files WHERE path IN (SELECT path FROM files ORDER BY last_used LIMIT ?)",
+                (excess,))
+            self.commit()
+        return max(excess, 0)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def commit(self):
+        self.conn.commit()
+        self._pending = 0
+
+    def close(self):
+        if self.conn:
+            self.evict()
+            self.commit()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,130 @@
+# hash_service.py
+
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# === CONFIG ===
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# How many files may be hashed at once on one device
+DEVICE_LIMITS = {
+    "hdd": 2,       # spinning disks: keep the head from seeking back and forth
+    "ssd": 16,
+    "network": 32,  # NFS/SMB/cloud mounts: latency bound, deep queues help
+}
+
+
+def detect_device_kind(dev):
+    """Best-effort guess of "hdd", "ssd" or "network" for an st_dev number."""
+    if not hasattr(os, "major"):
+        return "ssd"  # Windows: no /sys to ask
+    major, minor = os.major(dev), os.minor(dev)
+    if major == 0:
+        return "network"  # anonymous devices: NFS, SMB, FUSE, tmpfs...
+    for sys_path in (f"/sys/dev/block/{major}:{minor}/queue/rotational",
+                     f"/sys/dev/block/{major}:{minor}/../queue/rotational"):
+        try:
+            with open(sys_path) as f:
+                return "hdd" if f.read().strip() == "1" else "ssd"
+        except OSError:
+            continue
+    return "ssd"
+
+
+class HashService:
+    """
+    Hash a stream of paths on a worker pool. Threads are the default: hashlib
+    releases the GIL while digesting large buffers, so threads already use
+    several cores. use_processes=True switches to a process pool for CPU-heavy
+    digests. Each device gets its own in-flight limit (see DEVICE_LIMITS) so a
+    spinning disk is not thrashed while SSDs and network mounts stay busy.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, use_processes=False, device_limits=None):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.device_limits = dict(DEVICE_LIMITS, **(device_limits or {}))
+        self._dir_devices = {}
+        self._kinds = {}
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # Imported here: it pulls in multiprocessing, which thread-only runs never need
+                from concurrent.futures import ProcessPoolExecutor as pool
+            else:
+                pool = ThreadPoolExecutor
+            self._executor = pool(max_workers=self.workers)
+        return self._executor
+
+    def _device_of(self, path):
+        folder = os.path.dirname(path)
+        dev = self._dir_devices.get(folder)
+        if dev is None:
+            try:
+                dev = os.stat(folder or ".").st_dev
+            except OSError:
+                dev = -1
+            self._dir_devices[folder] = dev
+        return dev
+
+    def _limit(self, dev):
+        if dev not in self._kinds:
+            self._kinds[dev] = "ssd" if dev == -1 else detect_device_kind(dev)
+        return max(1, min(self.workers, self.device_limits[self._kinds[dev]]))
+
+    def imap(self, func, paths):
+        """Yield (path, func(path)) in completion order; func must be picklable for processes."""
+        max_queued = self.workers * 4
+        in_flight = defaultdict(int)
+        waiting = defaultdict(deque)
+        futures = {}
+        queued = 0
+
+        def submit(dev, path):
+            in_flight[dev] += 1
+            futures[self.executor.submit(func, path)] = (dev, path)
+
+        def drain():
+            nonlocal queued
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                dev, path = futures.pop(future)
+                in_flight[dev] -= 1
+                queued -= 1
+                if waiting[dev]:
+                    submit(dev, waiting[dev].popleft())
+                try:
+                    yield path, future.result()
+                except Exception:
+                    yield path, None
+
+        for path in paths:
+            dev = self._device_of(path)
+            queued += 1
+            if in_flight[dev] < self._limit(dev):
+                submit(dev, path)
+            else:
+                waiting[dev].append(path)
+            while queued >= max_queued:
+                yield from drain()
+
+        while futures:
+            yield from drain()
+
+    def map(self, func, paths):
+        """Return {path: func(path)} for every path."""
+        return dict(self.imap(func, paths))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,133 @@
+# hashing.py
+
+import os
+import mmap
+import hashlib
+
+try:
+    import xxhash
+except ImportError:  # optional: much faster non-cryptographic digests
+    xxhash = None
+try:
+    import blake3
+except ImportError:  # optional
+    blake3 = None
+
+# === CONFIG ===
+SMALL_FILE_SIZE = 256 * 1024         # read in one go
+MMAP_MIN_SIZE = 64 * 1024 * 1024     # "auto" maps files at least this big
+METHODS = ("auto", "readinto", "mmap", "file_digest", "read")
+
+# Digest constructors by name. Digests of anything but sha256 are written as
+# "name:hex" so digests made with different algorithms (e.g. in the hash cache)
+# can never be mistaken for each other.
+ALGORITHMS = {
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+if xxhash is not None:
+    ALGORITHMS["xxh3_128"] = xxhash.xxh3_128
+    ALGORITHMS["xxh64"] = xxhash.xxh64
+if blake3 is not None:
+    ALGORITHMS["blake3"] = blake3.blake3
+
+# Fastest available algorithm, for digests that only have to rule files out
+# (opt-in: see --partial-algorithm in core.cli).
+# Without xxhash/blake3 that is sha256: on CPUs with SHA extensions it beats blake2b.
+FAST_ALGORITHM = "xxh3_128" if "xxh3_128" in ALGORITHMS else "blake3" if "blake3" in ALGORITHMS else "sha256"
+
+
+def available_algorithms():
+    return list(ALGORITHMS)
+
+
+def new_hasher(algorithm):
+    try:
+        return ALGORITHMS[algorithm]()
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable hash algorithm: {algorithm}") from None
+
+
+def format_digest(algorithm, hasher):
+    digest = hasher.hexdigest()
+    return digest if algorithm == "sha256" else f"{algorithm}:{digest}"
+
+
+def algorithm_of(digest):
+    """Name of the algorithm a digest from format_digest was made with."""
+    return digest.split(":", 1)[0] if ":" in digest else "sha256"
+
+
+def chunk_size_for(size):
+    """Read size for a file: one read for small files, bigger buffers as files grow."""
+    if size <= SMALL_FILE_SIZE:
+        return max(size, 1)
+    if size < 16 * 1024 * 1024:
+        return 256 * 1024
+    return 1024 * 1024
+
+
+def _update_readinto(hasher, f, chunk_size):
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        hasher.update(view[:n])
+
+
+def hash_file(path, algorithm="sha256", method="auto", chunk_size=None):
+    """
+    Digest of a whole file (see format_digest), or None if it can't be read.
+
+    method:
+      readinto    – reused buffer, sized by chunk_size_for() unless chunk_size is given
+      mmap        – hash the mapped file in one call
+      file_digest – hashlib.file_digest (Python 3.11+, hashlib algorithms only)
+      read        – fresh bytes per read (the old way; for benchmarks)
+      auto        – mmap for big files, file_digest or readinto otherwise
+    """
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if method == "auto":
+                if size >= MMAP_MIN_SIZE:
+                    method = "mmap"
+                elif hasattr(hashlib, "file_digest") and algorithm in ("sha256", "blake2b"):
+                    method = "file_digest"
+                else:
+                    method = "readinto"
+            chunk_size = chunk_size or chunk_size_for(size)
+
+            if method == "mmap" and size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    hasher.update(mapped)
+            elif method == "file_digest" and hasattr(hashlib, "file_digest"):
+                hasher = hashlib.file_digest(f, lambda: new_hasher(algorithm))
+            elif method == "read":
+                while chunk := f.read(chunk_size):
+                    hasher.update(chunk)
+            elif method in ("readinto", "mmap", "file_digest"):
+                _update_readinto(hasher, f, chunk_size)
+            else:
+                raise ValueError(f"Unknown hash method: {method}")
+    except OSError:
+        return None
+    return format_digest(algorithm, hasher)
+
+
+def hash_edges(path, edge_size, algorithm="sha256"):
+    """Digest of the first and last edge_size bytes of a file (all of it if it is small)."""
+    hasher = new_hasher(algorithm)
+    try:
+        with open(path, "rb") as f:
+            buf = bytearray(edge_size)
+            n = f.readinto(buf)
+            hasher.update(memoryview(buf)[:n])
+            size = f.seek(0, os.SEEK_END)
+            if size > edge_size:
+                f.seek(max(size - edge_size, edge_size))
+                n = f.readinto(buf)
+                hasher.update(memoryview(buf)[:n])
+    except OSError:
+        return None
+    return format_digest(algorithm, hasher)
@@ -0,0 +1,70 @@
+# keep.py
+
+import os
+
+# === CONFIG ===
+# Which copy of a duplicate group stays put; the rest are moved or linked
+KEEP_POLICIES = ("shortest_name", "oldest", "shortest_path", "preferred_dir")
+DEFAULT_KEEP_POLICY = "shortest_name"
+
+
+def _folder_prefixes(folders):
+    """Absolute, case-normalized folder paths ending in a separator, for _under."""
+    return [os.path.normcase(os.path.join(os.path.abspath(d), "")) for d in folders]
+
+
+def _under(path, folders):
+    """Index of the first folder (from _folder_prefixes) that contains path, or len(folders)."""
+    # normcase: on Windows C:\Archive and c:\archive are the same folder
+    path = os.path.normcase(os.path.abspath(path))
+    for i, folder in enumerate(folders):
+        if path.startswith(folder):
+            return i
+    return len(folders)
+
+
+def in_reference(path, reference_dirs):
+    """True when path lies inside one of reference_dirs (copies there are never moved)."""
+    folders = _folder_prefixes(reference_dirs)
+    return _under(path, folders) < len(folders)
+
+
+def keep_key(policy=DEFAULT_KEEP_POLICY, preferred_dirs=(), reference_dirs=()):
+    """
+    Sort key over walker FileEntry records (anything with path, name and ctime):
+    the smallest entry of a group is the one to keep. Uses only what the walk
+    already stat'ed, so picking a keeper costs no system calls.
+
+      shortest_name – shortest file name ("photo.jpg" over "photo - Copy.jpg"), then oldest
+      oldest        – oldest ctime, then shortest name
+      shortest_path – fewest characters in the full path (least nested), then oldest
+      preferred_dir – a copy inside the first matching folder of preferred_dirs, then shortest_name
+
+    With reference_dirs (e.g. a master archive scanned next to incoming
+    folders), a copy inside them always comes first, whatever the policy.
+    """
+    key = _policy_key(policy, preferred_dirs)
+    if not reference_dirs:
+        return key
+    folders = _folder_prefixes(reference_dirs)
+    return lambda e: (_under(e.path, folders) == len(folders), key(e))
+
+
+def _policy_key(policy, preferred_dirs):
+    if policy == "shortest_name":
+        return lambda e: (len(e.name), e.ctime, e.path)
+    if policy == "oldest":
+        return lambda e: (e.ctime, len(e.name), e.path)
+    if policy == "shortest_path":
+        return lambda e: (len(e.path), e.ctime, e.path)
+    if policy == "preferred_dir":
+        if not preferred_dirs:
+            raise ValueError("The preferred_dir keep policy needs at least one preferred folder")
+        folders = _folder_prefixes(preferred_dirs)
+        return lambda e: (_under(e.path, folders), len(e.name), e.ctime, e.path)
+    raise ValueError(f"Unknown keep policy: {policy}")
+
+
+def pick_keeper(entries, policy=DEFAULT_KEEP_POLICY, preferred_dirs=(), reference_dirs=()):
+    """The entry of a duplicate group to keep under policy (see keep_key)."""
+    return min(entries, key=keep_key(policy, preferred_dirs, reference_dirs))
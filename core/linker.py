@@ -0,0 +1,134 @@
+# linker.py
+
+import os
+import errno
+import shutil
+from core.keep import DEFAULT_KEEP_POLICY, pick_keeper
+from core.walker import FileEntry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# === CONFIG ===
+LINK_MODES = ("auto", "reflink", "hardlink")
+FICLONE = 0x40049409  # Linux ioctl: share all extents of one file with another (btrfs, XFS, bcachefs)
+COMPARE_CHUNK_SIZE = 1024 * 1024
+TMP_SUFFIX = ".dupedoctor-link"
+# errnos meaning "this file system can't reflink", so auto mode falls back to a hardlink
+NO_REFLINK_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.EXDEV, errno.ENOSYS}
+
+
+def pick_canonical(paths, policy=DEFAULT_KEEP_POLICY, preferred_dirs=()):
+    """The path to keep under a core.keep policy, for callers that only have paths (one stat each)."""
+    entries = []
+    for p in paths:
+        st = os.stat(p)
+        entries.append(FileEntry(p, os.path.basename(p), st.st_size, st.st_mtime, st.st_ctime, st.st_ino, st.st_dev))
+    return pick_keeper(entries, policy, preferred_dirs).path
+
+
+def same_bytes(a, b):
+    """Byte-for-byte comparison; the last check before a file is replaced."""
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            chunk_a = fa.read(COMPARE_CHUNK_SIZE)
+            if chunk_a != fb.read(COMPARE_CHUNK_SIZE):
+                return False
+            if not chunk_a:
+                return True
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks need Linux")
+    with open(src, "rb") as fs, open(dst, "wb") as fd:
+        fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+
+
+def link_file(keep, dup, mode="auto"):
+    """
+    Replace dup with a link to keep. The link is made under a temporary name next
+    to dup and renamed over it, so dup's path never disappears or half-exists.
+    Reflinks get dup's permissions and timestamps back; hardlinks share keep's.
+    Returns "reflink" or "hardlink".
+    """
+    tmp = os.path.join(os.path.dirname(dup), f".{os.path.basename(dup)}{TMP_SUFFIX}")
+    if os.path.lexists(tmp):
+        os.remove(tmp)  # left over from an interrupted run
+    try:
+        how = None
+        if mode in ("auto", "reflink"):
+            try:
+                _reflink(keep, tmp)
+                shutil.copystat(dup, tmp)
+                how = "reflink"
+            except OSError as e:
+                if os.path.lexists(tmp):
+                    os.remove(tmp)
+                if mode == "reflink" or e.errno not in NO_REFLINK_ERRNOS:
+                    raise
+        if how is None:
+            os.link(keep, tmp)
+            how = "hardlink"
+        os.replace(tmp, dup)
+        return how
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def link_group(paths, mode="auto", dry_run=False, on_result=None, keep=None):
+    """
+    Replace every file of a duplicate group but the canonical one (keep, or
+    pick_canonical's choice when not given) with a link to it.
+
+    Each file is byte-compared with the canonical copy first and left alone when it
+    differs, is already the same inode, or is on another device. on_result(keep,
+    path, status, how, reclaimed_bytes) is called per file with status "linked",
+    "skipped" or "failed" (how then holds the reason); all fail when keep cannot
+    be stat'ed. Returns bytes reclaimed.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode: {mode}")
+    keep = keep or pick_canonical(paths)
+    reclaimed = 0
+
+    def report(path, status, how, freed=0):
+        if on_result:
+            on_result(keep, path, status, how, freed)
+
+    try:
+        keep_stat = os.stat(keep)
+    except OSError as e:
+        # Without the canonical copy nothing in the group can be linked
+        for path in paths:
+            if path != keep:
+                report(path, "failed", str(e))
+        return reclaimed
+
+    for path in paths:
+        if path == keep:
+            continue
+        try:
+            st = os.stat(path)
+            if (st.st_dev, st.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                report(path, "skipped", "already linked")
+                continue
+            if st.st_dev != keep_stat.st_dev:
+                report(path, "skipped", "on another device")
+                continue
+            if not same_bytes(keep, path):
+                report(path, "skipped", "content differs")
+                continue
+            how = "dry-run" if dry_run else link_file(keep, path, mode)
+        except OSError as e:
+            report(path, "failed", str(e))
+            continue
+        # A hardlinked duplicate's blocks are only freed when this was its last name
+        freed = st.st_size if st.st_nlink == 1 else 0
+        reclaimed += freed
+        report(path, "linked", how, freed)
+    return reclaimed
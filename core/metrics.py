@@ -0,0 +1,229 @@
+# metrics.py
+"""
+Lightweight counters, timers and latency histograms for scans, hashing and moves.
+
+Pass a Metrics object as `metrics=` to walk_files / scan_table,
+iter_duplicate_groups / refine_by_content and move_files; each only counts
+when one is given. Counters used by those stages:
+
+    files, dirs, skipped, errors              – walk (skipped: excluded by the walk options)
+    files_hashed, bytes_hashed, cache_hits,
+    hash_errors                               – content stages
+    files_moved, bytes_moved, move_errors     – move_files
+    retries, timeouts, placeholders           – core.async_walker
+
+Histograms: stat (per-file stat while walking), list_dir (per directory
+listing), stat_batch (async walker stat calls) and, from the GUI, ui_log (time spent writing log lines to Tk).
+"""
+
+import os
+import sys
+import time
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# === CONFIG ===
+UPDATE_EVERY = 0.5       # seconds between on_update callbacks
+HISTOGRAM_BUCKETS = 25   # powers of two from 1 µs up to ~16 s
+PROFILE_MODES = ("cprofile", "sample")
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+
+class Histogram:
+    """Latency histogram with power-of-two buckets in microseconds."""
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound in seconds of the bucket holding the p-th percentile."""
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(2 ** i / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        ms = lambda s: round(s * 1000, 3)
+        return {"count": self.count, "mean_ms": ms(self.total / self.count),
+                "p50_ms": ms(self.percentile(50)), "p90_ms": ms(self.percentile(90)),
+                "p99_ms": ms(self.percentile(99)), "max_ms": ms(self.max),
+                "buckets": {f"<={ms(2 ** i / 1e6)}ms": n for i, n in enumerate(self.buckets) if n}}
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stacks of every thread (walker and hash pool threads included,
+    which cProfile does not see) into folded-stack counts for flame graphs.
+    """
+
+    def __init__(self, counts, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.counts = counts
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Metrics:
+    """
+    Counters, per-stage timers and latency histograms for one run. Safe to
+    update from worker threads. on_update(snapshot) is called at most every
+    update_every seconds while counting, and whenever a stage ends.
+
+    profile="cprofile" runs each stage under cProfile (the calling thread only)
+    and writes <profile_dir>/<stage>.prof; profile="sample" samples all threads
+    and writes <stage>.folded, one "frame;frame;... count" line per stack, for
+    flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, on_update=None, update_every=UPDATE_EVERY, profile=None, profile_dir="."):
+        if profile is not None and profile not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {profile}")
+        self.on_update = on_update
+        self.update_every = update_every
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.started = time.perf_counter()
+        self.counters = Counter()
+        self.histograms = {}
+        self.stages = {}
+        self._active = []       # (name, started, counters at start) for stages in progress
+        self._profiles = {}
+        self._profiling = False
+        self._last_update = 0.0
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+        self.notify()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as stage `name`; repeated blocks with the same name add up."""
+        with self._lock:
+            entry = (name, time.perf_counter(), Counter(self.counters))
+            self._active.append(entry)
+        stop_profile = self._start_profile(name)
+        try:
+            yield self
+        finally:
+            if stop_profile:
+                stop_profile()
+            with self._lock:
+                # Not pop(): a stage on another thread may have started after this one
+                self._active.remove(entry)
+                _, started, before = entry
+                record = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "counters": Counter()})
+                record["seconds"] += time.perf_counter() - started
+                record["calls"] += 1
+                record["counters"].update(self.counters - before)
+            self.notify(force=True)
+
+    def _start_profile(self, name):
+        # One profiler at a time: nested stages are covered by the outer one
+        if not self.profile or self._profiling:
+            return None
+        self._profiling = True
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if self.profile == "cprofile":
+            profiler = self._profiles.setdefault(name, cProfile.Profile())
+            profiler.enable()
+
+            def stop():
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{name}.prof"))
+                self._profiling = False
+            return stop
+
+        counts = self._profiles.setdefault(name, Counter())
+        sampler = StackSampler(counts)
+        sampler.start()
+
+        def stop():
+            sampler.stop()
+            with open(os.path.join(self.profile_dir, f"{name}.folded"), "w", encoding="utf-8") as f:
+                for stack, n in counts.most_common():
+                    f.write(f"{stack} {n}\n")
+            self._profiling = False
+        return stop
+
+    def notify(self, force=False):
+        if not self.on_update:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_update >= self.update_every:
+            self._last_update = now
+            self.on_update(self.snapshot())
+
+    def snapshot(self):
+        """Plain dict of everything measured so far, with per-second rates for each stage."""
+        now = time.perf_counter()
+        with self._lock:
+            stages = {name: (r["seconds"], r["calls"], Counter(r["counters"])) for name, r in self.stages.items()}
+            for name, started, before in self._active:  # include stages still running
+                seconds, calls, counts = stages.get(name, (0.0, 0, Counter()))
+                stages[name] = (seconds + now - started, calls, counts + (self.counters - before))
+            snapshot = {
+                "elapsed_seconds": round(now - self.started, 3),
+                "stage": self._active[-1][0] if self._active else None,
+                "counters": dict(self.counters),
+                "histograms": {name: h.summary() for name, h in self.histograms.items()},
+            }
+        snapshot["stages"] = {}
+        for name, (seconds, calls, counts) in stages.items():
+            record = {"seconds": round(seconds, 4), "calls": calls}
+            for key, n in sorted(counts.items()):
+                record[key] = n
+                record[f"{key}_per_sec"] = round(n / seconds, 1) if seconds else None
+            snapshot["stages"][name] = record
+        return snapshot
+
+
+@contextmanager
+def stage(metrics, name):
+    """metrics.stage(name), or nothing when metrics is None."""
+    if metrics is None:
+        yield None
+    else:
+        with metrics.stage(name):
+            yield metrics
@@ -0,0 +1,258 @@
+# mover.py
+
+import os
+import json
+import contextlib
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# === CONFIG ===
+JOURNAL_NAME = "move_journal.ndjson"  # kept inside the quarantine folder
+BATCH_SIZE = 1000     # moves per batch: directories are created and the journal synced once per batch
+COPY_WORKERS = 4      # concurrent cross-device copies
+
+# Journal file: one JSON object per line, appended as moves happen.
+#   {"op": "start", "root": ..., "at": 1700000000.0}     – one per run
+#   {"op": "begin", "src": ..., "dst": ...}            – written (and synced) before a batch runs
+#   {"op": "done", "src": ..., "dst": ..., "size": ..., "mtime": ..., "how": "rename" | "copy" | "recovered"}
+#   {"op": "failed", "src": ..., "dst": ..., "error": ...}
+#   {"op": "restored", "src": ..., "dst": ..., "to": ...}   – moved back by core.restore
+# A "begin" without a matching "done"/"failed" means the process stopped mid-batch;
+# the next run checks the file system to see whether that move happened.
+
+
+def journal_path_for(quarantine_dir):
+    return os.path.join(quarantine_dir, JOURNAL_NAME)
+
+
+def default_quarantine_dir(folder):
+    """<folder>/_quarantine_<folder name>; the walker skips it on later scans."""
+    folder = os.path.abspath(folder)
+    return os.path.join(folder, f"_quarantine_{os.path.basename(folder)}")
+
+
+def quarantine_path(src, source_root, quarantine_dir):
+    """Where src goes inside quarantine_dir, mirroring its place under source_root."""
+    return os.path.join(quarantine_dir, os.path.relpath(src, source_root))
+
+
+def root_labels(roots):
+    """A folder name per root, numbered when names repeat ("photos", "photos-2")."""
+    labels, seen = [], {}
+    for root in roots:
+        name = os.path.basename(root.rstrip(os.sep)) or "root"
+        seen[name] = seen.get(name, 0) + 1
+        labels.append(name if seen[name] == 1 else f"{name}-{seen[name]}")
+    return labels
+
+
+def roots_quarantine_path(src, roots, quarantine_dir):
+    """quarantine_path for a scan of several roots: each root gets a subfolder of quarantine_dir."""
+    if len(roots) == 1:
+        return quarantine_path(src, roots[0], quarantine_dir)
+    for root, label in zip(roots, root_labels(roots)):
+        if src.startswith(os.path.join(root, "")):
+            return quarantine_path(src, root, os.path.join(quarantine_dir, label))
+    raise ValueError(f"{src} is not under any scanned root")
+
+
+class MoveJournal:
+    """Append-only NDJSON journal; sync() makes everything written so far durable."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, op, **fields):
+        self.file.write(json.dumps(dict(op=op, **fields), ensure_ascii=False) + "\n")
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+
+def read_journal(path):
+    """Yield journal entries in order; a torn last line from a crash is ignored."""
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def journal_state(path):
+    """Latest journal entry per source path (ignoring "start" entries)."""
+    return {e["src"]: e for e in read_journal(path) if "src" in e}
+
+
+def _copy_no_clobber(src, dst):
+    """Copy src into a new file at dst (never an existing one), then delete src."""
+    try:
+        with open(src, "rb") as fin, open(dst, "xb") as fout:
+            shutil.copyfileobj(fin, fout)
+    except FileExistsError:
+        raise
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(dst)
+        raise
+    shutil.copystat(src, dst)
+    os.unlink(src)
+    return "copy"
+
+
+def move_no_clobber(src, dst):
+    """
+    Move src to dst, raising FileExistsError instead of replacing anything at
+    dst, even a file created a moment ago: a hard link plus unlink on the same
+    device, an exclusive create plus copy where links are not possible.
+    Returns "rename" or "copy" like the journal's "how".
+    """
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # Other device, or no hard links (FAT, some network shares)
+        return _copy_no_clobber(src, dst)
+    os.unlink(src)
+    return "rename"
+
+
+def _move_one(src, dst, same_device):
+    # No check-then-move: a file that shows up at dst in between must not be overwritten
+    if same_device:
+        return move_no_clobber(src, dst)
+    return _copy_no_clobber(src, dst)
+
+
+def move_files(moves, journal_path, workers=COPY_WORKERS, batch_size=BATCH_SIZE,
+               cancel=None, on_moved=None, on_error=None, root=None, metrics=None):
+    """
+    Move (src, dst) pairs, journaling each move to journal_path as it happens.
+
+    Work is done in batches of batch_size: every destination folder of a batch is
+    created once, the batch's "begin" entries are synced, then same-device moves
+    are renames (hard link + unlink) and cross-device moves run on a pool of
+    `workers` threads. A folder that cannot be created fails the moves into it.
+    Moves already marked done in the journal are skipped, so rerunning the same
+    plan after an interruption picks up where it stopped. Existing destination
+    files are never overwritten.
+
+    cancel() is checked between moves; on_moved(src, dst, how) and
+    on_error(src, error) report progress. metrics (a core.metrics.Metrics) counts
+    files_moved, bytes_moved and move_errors. Returns a stats dict.
+    """
+    previous = journal_state(journal_path)
+    stats = {"moved": 0, "renamed": 0, "copied": 0, "skipped": 0, "failed": 0, "cancelled": False}
+    made_dirs = set()
+    dir_devices = {}
+
+    def dir_device(folder):
+        if folder not in dir_devices:
+            dir_devices[folder] = os.stat(folder).st_dev
+        return dir_devices[folder]
+
+    def finished(journal, src, dst, st, how):
+        journal.record("done", src=src, dst=dst, size=st.st_size, mtime=st.st_mtime, how=how)
+        stats["moved"] += 1
+        stats["renamed" if how == "rename" else "copied"] += 1
+        if metrics:
+            metrics.count("files_moved")
+            metrics.count("bytes_moved", st.st_size)
+        if on_moved:
+            on_moved(src, dst, how)
+
+    def failed(journal, src, dst, e):
+        journal.record("failed", src=src, dst=dst, error=str(e))
+        stats["failed"] += 1
+        if metrics:
+            metrics.count("move_errors")
+        if on_error:
+            on_error(src, e)
+
+    def pending(journal, src, dst):
+        last = previous.get(src)
+        if last is None or last["dst"] != dst or last["op"] == "failed":
+            return True
+        if last["op"] == "begin":
+            # Interrupted mid-batch: the move happened if only the destination is left
+            if os.path.lexists(src) or not os.path.lexists(dst):
+                return True
+            st = os.lstat(dst)
+            journal.record("done", src=src, dst=dst, size=st.st_size, mtime=st.st_mtime, how="recovered")
+            return False
+        return last["op"] != "done"
+
+    with MoveJournal(journal_path) as journal, ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        journal.record("start", root=root, at=time.time())
+        batch = []
+        plan = iter(moves)
+        while not stats["cancelled"]:
+            for src, dst in plan:
+                if pending(journal, src, dst):
+                    batch.append((src, dst))
+                    if len(batch) >= batch_size:
+                        break
+                else:
+                    stats["skipped"] += 1
+            if not batch:
+                break
+
+            blocked = {}
+            for folder in {os.path.dirname(dst) for _, dst in batch} - made_dirs:
+                try:
+                    os.makedirs(folder, exist_ok=True)
+                    made_dirs.add(folder)
+                except OSError as e:
+                    blocked[folder] = e
+            if blocked:
+                # Moves into a folder that could not be created fail; the rest of the batch goes ahead
+                for src, dst in batch:
+                    if os.path.dirname(dst) in blocked:
+                        failed(journal, src, dst, blocked[os.path.dirname(dst)])
+                batch = [(src, dst) for src, dst in batch if os.path.dirname(dst) not in blocked]
+            for src, dst in batch:
+                journal.record("begin", src=src, dst=dst)
+            journal.sync()
+
+            copies = []
+            for src, dst in batch:
+                if cancel and cancel():
+                    stats["cancelled"] = True
+                    break
+                try:
+                    st = os.lstat(src)
+                    same_device = st.st_dev == dir_device(os.path.dirname(dst))
+                    if same_device:
+                        finished(journal, src, dst, st, _move_one(src, dst, True))
+                    else:
+                        copies.append((src, dst, st, pool.submit(_move_one, src, dst, False)))
+                except OSError as e:
+                    failed(journal, src, dst, e)
+            for src, dst, st, future in copies:
+                try:
+                    finished(journal, src, dst, st, future.result())
+                except OSError as e:
+                    failed(journal, src, dst, e)
+            journal.sync()
+            batch = []
+    return stats
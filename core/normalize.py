@@ -0,0 +1,73 @@
+# normalize.py
+
+import re
+import functools
+
+# === CONFIG ===
+NAME_CACHE_SIZE = 1 << 16  # distinct basenames remembered per rule-set combination
+
+# Copy-name rules, by name. "suffixes" are copy markers at the end of a stem, each
+# optionally followed by a " (n)" counter when "counter" is set; a bare " (n)" is
+# also stripped then. "prefixes" are copy markers at the start ("Copy of x").
+RULE_SETS = {
+    # Explorer and browsers: "x - Copy", "x - Copy (2)", "x (1)"
+    "windows": {"suffixes": [r" - Copy"], "prefixes": [], "counter": True},
+    # Older Windows and some apps: "Copy of x", "Copy (2) of x"
+    "copy_of": {"suffixes": [], "prefixes": [r"[Cc]opy (?:\(\d+\) )?of "], "counter": False},
+    # Finder: "x copy", "x copy 2"
+    "macos": {"suffixes": [r" copy(?: \d+)?"], "prefixes": [], "counter": False},
+    # Localized Explorer copies and "Copy of" prefixes
+    "locale": {
+        "suffixes": [r" - (?:Kopie|Copie|Copia|Cópia|Kopia|Kopio|Kopi|Másolat|Копия|コピー|副本|복사본)"],
+        "prefixes": [r"(?:Kopie von|Copie de|Copia de|Cópia de|Kopia av|Kopi af|Kopie van) "],
+        "counter": True,
+    },
+}
+DEFAULT_RULE_SETS = ("windows",)
+
+
+def compile_rules(rule_sets=DEFAULT_RULE_SETS):
+    """One pattern for all rule sets; its "stem" group is the name with copy markers removed."""
+    unknown = set(rule_sets) - set(RULE_SETS)
+    if unknown:
+        raise ValueError(f"Unknown name rule set(s): {', '.join(sorted(unknown))}")
+    rules = [RULE_SETS[name] for name in rule_sets]
+    prefixes = [p for r in rules for p in r["prefixes"]]
+    suffixes = [s for r in rules for s in r["suffixes"]]
+    counter = r"(?: \(\d+\))?" if any(r["counter"] for r in rules) else ""
+
+    pattern = ""
+    if prefixes:
+        pattern += f"(?:{'|'.join(prefixes)})?"
+    pattern += r"(?P<stem>.*?)" + counter
+    if suffixes:
+        pattern += f"(?:(?:{'|'.join(suffixes)}){counter})?"
+    # "\n?": like re's "$", a marker may sit before one trailing newline (stripped anyway)
+    return re.compile(pattern + "\n?", re.DOTALL)
+
+
+@functools.lru_cache(maxsize=None)
+def get_normalizer(rule_sets=DEFAULT_RULE_SETS):
+    """
+    normalize(stem) for a tuple of rule set names: strips copy markers with a
+    single precompiled match and remembers the last NAME_CACHE_SIZE results,
+    since the same basenames recur across folders and between scan and move.
+    """
+    match = compile_rules(rule_sets).fullmatch
+
+    @functools.lru_cache(maxsize=NAME_CACHE_SIZE)
+    def normalize(name):
+        return match(name).group("stem").strip()
+
+    return normalize
+
+
+def parse_rule_sets(value):
+    """Turn "windows, copy_of" into ("windows", "copy_of")."""
+    rule_sets = tuple(v.strip().lower() for v in value.split(",") if v.strip())
+    compile_rules(rule_sets)  # raises ValueError for unknown names
+    return rule_sets
+
+
+# Removes ' - Copy', ' (1)', ' - Copy (2)' and the like with the default rules
+normalize_name = get_normalizer(DEFAULT_RULE_SETS)
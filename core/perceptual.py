@@ -0,0 +1,222 @@
+# perceptual.py
+
+import os
+import math
+import functools
+import itertools
+from core.find_duplicates_hash import compute_digests, is_image_file
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; only the perceptual mode needs it
+    Image = None
+
+# === CONFIG ===
+HASH_KINDS = ("dhash", "phash")
+DEFAULT_MAX_DISTANCE = 6  # differing bits (of 64) still treated as the same picture
+PHASH_SIZE = 32           # thumbnail edge the DCT runs on
+PHASH_BITS = 8            # low-frequency block kept: 8x8 = 64 bits
+
+# Cosine table for the first PHASH_BITS DCT-II coefficients of a PHASH_SIZE signal
+_DCT = [[math.cos(math.pi * (2 * x + 1) * u / (2 * PHASH_SIZE)) for x in range(PHASH_SIZE)]
+        for u in range(PHASH_BITS)]
+
+
+def _popcount(x):
+    return bin(x).count("1")
+
+
+popcount = getattr(int, "bit_count", _popcount)  # int.bit_count needs Python 3.10
+
+
+def require_pillow():
+    if Image is None:
+        raise ImportError("perceptual image matching needs Pillow: pip install pillow")
+
+
+def _thumbnail(path, size):
+    """Grayscale size[0] x size[1] pixels; JPEGs are decoded at reduced scale via draft()."""
+    with Image.open(path) as img:
+        img.draft("L", (size[0] * 4, size[1] * 4))
+        return list(img.convert("L").resize(size, Image.BILINEAR).getdata())
+
+
+def dhash_pixels(pixels):
+    """64-bit difference hash from 9x8 grayscale pixels: is each pixel brighter than its right neighbour?"""
+    value = 0
+    for row in range(8):
+        line = pixels[row * 9:row * 9 + 9]
+        for x in range(8):
+            value = (value << 1) | (line[x] > line[x + 1])
+    return value
+
+
+def phash_pixels(pixels):
+    """64-bit DCT hash from PHASH_SIZE^2 grayscale pixels: low frequencies above/below their median."""
+    n = PHASH_SIZE
+    rows = [[sum(c * p for c, p in zip(cos, pixels[y * n:y * n + n])) for cos in _DCT] for y in range(n)]
+    coeffs = [sum(_DCT[v][y] * rows[y][u] for y in range(n)) for v in range(PHASH_BITS) for u in range(PHASH_BITS)]
+    median = sorted(coeffs[1:])[len(coeffs) // 2]  # the DC term only says how bright the image is
+    value = 0
+    for c in coeffs:
+        value = (value << 1) | (c > median)
+    return value
+
+
+def image_hash(path, kind="dhash"):
+    """Perceptual hash of an image as a 16-digit hex string, or None if it can't be decoded."""
+    try:
+        if kind == "dhash":
+            value = dhash_pixels(_thumbnail(path, (9, 8)))
+        else:
+            value = phash_pixels(_thumbnail(path, (PHASH_SIZE, PHASH_SIZE)))
+    except Exception:  # unreadable, truncated or unsupported image
+        return None
+    return f"{value:016x}"
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with Hamming distance. A radius-r
+    query only descends into children whose edge distance is within r of the
+    query's distance to the node, so it visits a small part of the tree.
+    Nodes are [value, items, {distance: child}]; equal hashes share a node.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = popcount(node[0] ^ value)
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def query(self, value, radius):
+        """Yield (distance, item) for every item within radius of value."""
+        if self.root is None:
+            return
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = popcount(node[0] ^ value)
+            if d <= radius:
+                for item in node[1]:
+                    yield d, item
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing (multi-probe LSH for Hamming space): the 64 bits are cut
+    into blocks, each with its own table. Two hashes within radius r differ in at
+    most r // blocks bits in some block (pigeonhole), so a query only probes each
+    block's table with those few bit flips and checks the candidates it finds,
+    instead of comparing against every hash. The block count is picked to balance
+    probes against bucket sizes for the expected number of hashes.
+    """
+
+    def __init__(self, radius, expected_size):
+        self.radius = radius
+        blocks = min(range(1, min(radius, 63) + 2), key=lambda m: self._probe_cost(m, radius, expected_size))
+        self.probe_radius = radius // blocks
+        widths = [64 // blocks + (1 if i < 64 % blocks else 0) for i in range(blocks)]
+        self.blocks = []
+        shift = 0
+        for width in widths:
+            flips = [sum(1 << bit for bit in bits) for t in range(self.probe_radius + 1)
+                     for bits in itertools.combinations(range(width), t)]
+            self.blocks.append((shift, (1 << width) - 1, flips, {}))
+            shift += width
+
+    @staticmethod
+    def _probe_cost(blocks, radius, size):
+        """Rough cost of one query: table probes plus the random hashes they turn up."""
+        width = 64 // blocks
+        probes = sum(math.comb(width, t) for t in range(radius // blocks + 1))
+        return blocks * probes * (1 + size / 2 ** width)
+
+    def add(self, value, item):
+        for shift, mask, _, table in self.blocks:
+            table.setdefault((value >> shift) & mask, []).append((value, item))
+
+    def query(self, value, radius=None):
+        """Yield (distance, item) for every item within radius (at most the index's radius) of value."""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        seen = set()  # (value, item): items that share a hash are all yielded, each once
+        for shift, mask, flips, table in self.blocks:
+            key = (value >> shift) & mask
+            for flip in flips:
+                for other, item in table.get(key ^ flip, ()):
+                    if (other, item) in seen:
+                        continue
+                    seen.add((other, item))
+                    d = popcount(other ^ value)
+                    if d <= radius:
+                        yield d, item
+
+
+INDEXES = {"mih": lambda radius, size: MultiIndexHash(radius, size), "bktree": lambda radius, size: BKTree()}
+
+
+def cluster_hashes(hashes, max_distance=DEFAULT_MAX_DISTANCE, index="mih"):
+    """
+    Group items whose hashes are within max_distance of each other (transitively)
+    using a MultiIndexHash or BKTree plus union-find. hashes maps item -> int.
+    Returns groups of two or more items.
+    """
+    by_value = {}
+    for item, value in hashes.items():
+        by_value.setdefault(value, []).append(item)
+
+    tree = INDEXES[index](max_distance, len(by_value))
+    parent = {}
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for value in by_value:
+        parent[value] = value
+        for _, other in tree.query(value, max_distance):
+            a, b = find(value), find(other)
+            if a != b:
+                parent[a] = b
+        tree.add(value, value)
+
+    clusters = {}
+    for value, items in by_value.items():
+        clusters.setdefault(find(value), []).extend(items)
+    return [items for items in clusters.values() if len(items) > 1]
+
+
+def find_similar_images(paths, kind="dhash", max_distance=DEFAULT_MAX_DISTANCE, cache=None, hash_service=None):
+    """
+    Groups of image paths that look alike (re-encoded, resized, lightly edited).
+    Hashes come from the HashCache when valid and are otherwise computed on
+    hash_service's pool (use_processes=True suits image decoding).
+    """
+    require_pillow()
+    if kind not in HASH_KINDS:
+        raise ValueError(f"Unknown perceptual hash: {kind}")
+    images = [p for p in paths if is_image_file(p)]
+    digests = compute_digests(images, functools.partial(image_hash, kind=kind), kind,
+                              cache=cache, hash_service=hash_service)
+    groups = cluster_hashes({p: int(d, 16) for p, d in digests.items()}, max_distance)
+    return [sorted(g, key=os.path.basename) for g in groups]
@@ -0,0 +1,250 @@
+# reference_index.py
+
+import os
+import sqlite3
+import time
+import hashlib
+import functools
+from core.find_duplicates_hash import (FULL_ALGORITHM, PARTIAL_ALGORITHM, PARTIAL_HASH_SIZE, compute_digests,
+                                       get_file_hash, get_partial_hash)
+from core.snapshot import walk_options
+from core.walker import DEFAULT_WALK_WORKERS, walk_files
+
+# === CONFIG ===
+REFERENCE_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".dupedoctor", "reference")
+DIGEST_LEVELS = ("none", "partial", "full")  # what update() hashes up front; the rest is hashed on demand
+INSERT_BATCH = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS roots (
+    root       TEXT PRIMARY KEY,
+    files      INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path    TEXT PRIMARY KEY,
+    size    INTEGER NOT NULL,
+    mtime   REAL NOT NULL,
+    inode   INTEGER NOT NULL,
+    partial TEXT,
+    full    TEXT
+);
+CREATE INDEX IF NOT EXISTS files_size_partial ON files (size, partial);
+CREATE INDEX IF NOT EXISTS files_size_full ON files (size, full);
+"""
+
+
+def default_reference_path(folder):
+    """Per-folder reference index under ~/.dupedoctor/reference."""
+    key = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(REFERENCE_INDEX_DIR, f"{key}.sqlite3")
+
+
+def _under_clause(root):
+    """SQL condition and params for paths inside root (a range on the primary key)."""
+    prefix = os.path.join(os.path.abspath(root), "")
+    return "path >= ? AND path < ?", (prefix, prefix + "\U0010ffff")
+
+
+class ReferenceIndex:
+    """
+    Persistent size + digest index of a reference tree (a master archive), so
+    new folders can be checked against it without walking it again. Every file
+    gets a row with its size; partial and full digests are filled in the first
+    time a checked file has the same size (or partial digest), then kept until
+    the reference file changes. Lookups go through the (size, digest) indexes.
+
+    Digests are only valid for the edge size and algorithms they were made
+    with; opening the index with other settings drops the stored digests.
+    """
+
+    def __init__(self, path, edge_size=PARTIAL_HASH_SIZE, partial_algorithm=PARTIAL_ALGORITHM,
+                 full_algorithm=FULL_ALGORITHM):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.edge_size = edge_size
+        self.partial_hash = functools.partial(get_partial_hash, edge_size=edge_size, algorithm=partial_algorithm)
+        self.full_hash = functools.partial(get_file_hash, algorithm=full_algorithm)
+        self.algorithms = {"partial": partial_algorithm, "full": full_algorithm}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        settings = {"edge_size": str(edge_size), "partial_algorithm": partial_algorithm,
+                    "full_algorithm": full_algorithm}
+        if dict(self.conn.execute("SELECT key, value FROM settings")) != settings:
+            self.conn.execute("UPDATE files SET partial = NULL, full = NULL")
+            self.conn.execute("DELETE FROM settings")
+            self.conn.executemany("INSERT INTO settings VALUES (?, ?)", settings.items())
+            self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def roots(self):
+        return [root for (root,) in self.conn.execute("SELECT root FROM roots ORDER BY root")]
+
+    def update(self, folder, digests="none", cache=None, hash_service=None, workers=DEFAULT_WALK_WORKERS,
+               on_error=None, progress=None, metrics=None, walker=None, **walk_kwargs):
+        """
+        Walk folder and bring its rows up to date: new files are added, files
+        with another size, mtime or inode lose their digests, vanished files are
+        dropped. digests="partial"/"full" also hashes every file now instead of
+        on demand. Returns {"files", "added", "changed", "removed", "hashed"}.
+        """
+        if digests not in DIGEST_LEVELS:
+            raise ValueError(f"Unknown digest level: {digests}")
+        folder = os.path.abspath(folder)
+        conn = self.conn
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, "
+                     "inode INTEGER)")
+        conn.execute("DELETE FROM seen")
+        batch, files = [], 0
+        walker = walker or walk_files
+        for entry in walker(folder, workers=workers, on_error=on_error, metrics=metrics,
+                            **walk_options(**walk_kwargs)):
+            batch.append((entry.path, entry.size, entry.mtime, entry.inode))
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)", batch)
+                files += len(batch)
+                batch = []
+                if progress:
+                    progress(files)
+        conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)", batch)
+        files += len(batch)
+
+        under, params = _under_clause(folder)
+        stats = {"files": files}
+        stats["removed"] = conn.execute(
+            f"DELETE FROM files WHERE {under} AND path NOT IN (SELECT path FROM seen)", params).rowcount
+        stats["changed"] = conn.execute(
+            "SELECT COUNT(*) FROM seen JOIN files USING (path) WHERE files.size != seen.size "
+            "OR files.mtime != seen.mtime OR files.inode != seen.inode").fetchone()[0]
+        stats["added"] = files - conn.execute("SELECT COUNT(*) FROM seen JOIN files USING (path)").fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime, inode) SELECT seen.path, seen.size, seen.mtime, "
+            "seen.inode FROM seen LEFT JOIN files USING (path) WHERE files.path IS NULL "
+            "OR files.size != seen.size OR files.mtime != seen.mtime OR files.inode != seen.inode")
+        conn.execute("DELETE FROM seen")
+        conn.execute("INSERT OR REPLACE INTO roots VALUES (?, ?, ?)", (folder, files, time.time()))
+        conn.commit()
+
+        stats["hashed"] = 0
+        if digests != "none":
+            rows = conn.execute(f"SELECT path, size FROM files WHERE {under} AND partial IS NULL", params).fetchall()
+            stats["hashed"] += self._store_digests("partial", [p for p, _ in rows], cache, hash_service, metrics)
+        if digests == "full":
+            rows = conn.execute(f"SELECT path FROM files WHERE {under} AND full IS NULL AND size > ?",
+                                params + (2 * self.edge_size,)).fetchall()
+            stats["hashed"] += self._store_digests("full", [p for (p,) in rows], cache, hash_service, metrics)
+        return stats
+
+    def _is_current(self, path):
+        """True while path still has the size, mtime and inode it was indexed with; drops its row if gone."""
+        row = self.conn.execute("SELECT size, mtime, inode FROM files WHERE path = ?", (path,)).fetchone()
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            return False
+        if row is None or (st.st_size, st.st_mtime) != row[:2] or (row[2] and st.st_ino and st.st_ino != row[2]):
+            # Changed since indexing: its digests no longer describe it; the next update() re-adds it
+            self.conn.execute("UPDATE files SET partial = NULL, full = NULL WHERE path = ?", (path,))
+            return False
+        return True
+
+    def _store_digests(self, kind, paths, cache=None, hash_service=None, metrics=None):
+        """Hash paths (reference files) and store their digests of kind; returns how many were stored."""
+        current = [p for p in paths if self._is_current(p)]
+        compute = self.partial_hash if kind == "partial" else self.full_hash
+        digests = compute_digests(current, compute, kind, self.edge_size if kind == "partial" else None, cache,
+                                  hash_service, self.algorithms[kind], metrics)
+        self.conn.executemany(f"UPDATE files SET {kind} = ? WHERE path = ?", [(d, p) for p, d in digests.items()])
+        self.conn.commit()
+        return len(digests)
+
+    def _refs(self, size, kind=None, digest=None):
+        if kind is None:
+            return [p for (p,) in self.conn.execute("SELECT path FROM files WHERE size = ? ORDER BY path", (size,))]
+        return [p for (p,) in self.conn.execute(f"SELECT path FROM files WHERE size = ? AND {kind} = ? "
+                                                "ORDER BY path", (size, digest))]
+
+    def _unhashed(self, size, kind, partial=None):
+        if kind == "partial":
+            rows = self.conn.execute("SELECT path FROM files WHERE size = ? AND partial IS NULL", (size,))
+        else:
+            rows = self.conn.execute("SELECT path FROM files WHERE size = ? AND partial = ? AND full IS NULL",
+                                     (size, partial))
+        return [p for (p,) in rows]
+
+    def _first_current(self, refs, path):
+        """The first reference that is not path itself and has not changed since it was hashed."""
+        return next((ref for ref in refs if ref != path and self._is_current(ref)), None)
+
+    def match(self, files, cache=None, hash_service=None, stats=None, metrics=None):
+        """
+        Yield (path, reference path, size) for every (path, size) in files whose
+        content is in the index. Only files whose size occurs in the index are
+        hashed, and reference files only when no stored digest answers the
+        question: partial digests first, full digests for files larger than
+        both edges, as in refine_by_content.
+        """
+        stats = {} if stats is None else stats
+        stats.update(candidates=0, matches=0, reference_hashed=0)
+        by_size = {}
+        for path, size in files:
+            by_size.setdefault(size, []).append(path)
+        sizes = [s for s in by_size if self.conn.execute("SELECT 1 FROM files WHERE size = ? LIMIT 1",
+                                                         (s,)).fetchone()]
+        candidates = [p for s in sizes for p in by_size[s]]
+        stats["candidates"] = len(candidates)
+        size_of = {p: s for s in sizes for p in by_size[s]}
+        partials = compute_digests(candidates, self.partial_hash, "partial", self.edge_size, cache, hash_service,
+                                   self.algorithms["partial"], metrics)
+
+        # Reference files of a candidate size get their partial digest once; it is kept for later checks
+        todo = [ref for size in {size_of[p] for p in partials} for ref in self._unhashed(size, "partial")]
+        stats["reference_hashed"] += self._store_digests("partial", todo, cache, hash_service, metrics)
+
+        large = []
+        for path, partial in partials.items():
+            size = size_of[path]
+            if size > 2 * self.edge_size:
+                if self._refs(size, "partial", partial):
+                    large.append(path)
+                continue
+            # Small files were hashed whole by the partial digest
+            ref = self._first_current(self._refs(size, "partial", partial), path)
+            if ref:
+                stats["matches"] += 1
+                yield path, ref, size
+
+        fulls = compute_digests(large, self.full_hash, "full", None, cache, hash_service,
+                                self.algorithms["full"], metrics)
+        # Full digests only for partial matches that no stored full digest answers yet
+        missing = {(size_of[p], partials[p]) for p, d in fulls.items() if not self._refs(size_of[p], "full", d)}
+        todo = [ref for size, partial in missing for ref in self._unhashed(size, "full", partial)]
+        stats["reference_hashed"] += self._store_digests("full", todo, cache, hash_service, metrics)
+        for path, full in fulls.items():
+            ref = self._first_current(self._refs(size_of[path], "full", full), path)
+            if ref:
+                stats["matches"] += 1
+                yield path, ref, size_of[path]
+        self.conn.commit()
+
+    def close(self):
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,206 @@
+# restore.py
+
+import os
+import errno
+import contextlib
+import itertools
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.hashing import algorithm_of, hash_file
+from core.mover import BATCH_SIZE, MoveJournal, journal_path_for, move_no_clobber, read_journal
+
+# === CONFIG ===
+RESTORE_WORKERS = 8
+LEGACY_LOG_NAME = "dupe_log.csv"  # "src,dst" lines written by older versions of the GUI
+VERIFY_MODES = ("none", "size", "mtime", "hash")
+CONFLICT_MODES = ("skip", "rename", "overwrite")
+MTIME_TOLERANCE = 2.0  # seconds; FAT/exFAT only keep even seconds
+
+
+def _path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _parse_legacy(lines, quarantine_dir):
+    """
+    "src,dst" lines as journal "done" entries. Paths were written unquoted and
+    may mix / (from the folder dialog) with \\ (from os.path.join), so each line
+    is split at the first comma followed by a path inside quarantine_dir.
+    """
+    prefix = _path_key(quarantine_dir)
+    for line in lines:
+        cut = line.find(",")
+        while cut > 0:
+            dst = _path_key(line[cut + 1:])
+            if dst.startswith(prefix) and dst[len(prefix):len(prefix) + 1] in ("/", "\\"):
+                yield {"op": "done", "src": os.path.normpath(line[:cut]), "dst": os.path.normpath(line[cut + 1:])}
+                break
+            cut = line.find(",", cut + 1)
+
+
+def _legacy_moves(quarantine_dir):
+    try:
+        with open(os.path.join(quarantine_dir, LEGACY_LOG_NAME), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return
+    yield from _parse_legacy(lines, quarantine_dir)
+
+
+def load_moves(quarantine_dir):
+    """
+    Moves still in quarantine, newest first, as journal "done" entries. Moves
+    listed in a legacy dupe_log.csv count too, unless the journal says otherwise.
+    """
+    latest = {}
+    for entry in itertools.chain(_legacy_moves(quarantine_dir), read_journal(journal_path_for(quarantine_dir))):
+        if "src" in entry:
+            latest.pop(entry["src"], None)  # keep insertion order = order of last change
+            latest[entry["src"]] = entry
+    return [e for e in reversed(latest.values()) if e["op"] == "done"]
+
+
+def _free_name(path):
+    stem, ext = os.path.splitext(path)
+    n = 1
+    candidate = f"{stem} (restored){ext}"
+    while os.path.lexists(candidate):
+        n += 1
+        candidate = f"{stem} (restored {n}){ext}"
+    return candidate
+
+
+def _verify(entry, st, verify, recorded):
+    """Return None when the quarantined file still looks like what was moved, else why not."""
+    if verify == "none":
+        return None
+    if entry.get("size") is not None and st.st_size != entry["size"]:
+        return f"size changed ({entry['size']} → {st.st_size})"
+    if verify == "mtime" and entry.get("mtime") is not None and abs(st.st_mtime - entry["mtime"]) > MTIME_TOLERANCE:
+        return "modified since it was quarantined"
+    if verify == "hash" and recorded and recorded[3]:
+        # Renamed files keep size, mtime and inode; anything else has to be re-read
+        if (recorded[:3] != (st.st_size, st.st_mtime_ns, st.st_ino)
+                and hash_file(entry["dst"], algorithm_of(recorded[3])) != recorded[3]):
+            return "content differs from the scanned file"
+    return None
+
+
+def _copy_over(dst, src):
+    """
+    Cross-device overwrite: copy to a temporary name next to src, then replace
+    src in one step, so src is never left half-written.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(src), prefix=".restoring-")
+    try:
+        with open(dst, "rb") as fin, os.fdopen(fd, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+        shutil.copystat(dst, tmp_path)
+        os.replace(tmp_path, src)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    os.unlink(dst)
+
+
+def _restore_one(entry, verify, conflict, recorded):
+    """Put one quarantined file back; returns (status, path restored to or reason)."""
+    src, dst = entry["src"], entry["dst"]
+    try:
+        st = os.lstat(dst)
+    except FileNotFoundError:
+        return "missing", "no longer in quarantine"
+    problem = _verify(entry, st, verify, recorded)
+    if problem:
+        return "changed", problem
+
+    if conflict == "overwrite":
+        try:
+            os.replace(dst, src)  # same device: a rename, which also overwrites
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            _copy_over(dst, src)
+        return "restored", src
+
+    target = src
+    while True:
+        # No check-then-move: a file that shows up at target in between must not be overwritten
+        try:
+            move_no_clobber(dst, target)
+            return "restored", target
+        except FileExistsError:
+            if conflict == "skip":
+                return "conflict", "original path is in use"
+            target = _free_name(src)
+
+
+def restore_quarantine(quarantine_dir, workers=RESTORE_WORKERS, verify="size", conflict="skip",
+                       cache=None, cancel=None, on_file=None, batch_size=BATCH_SIZE):
+    """
+    Move files recorded in a quarantine folder's journal back where they came from.
+
+    Moves are undone newest first, in batches: original folders are created once
+    per batch and files are restored on a pool of `workers` threads (a rename on
+    the same device, copy + delete otherwise). A folder that cannot be created
+    fails the files restored into it. Before a file goes back it is
+    checked against the journal according to verify:
+        "none", "size", "mtime" (size and mtime) or "hash" (size, then the full
+        digest the HashCache recorded for the original path; needs cache)
+    If something already exists at the original path, conflict decides:
+        "skip" it, restore next to it as "name (restored).ext", or "overwrite" it.
+
+    Each restore is journaled, so running it again only retries what is left.
+    on_file(src, status, detail) is called per file with status "restored",
+    "missing", "changed", "conflict" or "failed". Returns counts per status.
+    """
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"Unknown verify mode: {verify}")
+    if conflict not in CONFLICT_MODES:
+        raise ValueError(f"Unknown conflict mode: {conflict}")
+    if verify == "hash" and cache is None:
+        raise ValueError("verify='hash' needs a HashCache")
+
+    moves = load_moves(quarantine_dir)
+    stats = dict.fromkeys(("restored", "missing", "changed", "conflict", "failed"), 0)
+    stats["cancelled"] = False
+    made_dirs = set()
+    with MoveJournal(journal_path_for(quarantine_dir)) as journal, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        journal.record("start", restore=True, at=time.time())
+        for start in range(0, len(moves), batch_size):
+            if cancel and cancel():
+                stats["cancelled"] = True
+                break
+            batch = moves[start:start + batch_size]
+            blocked = {}
+            for folder in {os.path.dirname(e["src"]) for e in batch} - made_dirs:
+                try:
+                    os.makedirs(folder, exist_ok=True)
+                    made_dirs.add(folder)
+                except OSError as e:
+                    blocked[folder] = e
+
+            # The cache connection stays on this thread; workers get the rows they need
+            recorded = {e["src"]: cache.recorded(e["src"]) for e in batch} if verify == "hash" else {}
+            futures = [(e, None if os.path.dirname(e["src"]) in blocked
+                        else pool.submit(_restore_one, e, verify, conflict, recorded.get(e["src"])))
+                       for e in batch]
+            for entry, future in futures:
+                try:
+                    if future is None:  # its original folder could not be created
+                        status, detail = "failed", str(blocked[os.path.dirname(entry["src"])])
+                    else:
+                        status, detail = future.result()
+                except OSError as e:
+                    status, detail = "failed", str(e)
+                if status == "restored":
+                    journal.record("restored", src=entry["src"], dst=entry["dst"], to=detail)
+                stats[status] += 1
+                if on_file:
+                    on_file(entry["src"], status, detail)
+            journal.sync()
+    return stats
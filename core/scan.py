@@ -0,0 +1,169 @@
+# scan.py
+
+from core.file_table import FileTable
+from core.find_duplicates_hash import FULL_ALGORITHM, PARTIAL_ALGORITHM, refine_by_content
+from core.grouping import group_rows, iter_groups
+from core.hashing import new_hasher
+from core.metrics import stage
+from core.normalize import DEFAULT_RULE_SETS, get_normalizer
+from core.snapshot import restat_rows
+
+# === CONFIG ===
+# Match criteria shared by the GUI checkboxes and the CLI --match flag
+CRITERIA = ("name", "size", "ext", "created", "modified", "content")
+DEFAULT_CRITERIA = ("name", "size", "ext")
+HASH_TIERS = ("partial", "full")
+HASH_BATCH_FILES = 2048  # candidates hashed per batch before groups are emitted
+MIN_GROUP_BUFFER = 256 * 1024  # least of a --max-memory budget left to the grouping sort buffer
+GROUP_INDEX_BYTES = 16         # per row: the rows and offsets arrays group_rows returns, at most
+# Kept out of a --max-memory budget for the scan's bounded working sets: walk
+# listings in flight, one hash batch's paths and the snapshot's write chunks
+WORKING_MEMORY = 1024 * 1024
+
+
+class ScanCancelled(Exception):
+    """Raised from a progress callback to stop a scan early."""
+
+
+def add_stage_stats(totals, stage_stats):
+    """Fold per-batch stage dicts from refine_by_content into running totals keyed by stage."""
+    for stage in stage_stats:
+        total = totals.setdefault(stage["stage"], dict.fromkeys(stage, 0))
+        for key, value in stage.items():
+            if key != "stage":
+                total[key] += value
+        total["stage"] = stage["stage"]
+    return totals
+
+
+def table_budget(max_memory):
+    """
+    Bytes the FileTable may take (scan_table's max_table_bytes) when a whole
+    scan has to fit in max_memory bytes; the rest goes to grouping and
+    WORKING_MEMORY. Raises ValueError when nothing would be left for the table.
+    """
+    reserved = MIN_GROUP_BUFFER + WORKING_MEMORY
+    if max_memory <= reserved:
+        raise ValueError(f"{max_memory // 1_048_576} MB is too little memory for a scan; "
+                         f"allow at least {reserved // 1_048_576 + 1} MB")
+    return max_memory - reserved
+
+
+def group_buffer_for(table, max_memory):
+    """
+    The grouping sort buffer left of max_memory once table, the group index
+    and WORKING_MEMORY are held. Raises ValueError when that is under MIN_GROUP_BUFFER.
+    """
+    left = max_memory - table.estimated_nbytes() - GROUP_INDEX_BYTES * len(table) - WORKING_MEMORY
+    if left < MIN_GROUP_BUFFER:
+        raise ValueError(f"{max_memory // 1_048_576} MB is too little memory to group {len(table)} files; "
+                         f"allow at least {(max_memory - left + MIN_GROUP_BUFFER) // 1_048_576 + 1} MB")
+    return left
+
+
+def iter_duplicate_groups(table, criteria, hash_tier="full", cache=None, hash_service=None, stage_totals=None,
+                          metrics=None, name_rules=DEFAULT_RULE_SETS, group_buffer=None,
+                          partial_algorithm=PARTIAL_ALGORITHM, full_algorithm=FULL_ALGORITHM):
+    """
+    Yield duplicate groups from a scanned FileTable as lists of row ids.
+
+    Metadata criteria are grouped in one pass over the table. If "content" is
+    one of the criteria, the metadata groups are then hashed in batches of about
+    HASH_BATCH_FILES files and each batch's groups are yielded as soon as they
+    are confirmed, so callers can act on early groups while hashing continues.
+    hash_tier="partial" stops after the partial hash. Stage counts are added to
+    the stage_totals dict when one is given. With a core.metrics.Metrics, grouping
+    and hashing are timed as the "group" and "hash" stages. name_rules picks the
+    core.normalize rule sets the "name" criterion strips copy markers with.
+    group_buffer (bytes) caps the grouping sort's buffer; past it, sorted runs
+    spill to disk (see core.external_group) and stage_totals gets a "group"
+    entry with their counts. partial_algorithm and full_algorithm name the
+    core.hashing algorithms of the two content tiers.
+    """
+    # Validate eagerly: a generator would only raise on the first next()
+    unknown = set(criteria) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown match criteria: {', '.join(sorted(unknown))}")
+    if hash_tier not in HASH_TIERS:
+        raise ValueError(f"Unknown hash tier: {hash_tier}")
+    name_key = get_normalizer(tuple(name_rules))
+    algorithms = (partial_algorithm, full_algorithm)
+    for algorithm in algorithms:
+        new_hasher(algorithm)  # raises ValueError for an unknown or missing one
+    return _iter_groups(table, criteria, hash_tier, cache, hash_service, stage_totals, metrics, name_key,
+                        group_buffer, algorithms)
+
+
+def _iter_groups(table, criteria, hash_tier, cache, hash_service, stage_totals, metrics, name_key,
+                 group_buffer, algorithms):
+    # Identical content implies identical size, so hashing only compares same-size files
+    match_content = "content" in criteria
+    key_fields = [k for k in criteria if k != "content"]
+    if match_content and "size" not in key_fields:
+        key_fields.append("size")
+
+    spill_stats = {}
+    with stage(metrics, "group"):
+        rows, offsets = group_rows(table, key_fields, name_key, group_buffer, spill_stats)
+    if spill_stats and stage_totals is not None:
+        stage_totals["group"] = dict({"stage": "group"}, **spill_stats)
+    if not match_content:
+        for group in iter_groups(rows, offsets):
+            yield list(group)
+        return
+
+    batch, batch_files = [], 0
+    groups = iter_groups(rows, offsets)
+    while True:
+        group = next(groups, None)
+        if group is not None:
+            batch.append(group)
+            batch_files += len(group)
+            if batch_files < HASH_BATCH_FILES:
+                continue
+        if not batch:
+            return
+
+        path_groups = [[table.path(i) for i in members] for members in batch]
+        row_of = {p: i for members, paths in zip(batch, path_groups) for i, p in zip(members, paths)}
+        stage_stats = []
+        with stage(metrics, "hash"):
+            refined = refine_by_content(path_groups, stage_stats, cache=cache, hash_service=hash_service,
+                                        full=hash_tier == "full", partial_algorithm=algorithms[0],
+                                        full_algorithm=algorithms[1], metrics=metrics)
+        for paths in refined:
+            yield [row_of[p] for p in paths]
+        if stage_totals is not None:
+            add_stage_stats(stage_totals, stage_stats)
+        batch, batch_files = [], 0
+
+
+def recheck_groups(table, groups, criteria, follow_symlinks=False, stats=None, changed_rows=None, **kwargs):
+    """
+    Re-stat the rows of each group before it is reported, e.g. after an
+    incremental scan reused them from a snapshot: a file rewritten in place does
+    not change its folder's mtime, so its row may be stale. Groups whose files
+    are unchanged pass through; the others are regrouped among their remaining
+    files with iter_duplicate_groups (kwargs as there). The new stat data is
+    written back into table and the rows it changed are added to the
+    changed_rows set. stats (a dict) counts files_rechecked and groups_rechecked.
+    """
+    stats = {} if stats is None else stats
+    stats.setdefault("files_rechecked", 0)
+    stats.setdefault("groups_rechecked", 0)
+    for rows in groups:
+        changed, vanished = restat_rows(table, rows, follow_symlinks)
+        stats["files_rechecked"] += len(rows)
+        if not changed and not vanished:
+            yield rows
+            continue
+        stats["groups_rechecked"] += 1
+        if changed_rows is not None:
+            changed_rows.update(changed)
+        live = [i for i in rows if i not in vanished]
+        subtable = FileTable()
+        for i in live:
+            subtable.append(table.path(i), table.size[i], table.mtime[i], table.ctime[i], table.inode[i],
+                            table.dev[i])
+        for sub_rows in iter_duplicate_groups(subtable, criteria, **kwargs):
+            yield [live[j] for j in sub_rows]
@@ -0,0 +1,140 @@
+# scan_result.py
+
+import os
+import csv
+from array import array
+from datetime import datetime
+from core.file_table import FileTable
+from core.grouping import iter_groups
+from core.keep import DEFAULT_KEEP_POLICY, in_reference, keep_key
+from core.mover import roots_quarantine_path
+from core.snapshot import default_snapshot_path, load_snapshot, root_list, snapshot_roots
+
+# === CONFIG ===
+REPORT_FIELDS = ["Group", "Action", "Path", "Size (Bytes)", "Date Created", "Date Modified", "Moved To"]
+
+
+class ScanResult:
+    """
+    The duplicate groups of one scan plus the FileTable rows they point into, so
+    the move, the dry run and the report act on exactly the groups the scan
+    showed, without walking the tree again. Groups are packed like group_rows
+    output: group g is rows[offsets[g]:offsets[g + 1]].
+
+    On disk it is the folder's scan snapshot (core.snapshot), which already
+    holds the table and the groups; load() rebuilds it from there. root may be
+    a list of roots for a multi-root scan; self.root is then the first.
+    """
+
+    def __init__(self, root, table, rows, offsets, criteria=None, options=None, name_rules=None):
+        self.roots = root_list(root)
+        self.root = self.roots[0]
+        self.table = table
+        self.rows = rows
+        self.offsets = offsets
+        self.criteria = criteria
+        self.options = options or {}
+        self.name_rules = name_rules
+
+    @classmethod
+    def from_groups(cls, root, table, groups, **kwargs):
+        """Build from lists of row ids (as yielded by iter_duplicate_groups)."""
+        rows, offsets = array("q"), array("q", [0])
+        for group in groups:
+            rows.extend(group)
+            offsets.append(len(rows))
+        return cls(root, table, rows, offsets, **kwargs)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        table = FileTable()
+        dir_list = snapshot["dir_list"]
+        for dir_index, name, size, mtime, ctime, inode, dev in snapshot["files"]:
+            table.append(os.path.join(dir_list[dir_index], name), size, mtime, ctime, inode, dev)
+        row_of = {table.path(i): i for i in range(len(table))}
+        groups = [[row_of[p] for p in group if p in row_of] for group in snapshot["groups"]]
+        return cls.from_groups(snapshot_roots(snapshot), table, [g for g in groups if len(g) > 1],
+                               criteria=snapshot.get("criteria"), options=snapshot.get("options"),
+                               name_rules=snapshot.get("name_rules"))
+
+    @classmethod
+    def load(cls, folder, snapshot_path=None):
+        """The last scan result saved for folder (or list of roots), or None if there is none."""
+        snapshot = load_snapshot(snapshot_path or default_snapshot_path(folder))
+        if not snapshot or snapshot_roots(snapshot) != root_list(folder) or snapshot.get("groups") is None:
+            return None
+        return cls.from_snapshot(snapshot)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def groups(self):
+        """Each group as a slice of row ids."""
+        return iter_groups(self.rows, self.offsets)
+
+    def group_paths(self):
+        return [[self.table.path(i) for i in group] for group in self.groups()]
+
+    def is_current(self, i):
+        """True while row i's file still has the size, mtime and inode the scan saw."""
+        table = self.table
+        try:
+            st = os.stat(table.path(i)) if self.options.get("follow_symlinks") else os.lstat(table.path(i))
+        except OSError:
+            return False
+        if table.inode[i] and st.st_ino and st.st_ino != table.inode[i]:
+            return False
+        return st.st_size == table.size[i] and st.st_mtime == table.mtime[i]
+
+    def plan(self, policy=DEFAULT_KEEP_POLICY, preferred_dirs=(), on_stale=None, reference_dirs=()):
+        """
+        Yield (group index, keeper row, [duplicate rows]) for every group. Each
+        file is checked with one lstat against the scan's stat data; files that
+        changed or vanished since are left out (reported via on_stale(path)),
+        and groups with fewer than two unchanged files are skipped.
+        Files inside reference_dirs are kept first and never listed as duplicates.
+        """
+        key = keep_key(policy, preferred_dirs, reference_dirs)
+        for g, group in enumerate(self.groups()):
+            current = []
+            for i in group:
+                if self.is_current(i):
+                    current.append(i)
+                elif on_stale:
+                    on_stale(self.table.path(i))
+            if len(current) < 2:
+                continue
+            keeper = min(current, key=lambda i: key(self.table.entry(i)))
+            yield g, keeper, [i for i in current
+                              if i != keeper and not in_reference(self.table.path(i), reference_dirs)]
+
+    def quarantine_path(self, path, quarantine_dir):
+        return roots_quarantine_path(path, self.roots, quarantine_dir)
+
+    def plan_moves(self, quarantine_dir, policy=DEFAULT_KEEP_POLICY, preferred_dirs=(), on_stale=None,
+                   reference_dirs=()):
+        """(src, dst) pairs that move every duplicate but each group's keeper into quarantine_dir."""
+        return [(self.table.path(i), self.quarantine_path(self.table.path(i), quarantine_dir))
+                for _, _, duplicates in self.plan(policy, preferred_dirs, on_stale, reference_dirs)
+                for i in duplicates]
+
+    def write_report(self, path, quarantine_dir=None, policy=DEFAULT_KEEP_POLICY, preferred_dirs=(),
+                     reference_dirs=()):
+        """CSV of every group: which file is kept and where each duplicate would be moved."""
+        table = self.table
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            for g, keeper, duplicates in self.plan(policy, preferred_dirs, reference_dirs=reference_dirs):
+                for i in [keeper] + duplicates:
+                    src = table.path(i)
+                    writer.writerow({
+                        "Group": g + 1,
+                        "Action": "keep" if i == keeper else "move",
+                        "Path": src,
+                        "Size (Bytes)": table.size[i],
+                        "Date Created": datetime.fromtimestamp(table.ctime[i]),
+                        "Date Modified": datetime.fromtimestamp(table.mtime[i]),
+                        "Moved To": self.quarantine_path(src, quarantine_dir)
+                        if quarantine_dir and i != keeper else "",
+                    })
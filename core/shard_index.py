@@ -0,0 +1,291 @@
+# shard_index.py
+"""
+Sharded scans for trees too big for one process: each shard worker walks one
+subtree and writes a partial index; merge_shards() then streams every partial
+index into global duplicate groups, with the stages of find_duplicates_by_hash
+(size, then partial hash, then full hash), without walking anything again.
+Workers can be local processes (shard_folder) or other machines writing into
+a shared directory.
+
+Shard file format – one SQLite file per shard, named <name>.shard.sqlite:
+
+    meta (key TEXT PRIMARY KEY, value TEXT)      values are JSON
+        format             SHARD_FORMAT; readers reject other versions
+        root               absolute path of the folder the shard covers
+        recursive          false for a shard of a folder's own files only
+        hash               hash level the shard was written with (HASH_LEVELS)
+        edge_size          bytes per end hashed for partial digests
+        partial_algorithm  full_algorithm   (see core.hashing)
+        files  bytes  errors  host  created
+
+    files (size INTEGER, path TEXT, mtime REAL, partial TEXT, full TEXT)
+        one row per file; partial/full are core.hashing digests, NULL when
+        the shard did not compute them; indexed on (size, path)
+
+A shard is written under a temporary name and renamed once complete, so a
+shard directory only ever holds finished shards.
+
+HASH_LEVELS – what a shard hashes up front:
+    local  partial digests for sizes seen twice in the shard, full digests for
+           partial collisions; the merge hashes the rest itself (it has to be
+           able to read the files)
+    all    partial digests for every file, full digests for partial collisions
+           in the shard; the merge only reads files for cross-shard collisions
+    full   partial and full digests for every file; the merge never reads files
+"""
+
+import os
+import json
+import heapq
+import socket
+import sqlite3
+import hashlib
+import pathlib
+import functools
+import itertools
+from datetime import datetime
+from core.find_duplicates_hash import (FULL_ALGORITHM, PARTIAL_ALGORITHM, PARTIAL_HASH_SIZE, compute_digests,
+                                       split_by_digest, get_file_hash, get_partial_hash)
+from core.hash_service import HashService
+from core.snapshot import scan_table, walk_options
+from core.walker import DEFAULT_WALK_WORKERS, list_dir
+
+# === CONFIG ===
+SHARD_FORMAT = 1
+SHARD_SUFFIX = ".shard.sqlite"
+HASH_LEVELS = ("local", "all", "full")
+DEFAULT_HASH_LEVEL = "all"
+INSERT_BATCH = 10_000
+
+SCHEMA = """
+CREATE TABLE meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE files (
+    size    INTEGER NOT NULL,
+    path    TEXT NOT NULL,
+    mtime   REAL NOT NULL,
+    partial TEXT,
+    full    TEXT
+);
+"""
+
+
+def shard_name(folder, recursive=True):
+    """File name for a shard of folder: readable, and unique per absolute path."""
+    folder = os.path.abspath(folder)
+    key = hashlib.sha1(folder.encode("utf-8")).hexdigest()[:8]
+    base = os.path.basename(folder.rstrip(os.sep)) or "root"
+    return f"{base}-{key}{'' if recursive else '-files'}{SHARD_SUFFIX}"
+
+
+def _collisions(paths, key):
+    """Paths whose key(path) is shared with at least one other path."""
+    counts = {}
+    for p in paths:
+        counts[key(p)] = counts.get(key(p), 0) + 1
+    return [p for p in paths if counts[key(p)] > 1]
+
+
+def write_shard(out_path, folder, recursive=True, hash_level=DEFAULT_HASH_LEVEL, file_filter=None,
+                edge_size=PARTIAL_HASH_SIZE, partial_algorithm=PARTIAL_ALGORITHM, full_algorithm=FULL_ALGORITHM,
+                cache=None, hash_service=None, workers=DEFAULT_WALK_WORKERS, on_error=None, metrics=None,
+                walker=None, **walk_kwargs):
+    """
+    Walk folder (only its own files with recursive=False), hash what hash_level
+    asks for and write the shard to out_path. file_filter(path) can skip files,
+    like find_duplicates_by_hash's image filter. Returns the shard's meta dict.
+    """
+    if hash_level not in HASH_LEVELS:
+        raise ValueError(f"Unknown hash level: {hash_level}")
+    folder = os.path.abspath(folder)
+    errors = 0
+
+    def count_error(path, e):
+        nonlocal errors
+        errors += 1
+        if on_error:
+            on_error(path, e)
+
+    if recursive:
+        table, _, _, _ = scan_table(folder, workers=workers, on_error=count_error, metrics=metrics, walker=walker,
+                                    **walk_kwargs)
+        entries = (table.entry(i) for i in range(len(table)))
+    else:
+        options = walk_options(**walk_kwargs)
+        entries, _, list_errors, _ = list_dir(folder, options["follow_symlinks"], options["skip_quarantine"],
+                                              options["exclude_dirs"], options["exclude_exts"], metrics=metrics)
+        for path, e in list_errors:
+            count_error(path, e)
+    files = {e.path: (e.size, e.mtime) for e in entries if not file_filter or file_filter(e.path)}
+    size_of = lambda p: files[p][0]
+
+    paths = list(files) if hash_level != "local" else _collisions(list(files), size_of)
+    partial_hash = functools.partial(get_partial_hash, edge_size=edge_size, algorithm=partial_algorithm)
+    partials = compute_digests(paths, partial_hash, "partial", edge_size, cache, hash_service, partial_algorithm,
+                               metrics, lambda p: min(size_of(p), 2 * edge_size))
+    large = [p for p in partials if size_of(p) > 2 * edge_size]
+    if hash_level != "full":
+        large = _collisions(large, lambda p: (size_of(p), partials[p]))
+    full_hash = functools.partial(get_file_hash, algorithm=full_algorithm)
+    fulls = compute_digests(large, full_hash, "full", cache=cache, hash_service=hash_service,
+                            algorithm=full_algorithm, metrics=metrics, read_size=size_of)
+
+    meta = {"format": SHARD_FORMAT, "root": folder, "recursive": recursive, "hash": hash_level,
+            "edge_size": edge_size, "partial_algorithm": partial_algorithm, "full_algorithm": full_algorithm,
+            "files": len(files), "bytes": sum(size for size, _ in files.values()), "errors": errors,
+            "host": socket.gethostname(), "created": datetime.now().isoformat(timespec="seconds")}
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(SCHEMA)
+        rows = ((size, path, mtime, partials.get(path), fulls.get(path)) for path, (size, mtime) in files.items())
+        while batch := list(itertools.islice(rows, INSERT_BATCH)):
+            conn.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?)", batch)
+        conn.execute("CREATE INDEX files_size ON files (size, path)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in meta.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, out_path)
+    return meta
+
+
+def _write_shard_job(out_path, folder, recursive, hash_workers, kwargs):
+    # Runs in a worker process: each process hashes on its own pool
+    if hash_workers:
+        with HashService(workers=hash_workers) as hash_service:
+            return out_path, write_shard(out_path, folder, recursive, hash_service=hash_service, **kwargs)
+    return out_path, write_shard(out_path, folder, recursive, **kwargs)
+
+
+def shard_folder(folder, out_dir, jobs=os.cpu_count() or 1, hash_workers=0, on_shard=None, **kwargs):
+    """
+    Write one shard per top-level subfolder of folder, plus one for its own
+    files, on `jobs` local processes. kwargs go to write_shard (no cache or
+    hash_service: those do not cross process boundaries). on_shard(path, meta)
+    is called as each shard is finished. Returns the shard paths.
+    """
+    folder = os.path.abspath(folder)
+    options = walk_options(**{k: kwargs[k] for k in ("exclude_exts", "exclude_dirs", "follow_symlinks",
+                                                      "skip_quarantine") if k in kwargs})
+    _, subdirs, errors, _ = list_dir(folder, options["follow_symlinks"], options["skip_quarantine"],
+                                     options["exclude_dirs"], options["exclude_exts"])
+    for path, e in errors:
+        if path == folder:  # the folder itself could not be listed
+            raise e
+    jobs_list = [(folder, False)] + [(path, True) for path, _ in subdirs]
+    paths = []
+    from concurrent.futures import ProcessPoolExecutor  # multiprocessing only when jobs run
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(_write_shard_job, os.path.join(out_dir, shard_name(path, recursive)), path,
+                               recursive, hash_workers, kwargs) for path, recursive in jobs_list]
+        for future in futures:
+            path, meta = future.result()
+            paths.append(path)
+            if on_shard:
+                on_shard(path, meta)
+    return paths
+
+
+def find_shards(paths):
+    """Shard files among paths, looking inside directories for *.shard.sqlite."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, n) for n in sorted(os.listdir(path)) if n.endswith(SHARD_SUFFIX))
+        else:
+            found.append(path)
+    return found
+
+
+def _open_read_only(path):
+    return sqlite3.connect(pathlib.Path(path).absolute().as_uri() + "?mode=ro", uri=True)
+
+
+def read_meta(path):
+    conn = _open_read_only(path)
+    try:
+        meta = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+    finally:
+        conn.close()
+    if meta.get("format") != SHARD_FORMAT:
+        raise ValueError(f"{path}: unsupported shard format {meta.get('format')}")
+    return meta
+
+
+def check_shards(metas):
+    """Raise ValueError when shards overlap or were hashed with different settings."""
+    for key in ("edge_size", "partial_algorithm", "full_algorithm"):
+        values = {m[key] for m in metas}
+        if len(values) > 1:
+            raise ValueError(f"Shards disagree on {key}: {', '.join(map(str, sorted(values)))}")
+    for a, b in itertools.permutations(metas, 2):
+        inside = b["root"] == a["root"] or b["root"].startswith(os.path.join(a["root"], ""))
+        if inside and (a["recursive"] or b["root"] == a["root"]):
+            raise ValueError(f"Shards overlap: {a['root']} and {b['root']}")
+
+
+def _iter_rows(path):
+    """(size, path, partial, full, mtime) rows of one shard, by size then path, read lazily."""
+    conn = _open_read_only(path)
+    try:
+        yield from conn.execute("SELECT size, path, partial, full, mtime FROM files ORDER BY size, path")
+    finally:
+        conn.close()
+
+
+def merge_shards(shard_paths, hash_missing=True, cache=None, hash_service=None, stats=None, metrics=None):
+    """
+    Yield global duplicate groups, as lists of (path, size, mtime), from shard
+    files. The shards are read side by side in size order, so only one size
+    bucket is in memory at a time. Within a bucket, files are split by partial
+    and then full digest, exactly as refine_by_content does; digests a shard did
+    not compute are computed here when hash_missing is set, else such files are
+    left out and counted as "unresolved". A stats dict gets the totals.
+    """
+    metas = [read_meta(p) for p in shard_paths]
+    check_shards(metas)
+    stats = {} if stats is None else stats
+    stats.update(shards=len(metas), files=sum(m["files"] for m in metas), buckets=0, hashed_at_merge=0,
+                 unresolved=0, groups=0, duplicate_files=0)
+    if not metas:
+        return
+    edge_size = metas[0]["edge_size"]
+    partial_hash = functools.partial(get_partial_hash, edge_size=edge_size,
+                                     algorithm=metas[0]["partial_algorithm"])
+    full_hash = functools.partial(get_file_hash, algorithm=metas[0]["full_algorithm"])
+
+    def fill(rows, column, compute, kind):
+        """digest by path for rows, computing what the shards left out."""
+        digests = {row[1]: row[column] for row in rows if row[column]}
+        missing = [row[1] for row in rows if not row[column]]
+        if missing and hash_missing:
+            computed = compute_digests(missing, compute, kind, edge_size if kind == "partial" else None, cache,
+                                       hash_service, metas[0][f"{kind}_algorithm"], metrics)
+            stats["hashed_at_merge"] += len(computed)
+            digests.update(computed)
+        stats["unresolved"] += sum(1 for row in rows if row[1] not in digests)
+        return digests
+
+    merged = heapq.merge(*(_iter_rows(p) for p in shard_paths), key=lambda row: (row[0], row[1]))
+    for size, bucket in itertools.groupby(merged, key=lambda row: row[0]):
+        bucket = list(bucket)
+        if len(bucket) < 2:
+            continue
+        stats["buckets"] += 1
+        by_path = {row[1]: row for row in bucket}
+        groups = split_by_digest([list(by_path)], fill(bucket, 2, partial_hash, "partial"))
+        if size > 2 * edge_size:  # smaller files were hashed whole by the partial stage
+            groups = [g for group in groups
+                      for g in split_by_digest([group], fill([by_path[p] for p in group], 3, full_hash, "full"))]
+        for group in groups:
+            stats["groups"] += 1
+            stats["duplicate_files"] += len(group)
+            yield [(p, size, by_path[p][4]) for p in group]
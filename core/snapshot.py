@@ -0,0 +1,383 @@
+# snapshot.py
+
+import os
+import gzip
+import contextlib
+import json
+import time
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from core.file_table import FileTable
+from core.walker import walk_files, list_dir, normalize_exts, DEFAULT_WALK_WORKERS
+
+# === CONFIG ===
+SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".dupedoctor", "snapshots")
+SNAPSHOT_VERSION = 1
+PROGRESS_EVERY = 1000  # files between progress callbacks
+WRITE_CHUNK = 256      # file rows or groups encoded at a time when writing a snapshot
+DELTA_SUFFIX = ".delta"   # appended after an incremental scan instead of rewriting the snapshot
+MAX_DELTAS = 50           # deltas appended before the snapshot is rewritten in one piece
+COMPACT_RATIO = 0.5       # ... or once the deltas hold this many files per file in the table
+
+# Snapshot file (gzip-compressed JSON):
+# {
+#   "version": 1,
+#   "root": "/abs/scanned/folder",
+#   "roots": ["/abs/a", "/abs/b"],          # every root of a multi-root scan (root is the first)
+#   "saved_at": 1700000000.0,
+#   "options": {...},                       # walk options the scan used
+#   "criteria": ["name", "size", ...],      # what the groups were matched on
+#   "dirs": {"/abs/dir": mtime_ns, ...},    # every directory listed
+#   "dir_list": ["/abs/dir", ...],          # FileTable.dirs
+#   "files": [[dir_index, name, size, mtime, ctime, inode, dev], ...],
+#   "groups": [["/path/a", "/path/b"], ...] # duplicate groups found by that scan
+#   "name_rules": ["windows", ...]          # core.normalize rule sets of the name criterion (optional)
+# }
+# Together, files and groups are the scan's result: core.scan_result.ScanResult.load
+# rebuilds it so a later move or report does not have to walk again.
+#
+# An incremental scan appends a delta to <snapshot>.delta (gzip members, one JSON
+# line each) rather than rewriting everything:
+# {"base": saved_at of the snapshot, "saved_at": ..., "criteria": [...], "name_rules": [...],
+#  "dirs": {"/abs/dir": mtime_ns, ...},      # directories re-listed, added or with rows re-stat'ed
+#  "removed": ["/abs/dir", ...],             # directories gone since
+#  "files": [["/abs/dir", name, size, mtime, ctime, inode, dev], ...],  # every row of those dirs
+#  "groups": [[...], ...]}                   # the full new group list
+# load_snapshot applies the deltas whose base matches, so readers see one snapshot.
+
+
+def root_list(folder):
+    """Absolute roots for one folder or a list of folders."""
+    folders = [folder] if isinstance(folder, (str, os.PathLike)) else folder
+    return [os.path.abspath(f) for f in folders]
+
+
+def check_roots(roots):
+    """Raise ValueError when a root lies inside another one (its files would be scanned twice)."""
+    for i, a in enumerate(roots):
+        for b in roots[i + 1:]:
+            if a == b or b.startswith(os.path.join(a, "")) or a.startswith(os.path.join(b, "")):
+                raise ValueError(f"Overlapping roots: {a} and {b}")
+
+
+def snapshot_roots(snapshot):
+    return snapshot.get("roots") or [snapshot["root"]]
+
+
+def default_snapshot_path(folder, kind="metadata"):
+    """Snapshot location under ~/.dupedoctor/snapshots for a folder (or a list of roots)."""
+    key = hashlib.sha1(os.pathsep.join(root_list(folder)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SNAPSHOT_DIR, f"{key}-{kind}.json.gz")
+
+
+def save_snapshot(path, root, table, dir_mtimes, groups, options=None, criteria=None, name_rules=None,
+                  base=None, changed_dirs=()):
+    """
+    Write a snapshot; options should be walk_options(...) for the walk that built
+    table, and criteria whatever the groups were matched on. root may be a list
+    of roots for a multi-root scan.
+
+    base is the snapshot an incremental scan_table reused: then only the rows of
+    directories whose mtime moved (plus changed_dirs, e.g. those of re-stat'ed
+    rows) are appended as a delta, until the deltas are due for compaction or
+    loading base found a torn one.
+    Otherwise the snapshot is written in one piece, streaming file rows and
+    groups (any iterable of path lists, read once) in chunks of WRITE_CHUNK.
+    """
+    if base is not None and _append_delta(path, base, table, dir_mtimes, groups, criteria, name_rules,
+                                          changed_dirs):
+        return
+    roots = root_list(root)
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "root": roots[0],
+        "saved_at": time.time(),
+        "options": options if options is not None else walk_options(),
+        "criteria": criteria,
+        "dirs": dir_mtimes,
+        "dir_list": table.dirs,
+        "name_rules": list(name_rules) if name_rules else None,
+    }
+    if len(roots) > 1:
+        data["roots"] = roots
+    rows = ([table.dir_id[i], table.names[i], table.size[i], table.mtime[i], table.ctime[i], table.inode[i],
+             table.dev[i]] for i in range(len(table)))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        # Same JSON as one json.dump, without building the rows of a whole tree first
+        f.write(json.dumps(data, separators=(",", ":"))[:-1])
+        for key, values in (("files", rows), ("groups", groups)):
+            f.write(f',"{key}":[')
+            _write_chunks(f, values)
+            f.write("]")
+        f.write("}")
+    os.replace(tmp_path, path)  # a crash mid-write never leaves a half snapshot behind
+    # Old deltas name the replaced snapshot as their base, so they are ignored even if this fails
+    with contextlib.suppress(OSError):
+        os.remove(path + DELTA_SUFFIX)
+
+
+def _write_chunks(f, values):
+    """Write the items of an iterable as the body of a JSON array, WRITE_CHUNK at a time."""
+    values = iter(values)
+    separator = ""
+    for chunk in iter(lambda: list(itertools.islice(values, WRITE_CHUNK)), []):
+        f.write(separator + json.dumps(chunk, separators=(",", ":"))[1:-1])
+        separator = ","
+
+
+def _append_delta(path, base, table, dir_mtimes, groups, criteria, name_rules, changed_dirs):
+    """Append the changes against base to path's delta file; False when a full rewrite is due."""
+    changed = {d for d, mtime_ns in dir_mtimes.items() if base["dirs"].get(d) != mtime_ns}
+    changed.update(d for d in changed_dirs if d in dir_mtimes)
+    dir_ids = {i for i, d in enumerate(table.dirs) if d in changed}
+    rows = [i for i in range(len(table)) if table.dir_id[i] in dir_ids] if dir_ids else []
+    if (base.get("delta_torn") or base.get("deltas", 0) >= MAX_DELTAS
+            or base.get("delta_files", 0) + len(rows) > COMPACT_RATIO * max(len(table), 1)):
+        return False
+    delta = {
+        "base": base["saved_at"],
+        "saved_at": time.time(),
+        "criteria": criteria,
+        "name_rules": list(name_rules) if name_rules else None,
+        "dirs": {d: dir_mtimes[d] for d in changed},
+        "removed": [d for d in base["dirs"] if d not in dir_mtimes],
+        "files": [[table.dirs[table.dir_id[i]], table.names[i], table.size[i], table.mtime[i],
+                   table.ctime[i], table.inode[i], table.dev[i]] for i in rows],
+        "groups": list(groups),
+    }
+    # Each append is its own gzip member; a torn last one is skipped when loading,
+    # and the save after that rewrites the snapshot instead of appending past it
+    with gzip.open(path + DELTA_SUFFIX, "at", encoding="utf-8") as f:
+        f.write(json.dumps(delta, separators=(",", ":")) + "\n")
+    return True
+
+
+def _apply_deltas(data, path):
+    """Fold the deltas appended after data (a loaded snapshot) into it."""
+    deltas = []
+    try:
+        with gzip.open(path + DELTA_SUFFIX, "rt", encoding="utf-8") as f:
+            for line in f:
+                delta = json.loads(line)
+                if delta.get("base") == data["saved_at"]:
+                    deltas.append(delta)
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, ValueError):
+        # An append cut short by a crash: keep the deltas read before it. Anything
+        # appended after the torn member would be unreadable, so the next save rewrites
+        data["delta_torn"] = True
+    if not deltas:
+        return data
+
+    old_dirs = data["dir_list"]
+    rows_by_dir = {}
+    for dir_index, *row in data["files"]:
+        rows_by_dir.setdefault(old_dirs[dir_index], []).append(row)
+    for delta in deltas:
+        for folder in delta["removed"]:
+            data["dirs"].pop(folder, None)
+            rows_by_dir.pop(folder, None)
+        for folder, mtime_ns in delta["dirs"].items():
+            data["dirs"][folder] = mtime_ns
+            rows_by_dir[folder] = []
+        for folder, *row in delta["files"]:
+            rows_by_dir.setdefault(folder, []).append(row)
+        for key in ("criteria", "name_rules", "groups"):
+            data[key] = delta[key]
+    data["dir_list"] = list(rows_by_dir)
+    data["files"] = [[dir_index, *row] for dir_index, rows in enumerate(rows_by_dir.values()) for row in rows]
+    data["deltas"] = len(deltas)
+    data["delta_files"] = sum(len(delta["files"]) for delta in deltas)
+    return data
+
+
+def load_snapshot(path):
+    """
+    Return the snapshot dict with its deltas applied, or None if it is missing,
+    unreadable or outdated.
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return _apply_deltas(data, path) if data.get("version") == SNAPSHOT_VERSION else None
+
+
+def restat_rows(table, rows, follow_symlinks=False):
+    """
+    Stat rows again and write their current size, mtime, ctime and inode back
+    into table. Returns (changed, vanished): the rows whose stat data moved and
+    the rows whose file is gone (left in table as they were).
+    """
+    changed, vanished = set(), set()
+    stat = os.stat if follow_symlinks else os.lstat
+    for i in rows:
+        try:
+            st = stat(table.path(i))
+        except OSError:
+            vanished.add(i)
+            continue
+        if (st.st_size, st.st_mtime, st.st_ino) != (table.size[i], table.mtime[i], table.inode[i] or st.st_ino):
+            changed.add(i)
+            table.size[i] = st.st_size
+            table.mtime[i] = st.st_mtime
+            table.ctime[i] = st.st_ctime
+            table.inode[i] = st.st_ino
+    return changed, vanished
+
+
+def walk_options(exclude_exts=None, exclude_dirs=None, follow_symlinks=False, skip_quarantine=True):
+    return {
+        "exclude_exts": sorted(normalize_exts(exclude_exts)),
+        "exclude_dirs": sorted(exclude_dirs or ()),
+        "follow_symlinks": follow_symlinks,
+        "skip_quarantine": skip_quarantine,
+    }
+
+
+def _check_budget(table, max_table_bytes):
+    if max_table_bytes and table.estimated_nbytes() > max_table_bytes:
+        raise ValueError(f"The file table outgrew its memory budget ({max_table_bytes // 1_048_576} MB) "
+                         f"after {len(table)} files; allow more memory or scan fewer folders at once")
+
+
+def _rescan(snapshot, options, workers, on_error, progress, metrics=None, walker=walk_files, max_table_bytes=None):
+    """Reuse the snapshot for unchanged directories; re-list only the ones whose mtime moved."""
+    old_dirs = snapshot["dir_list"]
+    rows_by_dir = {}
+    for row in snapshot["files"]:
+        rows_by_dir.setdefault(old_dirs[row[0]], []).append(row)
+
+    list_args = (options["follow_symlinks"], options["skip_quarantine"],
+                 options["exclude_dirs"], options["exclude_exts"], True, metrics)
+
+    def check(folder):
+        try:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        except OSError:
+            return folder, None, None  # directory is gone
+        if mtime_ns == snapshot["dirs"][folder]:
+            return folder, mtime_ns, None
+        return folder, mtime_ns, list_dir(folder, *list_args)
+
+    table = FileTable()
+    dir_mtimes = {}
+    new_dirs = []
+    stats = {"dirs_checked": 0, "dirs_relisted": 0, "dirs_removed": 0, "dirs_added": 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for folder, mtime_ns, listing in pool.map(check, list(snapshot["dirs"])):
+            stats["dirs_checked"] += 1
+            if progress and stats["dirs_checked"] % 100 == 0:
+                progress(len(table))
+            if mtime_ns is None:
+                stats["dirs_removed"] += 1
+            elif listing is None:
+                dir_mtimes[folder] = mtime_ns
+                rows = rows_by_dir.get(folder, ())
+                for _, name, size, mtime, ctime, inode, dev in rows:
+                    table.append(os.path.join(folder, name), size, mtime, ctime, inode, dev)
+                _check_budget(table, max_table_bytes)
+                if metrics:
+                    metrics.count("files", len(rows))
+            else:
+                stats["dirs_relisted"] += 1
+                files, subdirs, errors, listed_mtime = listing
+                dir_mtimes[folder] = listed_mtime or mtime_ns
+                table.extend(files)
+                _check_budget(table, max_table_bytes)
+                new_dirs.extend(path for path, _ in subdirs if path not in snapshot["dirs"])
+                for path, e in errors:
+                    if on_error:
+                        on_error(path, e)
+
+    for folder in new_dirs:
+        before = len(dir_mtimes)
+        _walk_into(table, folder, workers, on_error, dir_mtimes, options, progress, metrics, walker, max_table_bytes)
+        stats["dirs_added"] += len(dir_mtimes) - before
+    return table, dir_mtimes, stats
+
+
+def _walk_into(table, folder, workers, on_error, dir_mtimes, options, progress, metrics=None, walker=walk_files,
+               max_table_bytes=None):
+    for entry in walker(folder, workers=workers, on_error=on_error, on_dir=dir_mtimes.__setitem__,
+                            metrics=metrics, **options):
+        table.append(entry.path, entry.size, entry.mtime, entry.ctime, entry.inode, entry.dev)
+        if len(table) % PROGRESS_EVERY == 0:
+            _check_budget(table, max_table_bytes)
+            if progress:
+                progress(len(table))
+
+
+def scan_table(folder, snapshot_path=None, incremental=False, workers=DEFAULT_WALK_WORKERS,
+               on_error=None, progress=None, metrics=None, walker=None, max_table_bytes=None, **walk_kwargs):
+    """
+    Walk folder (or each folder of a list of roots) into one FileTable,
+    recording every directory's mtime.
+
+    With incremental=True and a snapshot from an earlier scan of the same folder
+    with the same walk options, only directories whose mtime changed are listed
+    again. Directory mtimes change when entries are added, removed or renamed;
+    a file rewritten in place does not touch it, so its row keeps the old stat
+    data: re-stat the rows that matter with restat_rows (see
+    core.scan.recheck_groups), or run a full scan.
+
+    progress(files_so_far) is called every PROGRESS_EVERY files; it may raise to
+    abort the scan. metrics (a core.metrics.Metrics) gets the walk counters.
+    walker replaces core.walker.walk_files (same arguments), e.g. a
+    functools.partial of core.async_walker.walk_files_async for slow mounts.
+    With max_table_bytes, the walk stops with a ValueError as soon as the
+    table's estimated size (FileTable.estimated_nbytes) goes over it.
+    Returns (table, dir_mtimes, previous_snapshot, stats);
+    previous_snapshot is None when there was nothing usable to compare against.
+    """
+    options = walk_options(**walk_kwargs)
+    walker = walker or walk_files
+    roots = root_list(folder)
+    check_roots(roots)
+    previous = load_snapshot(snapshot_path) if snapshot_path else None
+    if previous and (snapshot_roots(previous) != roots or previous["options"] != options):
+        previous = None
+
+    if incremental and previous:
+        table, dir_mtimes, stats = _rescan(previous, options, workers, on_error, progress, metrics, walker,
+                                           max_table_bytes)
+        stats["incremental"] = True
+        return table, dir_mtimes, previous, stats
+
+    table = FileTable()
+    dir_mtimes = {}
+    for root in roots:
+        _walk_into(table, root, workers, on_error, dir_mtimes, options, progress, metrics, walker, max_table_bytes)
+    stats = {"dirs_checked": 0, "dirs_relisted": len(dir_mtimes), "dirs_removed": 0,
+             "dirs_added": 0, "incremental": False}
+    return table, dir_mtimes, previous, stats
+
+
+def diff_groups(old_groups, new_groups):
+    """
+    Compare two lists of duplicate groups (lists of paths). A new group that
+    shares no path with any old group is "added", an old group with no path in
+    any new group is "removed", and overlapping but different groups are
+    "changed" (reported with their new membership).
+    """
+    old_sets = [frozenset(g) for g in old_groups]
+    new_sets = [frozenset(g) for g in new_groups]
+    old_exact = set(old_sets)
+    old_by_path = {p: s for s in old_sets for p in s}
+    new_paths = {p for s in new_sets for p in s}
+
+    delta = {"added": [], "removed": [], "changed": []}
+    for group in new_sets:
+        if group in old_exact:
+            continue
+        overlaps = any(p in old_by_path for p in group)
+        delta["changed" if overlaps else "added"].append(sorted(group))
+    for group in old_sets:
+        if not any(p in new_paths for p in group):
+            delta["removed"].append(sorted(group))
+    return delta
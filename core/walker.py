@@ -0,0 +1,155 @@
+# walker.py
+
+import os
+import time
+import fnmatch
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# === CONFIG ===
+DEFAULT_WALK_WORKERS = 8
+# Listings submitted but not yet consumed, per worker. Finished listings wait
+# for the consumer with all their FileEntry records, so this bounds the walk's memory.
+PENDING_PER_WORKER = 4
+QUARANTINE_PREFIX = "_quarantine_"
+
+# One record per file, built straight from the os.DirEntry (no extra os.stat call)
+FileEntry = namedtuple("FileEntry", "path name size mtime ctime inode dev")
+
+
+def normalize_exts(exts):
+    """Turn "py, .PYC" style input into {"py", "pyc"}."""
+    return {e.strip().lstrip(".").lower() for e in (exts or ()) if e.strip()}
+
+
+def list_dir(folder, follow_symlinks=False, skip_quarantine=True, exclude_dirs=(), exclude_exts=(),
+             with_mtime=False, metrics=None):
+    """
+    List one directory without descending. Returns (files, subdirs, errors, mtime_ns)
+    where subdirs holds (path, loop_key) pairs and mtime_ns is the directory's own
+    mtime (taken before listing) when with_mtime is set. Never raises.
+    With a core.metrics.Metrics, counts files, dirs, skipped and errors and
+    records stat and list_dir latencies.
+    """
+    files, subdirs, errors, mtime_ns = [], [], [], None
+    skipped = 0
+    listed = time.perf_counter()
+    try:
+        if with_mtime:
+            mtime_ns = os.stat(folder).st_mtime_ns
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                name = entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        if skip_quarantine and name.startswith(QUARANTINE_PREFIX):
+                            skipped += 1
+                            continue
+                        if any(fnmatch.fnmatch(name, pattern) for pattern in exclude_dirs):
+                            skipped += 1
+                            continue
+                        key = None
+                        if follow_symlinks:
+                            stat = entry.stat()
+                            key = (stat.st_dev, stat.st_ino)
+                        subdirs.append((entry.path, key))
+                    elif entry.is_file(follow_symlinks=follow_symlinks):
+                        if exclude_exts and os.path.splitext(name)[1][1:].lower() in exclude_exts:
+                            skipped += 1
+                            continue
+                        # On Windows this comes from the directory listing itself,
+                        # so cloud-only (OneDrive) files are not downloaded
+                        if metrics:
+                            started = time.perf_counter()
+                            stat = entry.stat(follow_symlinks=follow_symlinks)
+                            metrics.observe("stat", time.perf_counter() - started)
+                        else:
+                            stat = entry.stat(follow_symlinks=follow_symlinks)
+                        files.append(FileEntry(entry.path, name, stat.st_size, stat.st_mtime,
+                                               stat.st_ctime, stat.st_ino or entry.inode(), stat.st_dev))
+                except OSError as e:
+                    errors.append((entry.path, e))
+    except OSError as e:
+        errors.append((folder, e))
+    if metrics:
+        metrics.observe("list_dir", time.perf_counter() - listed)
+        metrics.count("dirs")
+        metrics.count("files", len(files))
+        if skipped:
+            metrics.count("skipped", skipped)
+        if errors:
+            metrics.count("errors", len(errors))
+    return files, subdirs, errors, mtime_ns
+
+
+def walk_files(folder, exclude_exts=None, exclude_dirs=None, follow_symlinks=False,
+               skip_quarantine=True, workers=DEFAULT_WALK_WORKERS, on_error=None, on_dir=None, metrics=None):
+    """
+    Yield a FileEntry for every regular file under folder, in no particular order.
+
+    exclude_exts    – extensions to skip, with or without the dot ("py", ".pyc")
+    exclude_dirs    – directory names or fnmatch patterns that are not descended into
+    follow_symlinks – False skips symlinked files and directories entirely; True
+                      follows both (each real directory is still only visited once)
+    skip_quarantine – prune "_quarantine_*" directories while walking
+    workers         – directories listed in parallel on this many threads (1 = serial)
+    on_error        – called as on_error(path, exception) for anything that can't be read
+    on_dir          – called as on_dir(path, mtime_ns) for every directory listed
+    metrics         – core.metrics.Metrics to count into (see list_dir)
+    """
+    exclude_exts = normalize_exts(exclude_exts)
+    exclude_dirs = list(exclude_dirs or ())
+    args = (follow_symlinks, skip_quarantine, exclude_dirs, exclude_exts, on_dir is not None, metrics)
+    visited = set()
+    if follow_symlinks:
+        try:
+            stat = os.stat(folder)
+            visited.add((stat.st_dev, stat.st_ino))
+        except OSError:
+            pass
+
+    def new_dirs(subdirs):
+        for path, key in subdirs:
+            if key is not None:
+                if key in visited:
+                    continue
+                visited.add(key)
+            yield path
+
+    def report(folder, errors, mtime_ns):
+        if on_error:
+            for path, e in errors:
+                on_error(path, e)
+        if on_dir and mtime_ns is not None:
+            on_dir(folder, mtime_ns)
+
+    if workers <= 1:
+        stack = [folder]
+        while stack:
+            folder = stack.pop()
+            files, subdirs, errors, mtime_ns = list_dir(folder, *args)
+            report(folder, errors, mtime_ns)
+            stack.extend(new_dirs(subdirs))
+            yield from files
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    todo = [folder]  # directories found but not submitted yet
+    pending = {}
+    try:
+        while todo or pending:
+            while todo and len(pending) < workers * PENDING_PER_WORKER:
+                path = todo.pop()
+                pending[pool.submit(list_dir, path, *args)] = path
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                listed = pending.pop(future)
+                files, subdirs, errors, mtime_ns = future.result()
+                report(listed, errors, mtime_ns)
+                todo.extend(new_dirs(subdirs))
+                yield from files
+    finally:
+        # A consumer that stops early leaves listings queued; drop them (shutdown's cancel_futures needs 3.9)
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
@@ -0,0 +1,5 @@
+# dupe_doctor_gui.py – desktop entry point: python dupe_doctor_gui.py (PyInstaller builds from this file too)
+from gui.dupe_doctor_gui import main
+
+if __name__ == "__main__":
+    main()
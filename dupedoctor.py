@@ -0,0 +1,6 @@
+# dupedoctor.py – headless entry point: python dupedoctor.py scan <folder> [options]
+import sys
+from core.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,30 @@
 # dupe_doctor_gui.py
 import os
+import time
+import queue
 import threading
 import tkinter.filedialog as fd
 import customtkinter as ctk
 from tkinter import scrolledtext
 from datetime import datetime
-import shutil
-import subprocess
-from collections import defaultdict
-import re
-
-ctk.set_appearance_mode("light")
-ctk.set_default_color_theme("dark-blue")
-
-
-def normalize_name(name):
-    """Normalize filename by removing copy indicators like ' - Copy', ' (1)', etc."""
-    name = re.sub(r" - Copy( \(\d+\))?$", "", name)
-    name = re.sub(r" \(\d+\)$", "", name)
-    return name.strip()
+from array import array
+from core.hash_cache import HashCache
+from core.hash_service import HashService
+from core.metrics import Metrics
+from core.mover import default_quarantine_dir, journal_path_for, move_files
+from core.restore import restore_quarantine
+from core.snapshot import default_snapshot_path, diff_groups, save_snapshot, scan_table, walk_options
+from core.normalize import DEFAULT_RULE_SETS, RULE_SETS
+from core.grouping import iter_groups
+from core.scan import ScanCancelled, iter_duplicate_groups, recheck_groups
+from core.scan_result import ScanResult
+from gui.results_view import ResultsView
+
+# === CONFIG ===
+UI_FLUSH_MS = 100      # how often queued log lines and progress are drawn
+MAX_LOG_LINES = 5000   # older lines are dropped from the log box
+KEEP_CHOICES = {"Shortest name": "shortest_name", "Oldest": "oldest", "Shortest path": "shortest_path",
+                "In preferred folder": "preferred_dir"}
 
 
 class DupeDoctorApp(ctk.CTk):
@@ -27,8 +33,15 @@ class DupeDoctorApp(ctk.CTk):
         self.title("DupeDoctor – Duplicate File Cleaner")
         self.geometry("850x650")
         self.stop_move_requested = False
+        self.scan_cancel = threading.Event()
         self.selected_folder = ""
+        # Worker threads never touch widgets: they queue log lines and UI calls here
+        self.ui_queue = queue.Queue()
+        self.progress = None
+        self.metrics = None  # Metrics of the running scan or move, rendered under the progress line
+        self.scan_result = None  # ScanResult of the last scan, consumed by move, dry run and report
         self.setup_ui()
+        self.after(UI_FLUSH_MS, self.flush_ui)
 
     def setup_ui(self):
         self.scrollable_frame = ctk.CTkScrollableFrame(self)
@@ -45,11 +58,14 @@ class DupeDoctorApp(ctk.CTk):
         # 🔍 Match Criteria
         ctk.CTkLabel(self.scrollable_frame, text="🔍 Match Criteria", font=ctk.CTkFont(weight="bold")).pack(anchor="w", pady=(10, 0))
         self.criteria = {}
-        for label in ["Name", "Size", "Extension", "Created", "Modified"]:
+        for label in ["Name", "Size", "Extension", "Created", "Modified", "Content"]:
             var = ctk.BooleanVar(value=(label in ["Name", "Size", "Extension"]))
             chk = ctk.CTkCheckBox(self.scrollable_frame, text=label, variable=var)
             chk.pack(anchor="w", padx=20)
             self.criteria[label] = var
+        self.all_copy_names_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self.scrollable_frame, text="Also match \"Copy of …\", Finder and localized copy names",
+                        variable=self.all_copy_names_var).pack(anchor="w", padx=20, pady=(5, 0))
 
         # 🚫 Exclude Extensions
         ctk.CTkLabel(self.scrollable_frame, text="🚫 Exclude File Extensions (comma-separated, e.g. py,pyc,ipynb)", font=ctk.CTkFont(weight="bold")).pack(anchor="w", pady=(10, 0))
@@ -57,15 +73,39 @@ class DupeDoctorApp(ctk.CTk):
         self.exclude_entry.insert(0, "py,pyc,ipynb")
         self.exclude_entry.pack(fill="x", padx=5, pady=(0, 10))
 
+        # ♻️ Incremental Rescan
+        self.incremental_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self.scrollable_frame, text="♻️ Incremental rescan (only re-read folders changed since the last scan)",
+                        variable=self.incremental_var).pack(anchor="w", padx=5)
+
         # 🚀 Start Scan
         ctk.CTkLabel(self.scrollable_frame, text="🚀 Start Scan", font=ctk.CTkFont(weight="bold")).pack(anchor="w", pady=(10, 0))
         self.scan_button = ctk.CTkButton(self.scrollable_frame, text="Start Scan", command=self.start_scan)
-        self.scan_button.pack(pady=(5, 10))
+        self.scan_button.pack(pady=(5, 0))
+
+        self.stop_scan_button = ctk.CTkButton(self.scrollable_frame, text="Stop Scan", command=self.request_stop_scan, fg_color="red")
+        self.stop_scan_button.pack(pady=(5, 0))
+        self.stop_scan_button.configure(state="disabled")
+
+        self.progress_label = ctk.CTkLabel(self.scrollable_frame, text="")
+        self.progress_label.pack(anchor="w", padx=20)
+        self.stats_label = ctk.CTkLabel(self.scrollable_frame, text="")
+        self.stats_label.pack(anchor="w", padx=20, pady=(0, 10))
 
         # 📦 Move Duplicates
         ctk.CTkLabel(self.scrollable_frame, text="📦 Move Duplicates", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        keep_row = ctk.CTkFrame(self.scrollable_frame, fg_color="transparent")
+        keep_row.pack(anchor="w", padx=20, pady=(5, 0))
+        ctk.CTkLabel(keep_row, text="Keep:").pack(side="left")
+        self.keep_menu = ctk.CTkOptionMenu(keep_row, values=list(KEEP_CHOICES))
+        self.keep_menu.pack(side="left", padx=5)
+        self.prefer_entry = ctk.CTkEntry(keep_row, width=320, placeholder_text="preferred folder(s), comma-separated")
+        self.prefer_entry.pack(side="left")
+        ctk.CTkLabel(self.scrollable_frame, text="Moves the duplicates the last scan found; files changed since are left alone.").pack(anchor="w", padx=20)
         self.move_button = ctk.CTkButton(self.scrollable_frame, text="Move Duplicates", command=self.move_duplicates)
         self.move_button.pack(pady=(5, 10))
+        ctk.CTkButton(self.scrollable_frame, text="Dry Run", command=self.dry_run_log).pack(pady=(0, 5))
+        ctk.CTkButton(self.scrollable_frame, text="Save Report (CSV)", command=self.save_report).pack(pady=(0, 5))
 
         self.stop_button = ctk.CTkButton(self.scrollable_frame, text="Stop Move", command=self.request_stop_move, fg_color="red")
         self.stop_button.pack(pady=(5, 0))
@@ -74,6 +114,12 @@ class DupeDoctorApp(ctk.CTk):
         self.undo_button = ctk.CTkButton(self.scrollable_frame, text="Undo Last Move", command=self.undo_last_move)
         self.undo_button.pack(pady=(10, 10))
 
+        # 🗂️ Results
+        ctk.CTkLabel(self.scrollable_frame, text="🗂️ Results (click a column to sort, expand a group to see its files)",
+                     font=ctk.CTkFont(weight="bold")).pack(anchor="w")
+        self.results_view = ResultsView(self.scrollable_frame)
+        self.results_view.pack(fill="both", expand=True, padx=5, pady=(5, 10))
+
         # 🪵 Log Output
         ctk.CTkLabel(self.scrollable_frame, text="🪵 Log Output", font=ctk.CTkFont(weight="bold")).pack(anchor="w")
         self.log_box = scrolledtext.ScrolledText(self.scrollable_frame, wrap="word", height=10, borderwidth=2, relief="solid")
@@ -86,158 +132,363 @@ class DupeDoctorApp(ctk.CTk):
             self.folder_label.configure(text=folder)
 
     def log(self, message):
-        self.log_box.insert("end", message + "\n")
+        """Queue a log line; safe to call from any thread."""
+        self.ui_queue.put(message)
+
+    def call_in_ui(self, func, *args):
+        """Run func(*args) on the Tk thread at the next flush."""
+        self.ui_queue.put((func, args))
+
+    def flush_ui(self):
+        lines = []
+        try:
+            while True:
+                try:
+                    item = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, str):
+                    lines.append(item)
+                    continue
+                self.append_log(lines)
+                lines = []
+                func, args = item
+                try:
+                    func(*args)
+                except Exception as e:
+                    # One failing update must not stop the queue from draining (or the buttons from coming back)
+                    lines.append(f"❌ UI update failed: {e!r}")
+            self.append_log(lines)
+            self.render_progress()
+        finally:
+            self.after(UI_FLUSH_MS, self.flush_ui)
+
+    def name_rules(self):
+        return tuple(RULE_SETS) if self.all_copy_names_var.get() else DEFAULT_RULE_SETS
+
+    def new_metrics(self):
+        """Metrics whose updates are rendered in the stats line (on the Tk thread)."""
+        self.metrics = Metrics(on_update=lambda snapshot: self.call_in_ui(self.render_stats, snapshot))
+        return self.metrics
+
+    def render_stats(self, snapshot):
+        stages, counters = snapshot["stages"], snapshot["counters"]
+        parts = []
+        if "walk" in stages:
+            parts.append(f"walk {stages['walk'].get('files_per_sec') or 0:,.0f} files/s")
+        stat = snapshot["histograms"].get("stat")
+        if stat and stat["count"]:
+            parts.append(f"stat p99 {stat['p99_ms']:.2f} ms")
+        if "hash" in stages:
+            parts.append(f"hash {(stages['hash'].get('bytes_hashed_per_sec') or 0) / 1e6:,.1f} MB/s")
+        if "move" in stages:
+            parts.append(f"move {stages['move'].get('files_moved_per_sec') or 0:,.0f} files/s")
+        errors = counters.get("errors", 0) + counters.get("hash_errors", 0) + counters.get("move_errors", 0)
+        parts.append(f"{counters.get('skipped', 0):,} skipped · {errors:,} error(s)")
+        self.stats_label.configure(text="📈 " + " · ".join(parts))
+
+    def log_stage_times(self, metrics):
+        stages = metrics.snapshot()["stages"]
+        self.log("⏱️ " + ", ".join(f"{name} {s['seconds']:.2f}s" for name, s in stages.items()))
+
+    def append_log(self, lines):
+        if not lines:
+            return
+        started = time.perf_counter()
+        if len(lines) > MAX_LOG_LINES:
+            dropped = len(lines) - MAX_LOG_LINES
+            lines = [f"… {dropped} earlier line(s) not shown"] + lines[dropped:]
+        self.log_box.insert("end", "\n".join(lines) + "\n")
+        excess = int(self.log_box.index("end-1c").split(".")[0]) - 1 - MAX_LOG_LINES
+        if excess > 0:
+            self.log_box.delete("1.0", f"{excess + 1}.0")
         self.log_box.see("end")
+        if self.metrics:
+            self.metrics.observe("ui_log", time.perf_counter() - started)
+
+    def render_progress(self):
+        progress = self.progress
+        if not progress:
+            return
+        elapsed = max(time.time() - progress["started"], 1e-6)
+        self.progress_label.configure(
+            text=f"📊 {progress['phase']}: {progress['files']:,} files "
+                 f"({progress['files'] / elapsed:,.0f}/s) · {progress['groups']:,} group(s) · {elapsed:.1f}s")
 
     def start_scan(self):
         if not self.selected_folder:
             self.log("⚠️ Please select a folder to scan.")
             return
 
-        self.log("🔍 Scan started with the following criteria:")
+        # Read every widget here, on the Tk thread; the worker only gets plain values
         criteria_mapping = {
             "Name": "name",
             "Size": "size",
             "Extension": "ext",
             "Created": "created",
-            "Modified": "modified"
+            "Modified": "modified",
+            "Content": "content"
         }
-
         active_criteria = [criteria_mapping[key] for key, val in self.criteria.items() if val.get()]
+        exclude_exts = [e.strip().lower() for e in self.exclude_entry.get().split(",") if e.strip()]
+
+        self.scan_cancel.clear()
+        self.scan_button.configure(state="disabled")
+        self.stop_scan_button.configure(state="normal")
+        self.progress = {"phase": "Walking", "files": 0, "groups": 0, "started": time.time()}
+        threading.Thread(target=self.run_scan, daemon=True,
+                         args=(self.selected_folder, active_criteria, exclude_exts,
+                               self.incremental_var.get(), self.name_rules())).start()
+
+    def request_stop_scan(self):
+        self.log("🛑 Stop requested...")
+        self.scan_cancel.set()
+
+    def scan_finished(self):
+        self.render_progress()
+        self.progress = None
+        self.scan_button.configure(state="normal")
+        self.stop_scan_button.configure(state="disabled")
+
+    def run_scan(self, folder, active_criteria, exclude_exts, incremental, name_rules):
+        try:
+            self.scan_folder(folder, active_criteria, exclude_exts, incremental, name_rules)
+        except ScanCancelled:
+            self.log("⛔ Scan cancelled by user.")
+        except Exception as e:
+            self.log(f"❌ Scan failed: {e}")
+        finally:
+            self.call_in_ui(self.scan_finished)
+
+    def scan_folder(self, folder, active_criteria, exclude_exts, incremental, name_rules):
+        progress = self.progress
+        metrics = self.new_metrics()
+
+        def check_progress(files_seen):
+            progress["files"] = files_seen
+            if self.scan_cancel.is_set():
+                raise ScanCancelled()
+
+        self.log("🔍 Scan started with the following criteria:")
         for crit in active_criteria:
             self.log(f"✅ {crit}")
-
-        files_data = []
-        exclude_exts = [e.strip().lower() for e in self.exclude_entry.get().split(",") if e.strip()]
         self.log(f"🚫 Skipping extensions: {', '.join(exclude_exts) or 'None'}")
 
-        for root, _, files in os.walk(self.selected_folder):
-            for f in files:
-                ext = os.path.splitext(f)[1][1:].lower()
-                if ext in exclude_exts:
-                    continue
-                full_path = os.path.join(root, f)
-                try:
-                    stat = os.stat(full_path)
-                    base_name = os.path.splitext(f)[0]
-                    files_data.append({
-                        "path": full_path,
-                        "name": normalize_name(base_name),
-                        "ext": os.path.splitext(f)[1].lower(),
-                        "size": stat.st_size,
-                        "created": stat.st_ctime,
-                        "modified": stat.st_mtime
-                    })
-                except Exception as e:
-                    self.log(f"⚠️ Could not access {full_path}: {e}")
-
-        self.log(f"🔍 Checking {len(files_data)} files...")
-
-        groups = defaultdict(list)
-        for f in files_data:
-            try:
-                key = tuple(f[k] for k in active_criteria)
-                groups[key].append(f["path"])
-            except KeyError as e:
-                self.log(f"❌ Missing key: {e} in file {f['path']}")
-
-        duplicates_found = 0
-        for group, paths in groups.items():
-            if len(paths) > 1:
-                duplicates_found += 1
-                self.log(f"\n🔗 Duplicate Group ({len(paths)} files):")
-                for p in paths:
-                    self.log(f"   - {p}")
-
-        if duplicates_found == 0:
+        def could_not_access(path, e):
+            self.log(f"⚠️ Could not access {path}: {e}")
+
+        snapshot_path = default_snapshot_path(folder)
+        with metrics.stage("walk"):
+            table, dir_mtimes, previous, scan_stats = scan_table(
+                folder, snapshot_path, incremental=incremental, exclude_exts=exclude_exts,
+                on_error=could_not_access, progress=check_progress, metrics=metrics)
+        progress["files"] = len(table)
+        if scan_stats["incremental"]:
+            self.log(f"♻️ Re-listed {scan_stats['dirs_relisted']} changed folder(s), "
+                     f"{scan_stats['dirs_added']} new, {scan_stats['dirs_removed']} removed")
+        self.log(f"🔍 Checking {len(table)} files...")
+
+        progress["phase"] = "Hashing" if "content" in active_criteria else "Grouping"
+        stage_totals = {}
+        # Groups are kept as packed row ids only; their paths are rebuilt from the table when needed
+        rows_flat, offsets = array("q"), array("q", [0])
+        changed_rows = set()
+        # Same cache as the CLI: files unchanged since an earlier scan are not read again
+        cache = HashCache() if "content" in active_criteria else None
+        try:
+            with HashService() as hash_service:
+                found = iter_duplicate_groups(table, active_criteria, cache=cache, hash_service=hash_service,
+                                              stage_totals=stage_totals, metrics=metrics, name_rules=name_rules)
+                if scan_stats["incremental"]:
+                    # Files rewritten in place keep their folder's mtime; re-stat those about to be shown
+                    found = recheck_groups(table, found, active_criteria, changed_rows=changed_rows, cache=cache,
+                                           hash_service=hash_service, stage_totals=stage_totals,
+                                           name_rules=name_rules)
+                for rows in found:
+                    check_progress(len(table))
+                    rows_flat.extend(rows)
+                    offsets.append(len(rows_flat))
+                    progress["groups"] = len(offsets) - 1
+        finally:
+            if cache is not None:
+                cache.close()
+        for stage in stage_totals.values():
+            self.log(f"   {stage['stage']}: {stage['removed']} of {stage['candidates']} ruled out")
+
+        def path_groups():
+            return ([table.path(i) for i in group] for group in iter_groups(rows_flat, offsets))
+
+        # Only compare against a snapshot taken with the same match criteria
+        if previous and previous.get("criteria") == active_criteria:
+            delta = diff_groups(previous["groups"], path_groups())
+            self.log(f"➕ {len(delta['added'])} new, ➖ {len(delta['removed'])} removed, "
+                     f"🔁 {len(delta['changed'])} changed group(s) since the last scan")
+        options = walk_options(exclude_exts=exclude_exts)
+        save_snapshot(snapshot_path, folder, table, dir_mtimes, path_groups(), options,
+                      criteria=active_criteria, name_rules=name_rules,
+                      base=previous if scan_stats["incremental"] else None,
+                      changed_dirs={table.dirs[table.dir_id[i]] for i in changed_rows})
+
+        progress["phase"] = "Done"
+        self.log_stage_times(metrics)
+        # Groups go to the results view, not the log: a line per file does not scale.
+        # Move, dry run and report all use this result, so they act on exactly these groups.
+        self.call_in_ui(self.set_scan_result, ScanResult(folder, table, rows_flat, offsets, active_criteria,
+                                                         options, name_rules))
+
+        if len(offsets) == 1:
             self.log("\n✅ Scan complete. No duplicates found.")
         else:
-            self.log(f"\n✅ Scan complete. {duplicates_found} duplicate group(s) found.")
+            self.log(f"\n✅ Scan complete. {len(offsets) - 1} duplicate group(s) found.")
 
-    def move_duplicates(self):
+    def move_options(self):
+        """Keep policy and preferred folders from the widgets, or None (after logging why) if unusable."""
         if not self.selected_folder:
             self.log("⚠️ Please select a folder first.")
-            return
+            return None
+        policy = KEEP_CHOICES[self.keep_menu.get()]
+        preferred_dirs = [d.strip() for d in self.prefer_entry.get().split(",") if d.strip()]
+        if policy == "preferred_dir" and not preferred_dirs:
+            self.log("⚠️ Enter the folder whose copies should be kept.")
+            return None
+        return policy, preferred_dirs
 
+    def move_duplicates(self):
+        options = self.move_options()
+        if not options:
+            return
         self.stop_move_requested = False
         self.stop_button.configure(state="normal")
         self.move_button.configure(state="disabled")
-        threading.Thread(target=self.handle_move_duplicates).start()
+        threading.Thread(target=self.handle_move_duplicates, args=(self.selected_folder, *options),
+                         daemon=True).start()
+
+    def dry_run_log(self):
+        """Log what Move Duplicates would do with the current scan result, without touching any file."""
+        options = self.move_options()
+        if options:
+            threading.Thread(target=self.handle_move_duplicates, args=(self.selected_folder, *options, True),
+                             daemon=True).start()
+
+    def save_report(self):
+        options = self.move_options()
+        if not options:
+            return
+        path = fd.asksaveasfilename(title="Save duplicate report", defaultextension=".csv",
+                                    filetypes=[("CSV", "*.csv")])
+        if path:
+            threading.Thread(target=self.handle_save_report, args=(self.selected_folder, *options, path),
+                             daemon=True).start()
 
     def request_stop_move(self):
         self.log("🛑 Stop requested...")
         self.stop_move_requested = True
 
-    def handle_move_duplicates(self):
-        moved_files = []
-        quarantine_dir = os.path.join(self.selected_folder, f"_quarantine_{os.path.basename(self.selected_folder)}")
-        os.makedirs(quarantine_dir, exist_ok=True)
+    def move_finished(self):
+        self.move_button.configure(state="normal")
+        self.stop_button.configure(state="disabled")
 
-        files_by_base = defaultdict(list)
-        exclude_exts = [e.strip().lower() for e in self.exclude_entry.get().split(",") if e.strip()]
-        self.log(f"🚫 Skipping extensions: {', '.join(exclude_exts) or 'None'}")
+    def set_scan_result(self, result):
+        self.scan_result = result
+        self.results_view.set_results(result.table, result.rows, result.offsets)
+
+    def scan_result_for(self, folder):
+        """The groups the last scan of folder showed: kept from this session, else loaded from its snapshot."""
+        result = self.scan_result
+        if result is None or result.root != os.path.abspath(folder):
+            result = ScanResult.load(folder)
+        if result is None:
+            self.log("⚠️ No scan results for this folder yet. Run a scan first.")
+        return result
+
+    def handle_save_report(self, folder, policy, preferred_dirs, path):
+        result = self.scan_result_for(folder)
+        if result is not None:
+            result.write_report(path, default_quarantine_dir(folder), policy, preferred_dirs)
+            self.log(f"📝 Report saved to {path}")
+
+    def handle_move_duplicates(self, folder, policy, preferred_dirs, dry_run=False):
+        try:
+            result = self.scan_result_for(folder)
+            if result is not None:
+                self.move_scan_result(result, folder, policy, preferred_dirs, dry_run)
+        finally:
+            if not dry_run:
+                self.call_in_ui(self.move_finished)
+
+    def move_scan_result(self, result, folder, policy, preferred_dirs, dry_run):
+        quarantine_dir = default_quarantine_dir(folder)
+        metrics = self.new_metrics()
+
+        def stale(path):
+            self.log(f"♻️ Changed or missing since the scan, left alone: {path}")
+
+        # One lstat per grouped file instead of a new walk: the move acts on the groups the scan showed
+        with metrics.stage("plan"):
+            moves = result.plan_moves(quarantine_dir, policy, preferred_dirs, on_stale=stale)
+
+        if dry_run:
+            for src, dst in moves:
+                self.log(f"🧪 Would move: {src} → {dst}")
+            self.log(f"🧪 Dry run: {len(moves)} file(s) from {len(result)} group(s) would be moved. Nothing was changed.")
+            return
 
-        for root, _, files in os.walk(self.selected_folder):
-            if quarantine_dir in root:
-                continue
-            for f in files:
-                ext = os.path.splitext(f)[1][1:].lower()
-                if ext in exclude_exts:
-                    continue
-                full_path = os.path.join(root, f)
-                base_name = os.path.splitext(f)[0]
-                normalized = normalize_name(base_name)
-                files_by_base[normalized].append(full_path)
-
-        for base, file_list in files_by_base.items():
-            if len(file_list) <= 1:
-                continue
-            canonical = min(file_list, key=lambda p: (len(os.path.basename(p)), os.path.getctime(p)))
-            for f in file_list:
-                if f == canonical:
-                    continue
-                if self.stop_move_requested:
-                    self.log("⛔ Move cancelled by user.")
-                    break
-                rel_path = os.path.relpath(f, self.selected_folder)
-                dest_path = os.path.join(quarantine_dir, rel_path)
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                try:
-                    shutil.move(f, dest_path)
-                    moved_files.append((f, dest_path))
-                    self.log(f"📦 Moved: {f} → {dest_path}")
-                except Exception as e:
-                    self.log(f"❌ Failed to move {f}: {str(e)}")
-
-        if moved_files:
-            log_path = os.path.join(quarantine_dir, "dupe_log.csv")
-            with open(log_path, "w", encoding="utf-8") as f:
-                for src, dst in moved_files:
-                    f.write(f"{src},{dst}\n")
-            self.log(f"📝 Log saved: {log_path}")
-        else:
+        def moved(src, dst, how):
+            self.log(f"📦 Moved: {src} → {dst}")
+
+        def could_not_move(src, e):
+            self.log(f"❌ Failed to move {src}: {e}")
+
+        journal_path = journal_path_for(quarantine_dir)
+        with metrics.stage("move"):
+            stats = move_files(moves, journal_path, cancel=lambda: self.stop_move_requested,
+                               on_moved=moved, on_error=could_not_move, root=folder, metrics=metrics)
+        if stats["cancelled"]:
+            self.log("⛔ Move cancelled by user.")
+        if stats["moved"]:
+            self.log(f"✅ Moved {stats['moved']} file(s) ({stats['renamed']} renamed, {stats['copied']} copied)")
+            self.log(f"📝 Journal: {journal_path}")
+        elif not stats["skipped"]:
             self.log("📭 No duplicates moved or nothing matched criteria.")
-
-        self.move_button.configure(state="normal")
-        self.stop_button.configure(state="disabled")
+        if stats["skipped"]:
+            self.log(f"⏭️ {stats['skipped']} file(s) already moved by an earlier run")
+        self.log_stage_times(metrics)
 
     def undo_last_move(self):
         folder = fd.askdirectory(title="Select _quarantine_* folder to restore from")
         if not folder:
             self.log("⚠️ No folder selected.")
             return
+        self.undo_button.configure(state="disabled")
+        self.log(f"🛠️ Restoring files from {folder}...")
+        threading.Thread(target=self.handle_undo, args=(os.path.normpath(folder),), daemon=True).start()
 
-        parent_dir = os.path.dirname(folder)
-        command = ["robocopy", folder, parent_dir, "/E", "/XO"]
-        self.log(f"🛠️ Running undo: {' '.join(command)}")
+    def handle_undo(self, folder):
+        def restored(src, status, detail):
+            if status == "restored":
+                self.log(f"↩️ Restored: {detail}")
+            else:
+                self.log(f"⚠️ {status.capitalize()}: {src} ({detail})")
 
         try:
-            subprocess.run(command, capture_output=True, text=True)
-            self.log("✅ Undo completed using robocopy.")
+            stats = restore_quarantine(folder, on_file=restored)
+            if not any(stats[k] for k in ("restored", "missing", "changed", "conflict", "failed")):
+                self.log("📭 Nothing to restore: no move journal or dupe_log.csv in that folder.")
+            else:
+                self.log(f"✅ Undo finished: {stats['restored']} restored, {stats['conflict']} conflict(s), "
+                         f"{stats['changed']} changed, {stats['missing']} missing, {stats['failed']} failed.")
         except Exception as e:
             self.log(f"❌ Undo failed: {str(e)}")
+        finally:
+            self.call_in_ui(lambda: self.undo_button.configure(state="normal"))
 
 
-if __name__ == "__main__":
+def main():
+    ctk.set_appearance_mode("light")
+    ctk.set_default_color_theme("dark-blue")
     app = DupeDoctorApp()
     app.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,15 @@
 import os
-import shutil
 import csv
 from datetime import datetime
-from collections import defaultdict
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from quarantine.move_to_quarantine import move_files_to_quarantine
+from core.mover import journal_path_for, move_files, quarantine_path
+from core.file_table import FileTable
+from core.grouping import group_rows, iter_groups
 
 # === Folder Selection ===
 def select_source_folder():
+    # tkinter only loads for the dialogs, so the functions below work without a display
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
     root = tk.Tk()
     root.withdraw()
     folder = filedialog.askdirectory(title="Select folder to scan for duplicates")
@@ -23,59 +24,40 @@ def ensure_dir(path):
         os.makedirs(path)
 
 def collect_metadata(folder):
-    metadata = []
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            try:
-                stat = os.stat(full_path)
-                name, ext = os.path.splitext(file)
-                metadata.append({
-                    "Full Path": full_path,
-                    "File Name": name.lower(),
-                    "Extension": ext.lower(),
-                    "Size": stat.st_size,
-                    "Date Modified": stat.st_mtime,
-                    "Date Created": stat.st_ctime
-                })
-            except Exception as e:
-                print(f"Skipped (no access): {full_path} — {e}")
-    return metadata
+    def skipped(path, e):
+        print(f"Skipped (no access): {path} — {e}")
+
+    return FileTable.from_walk(folder, on_error=skipped)
 
 def find_medium_safe_duplicates(metadata):
-    grouped = defaultdict(list)
-    for entry in metadata:
-        key = (
-            entry["File Name"],
-            entry["Extension"],
-            entry["Size"]
-        )
-        grouped[key].append(entry)
-    return [group for group in grouped.values() if len(group) > 1]
+    """Group a FileTable by (name, extension, size); only duplicate rows are materialized."""
+    rows, offsets = group_rows(metadata, ["name", "ext", "size"], name_key=str.lower)
+    return [[metadata.record(i) for i in group] for group in iter_groups(rows, offsets)]
 
 def move_to_quarantine(duplicates, source_folder, quarantine_folder):
     ensure_dir(quarantine_folder)
-    log_entries = []
-
+    entries = {}
     for group in duplicates:
         for entry in group[1:]:  # Keep the first
-            src = entry["Full Path"]
-            rel_path = os.path.relpath(src, source_folder)
-            dest = os.path.join(quarantine_folder, rel_path)
+            entries[entry["Full Path"]] = entry
+    moves = [(src, quarantine_path(src, source_folder, quarantine_folder)) for src in entries]
+    log_entries = []
+
+    def moved(src, dest, how):
+        entry = entries[src]
+        log_entries.append({
+            "Original Path": src,
+            "Moved To": dest,
+            "Size": entry["Size"],
+            "Date Modified": datetime.fromtimestamp(entry["Date Modified"]),
+            "Date Created": datetime.fromtimestamp(entry["Date Created"])
+        })
+        print(f"Moved: {src} → {dest}")
+
+    def failed(src, e):
+        print(f"❌ Failed to move {src}: {e}")
 
-            try:
-                os.makedirs(os.path.dirname(dest), exist_ok=True)
-                shutil.move(src, dest)
-                log_entries.append({
-                    "Original Path": src,
-                    "Moved To": dest,
-                    "Size": entry["Size"],
-                    "Date Modified": datetime.fromtimestamp(entry["Date Modified"]),
-                    "Date Created": datetime.fromtimestamp(entry["Date Created"])
-                })
-                print(f"Moved: {src} → {dest}")
-            except Exception as e:
-                print(f"❌ Failed to move {src}: {e}")
+    move_files(moves, journal_path_for(quarantine_folder), on_moved=moved, on_error=failed, root=source_folder)
     return log_entries
 
 def write_log(log_entries, log_path):
@@ -88,6 +70,7 @@ def write_log(log_entries, log_path):
 
 # === Main Entry Point ===
 def main():
+    from tkinter import messagebox
     source_folder = select_source_folder()
     folder_name = os.path.basename(source_folder.rstrip("\\/"))
     quarantine_folder = os.path.join(source_folder, f"_quarantine_{folder_name}")
@@ -0,0 +1,138 @@
+# results_view.py
+import os
+from array import array
+from datetime import datetime
+import tkinter as tk
+from tkinter import ttk
+
+# === CONFIG ===
+PAGE_SIZE = 200  # groups shown in the tree at once
+PLACEHOLDER = "…"
+
+SORT_KEYS = {
+    "reclaimable": "Reclaimable",
+    "files": "Files",
+    "size": "Group Size",
+}
+
+
+def _format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} TB"
+
+
+class ResultsView(tk.Frame):
+    """
+    Duplicate groups in a ttk.Treeview that only ever holds one page of groups.
+    Group data stays in flat arrays; a group's files are inserted when it is
+    expanded and removed again when the page changes. Clicking a column heading
+    sorts all groups by that column.
+    """
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.table = None
+        self.rows = array("q")
+        self.offsets = array("q", [0])
+        self.order = []
+        self.page = 0
+        self.sort_key = "reclaimable"
+        self.sort_reverse = True
+        self.files = self.bytes = self.reclaimable = array("q")
+
+        self.tree = ttk.Treeview(self, columns=tuple(SORT_KEYS), height=12, selectmode="extended")
+        self.tree.heading("#0", text="Group / File")
+        self.tree.column("#0", width=420, stretch=True)
+        for key, label in SORT_KEYS.items():
+            self.tree.heading(key, text=label, command=lambda k=key: self.sort_by(k))
+            self.tree.column(key, width=110, anchor="e", stretch=False)
+        scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+
+        pager = tk.Frame(self)
+        self.prev_button = ttk.Button(pager, text="◀ Prev", command=lambda: self.show_page(self.page - 1))
+        self.next_button = ttk.Button(pager, text="Next ▶", command=lambda: self.show_page(self.page + 1))
+        self.page_label = ttk.Label(pager, text="No results yet.")
+        self.prev_button.pack(side="left")
+        self.page_label.pack(side="left", padx=10)
+        self.next_button.pack(side="left")
+
+        pager.pack(side="bottom", fill="x", pady=(5, 0))
+        scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+    def set_results(self, table, rows, offsets):
+        """Show groups given as (rows, offsets) over a FileTable (see core.grouping)."""
+        self.table, self.rows, self.offsets = table, rows, offsets
+        count = len(offsets) - 1
+        sizes = table.size
+        self.files = array("q", (offsets[g + 1] - offsets[g] for g in range(count)))
+        self.bytes = array("q", (sum(sizes[i] for i in rows[offsets[g]:offsets[g + 1]]) for g in range(count)))
+        # Everything but the largest copy could be reclaimed
+        self.reclaimable = array("q", (self.bytes[g] - max(sizes[i] for i in rows[offsets[g]:offsets[g + 1]])
+                                       for g in range(count)))
+        self.sort_by(self.sort_key, reverse=True)
+
+    def group_count(self):
+        return len(self.offsets) - 1
+
+    def group_paths(self, g):
+        return [self.table.path(i) for i in self.rows[self.offsets[g]:self.offsets[g + 1]]]
+
+    def sort_by(self, key, reverse=None):
+        """Sort all groups by a column; clicking the current column again flips the order."""
+        if reverse is None:
+            reverse = not self.sort_reverse if key == self.sort_key else True
+        self.sort_key, self.sort_reverse = key, reverse
+        column = {"reclaimable": self.reclaimable, "files": self.files, "size": self.bytes}[key]
+        self.order = sorted(range(self.group_count()), key=column.__getitem__, reverse=reverse)
+        for k, label in SORT_KEYS.items():
+            arrow = (" ▼" if reverse else " ▲") if k == key else ""
+            self.tree.heading(k, text=label + arrow)
+        self.show_page(0)
+
+    def show_page(self, page):
+        pages = max(1, -(-len(self.order) // PAGE_SIZE))
+        self.page = min(max(page, 0), pages - 1)
+        self.tree.delete(*self.tree.get_children())
+        start = self.page * PAGE_SIZE
+        for g in self.order[start:start + PAGE_SIZE]:
+            item = self.tree.insert("", "end", iid=f"g{g}", open=False,
+                                    text=f"🔗 Group {g + 1}: {os.path.basename(self.table.path(self.rows[self.offsets[g]]))}",
+                                    values=(_format_bytes(self.reclaimable[g]), self.files[g], _format_bytes(self.bytes[g])))
+            self.tree.insert(item, "end", text=PLACEHOLDER)  # makes the group expandable
+
+        total = len(self.order)
+        if total:
+            self.page_label.configure(text=f"Groups {start + 1:,}–{min(start + PAGE_SIZE, total):,} of {total:,}")
+        else:
+            self.page_label.configure(text="No duplicates found.")
+        self.prev_button.state(["!disabled"] if self.page > 0 else ["disabled"])
+        self.next_button.state(["!disabled"] if self.page < pages - 1 else ["disabled"])
+
+    def on_open(self, _event):
+        item = self.tree.focus()
+        if not item.startswith("g"):
+            return
+        children = self.tree.get_children(item)
+        if len(children) != 1 or self.tree.item(children[0], "text") != PLACEHOLDER:
+            return  # already loaded
+        self.tree.delete(children[0])
+        g = int(item[1:])
+        table = self.table
+        for i in self.rows[self.offsets[g]:self.offsets[g + 1]]:
+            modified = datetime.fromtimestamp(table.mtime[i]).strftime("%Y-%m-%d %H:%M")
+            self.tree.insert(item, "end", iid=f"f{i}", text=f"{table.path(i)}  ({modified})",
+                             values=("", "", _format_bytes(table.size[i])))
+
+    def selected_groups(self):
+        """Group indexes of the selected group rows (files select their group)."""
+        groups = set()
+        for item in self.tree.selection():
+            parent = item if item.startswith("g") else self.tree.parent(item)
+            groups.add(int(parent[1:]))
+        return sorted(groups)
@@ -1,57 +1,42 @@
-import os
-import hashlib
-import shutil
-from datetime import datetime
+from core.find_duplicates_hash import find_duplicates_staged, print_stage_report
+from core.hash_cache import HashCache
+from core.hash_service import HashService
+from core.mover import journal_path_for, move_files, quarantine_path
 
 # === CONFIG ===
 TARGET_FOLDER = r"C:\Users\Rick_DellXPS"
 QUARANTINE_FOLDER = r"C:\Users\Rick_DellXPS\Duplicate_Quarantine"
-HASH_CHUNK_SIZE = 8192
-
-def get_file_hash(path, chunk_size=HASH_CHUNK_SIZE):
-    hasher = hashlib.sha256()
-    try:
-        with open(path, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                hasher.update(chunk)
-    except (PermissionError, OSError):
-        return None
-    return hasher.hexdigest()
-
-def find_duplicates(folder):
-    hash_map = {}
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            file_hash = get_file_hash(full_path)
-            if file_hash:
-                hash_map.setdefault(file_hash, []).append(full_path)
-    return [paths for paths in hash_map.values() if len(paths) > 1]
+
+def find_duplicates(folder, stage_stats=None, cache=None, hash_service=None):
+    return find_duplicates_staged(folder, stage_stats=stage_stats, cache=cache, hash_service=hash_service)
 
 def move_files_to_quarantine(duplicates):
-    os.makedirs(QUARANTINE_FOLDER, exist_ok=True)
-    count = 0
-
-    for group in duplicates:
-        keep = group[0]  # First file kept
-        for dup in group[1:]:
-            rel_path = os.path.relpath(dup, TARGET_FOLDER)
-            dest_path = os.path.join(QUARANTINE_FOLDER, rel_path)
-            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-            try:
-                shutil.copy2(dup, dest_path)
-                print(f"Copied: {dup} -> {dest_path}")
-                count += 1
-            except Exception as e:
-                print(f"Failed to copy {dup}: {e}")
-
-    print(f"\n✅ Finished. {count} duplicate file(s) copied to quarantine folder.")
+    # First file of each group is kept
+    moves = [(dup, quarantine_path(dup, TARGET_FOLDER, QUARANTINE_FOLDER))
+             for group in duplicates for dup in group[1:]]
+
+    def moved(src, dest, how):
+        print(f"Moved ({how}): {src} -> {dest}")
+
+    def failed(src, e):
+        print(f"Failed to move {src}: {e}")
+
+    journal_path = journal_path_for(QUARANTINE_FOLDER)
+    stats = move_files(moves, journal_path, on_moved=moved, on_error=failed, root=TARGET_FOLDER)
+    if stats["skipped"]:
+        print(f"\n⏭️ {stats['skipped']} file(s) were already moved by an earlier run.")
+    print(f"\n✅ Finished. {stats['moved']} duplicate file(s) moved to quarantine folder.")
+    print(f"📝 Journal: {journal_path}")
 
 def main():
     print(f"Scanning for duplicates in: {TARGET_FOLDER}...\n")
-    duplicates = find_duplicates(TARGET_FOLDER)
+    stage_stats = []
+    with HashCache() as cache, HashService() as hash_service:
+        duplicates = find_duplicates(TARGET_FOLDER, stage_stats=stage_stats,
+                                     cache=cache, hash_service=hash_service)
+    print_stage_report(stage_stats)
     print(f"Found {len(duplicates)} duplicate group(s).\n")
-    copy_to_quarantine(duplicates)
+    move_files_to_quarantine(duplicates)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,120 @@
+import errno
+import os
+import time
+from collections import namedtuple
+import core.async_walker as async_walker
+from core import snapshot
+from core.async_walker import is_placeholder, walk_files_async
+from core.snapshot import scan_table
+from core.walker import walk_files
+from tests.test_cli import run
+from tests.test_walker import make_tree, names
+
+
+def test_matches_threaded_walker(tmp_path):
+    make_tree(tmp_path)
+    os.symlink(tmp_path, tmp_path / "a" / "loop")
+    for kwargs in ({}, {"exclude_exts": ["py"], "exclude_dirs": ["node_*"]}, {"skip_quarantine": False},
+                   {"follow_symlinks": True}):
+        expected = sorted(walk_files(str(tmp_path), **kwargs))
+        assert sorted(walk_files_async(str(tmp_path), workers=4, **kwargs)) == expected
+
+
+def test_retries_transient_errors_then_reports(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    monkeypatch.setattr(async_walker, "BACKOFF_BASE", 0.001)
+    real_list = async_walker._list
+    failures = {"count": 0}
+
+    def flaky_list(folder, *args):
+        if folder.endswith("b") and failures["count"] < 2:
+            failures["count"] += 1
+            raise OSError(errno.EIO, "share went away", folder)
+        return real_list(folder, *args)
+
+    monkeypatch.setattr(async_walker, "_list", flaky_list)
+    report = {}
+    assert names(walk_files_async(str(tmp_path), report=report)) == names(walk_files(str(tmp_path)))
+    assert report["retries"] == 2 and report["errors"] == 0
+
+    # Out of retries: the folder is reported, the rest of the tree still walked
+    failures["count"] = 0
+    errors = []
+    found = names(walk_files_async(str(tmp_path), retries=1, on_error=lambda p, e: errors.append(p)))
+    assert errors == [str(tmp_path / "a" / "b")]
+    assert found == ["four.PY", "one.txt", "pkg.js"]
+
+
+def test_permanent_errors_are_not_retried(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    calls = []
+
+    def denied(folder, *args):
+        calls.append(folder)
+        raise PermissionError(errno.EACCES, "denied", folder)
+
+    monkeypatch.setattr(async_walker, "_list", denied)
+    report, errors = {}, []
+    assert list(walk_files_async(str(tmp_path), report=report, on_error=lambda p, e: errors.append(e))) == []
+    assert len(calls) == 1 and report["retries"] == 0
+    assert isinstance(errors[0], PermissionError)
+
+
+def test_hung_listing_times_out(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    real_list = async_walker._list
+
+    def hanging_list(folder, *args):
+        if folder.endswith("b"):
+            time.sleep(1)
+        return real_list(folder, *args)
+
+    monkeypatch.setattr(async_walker, "_list", hanging_list)
+    report, errors = {}, []
+    started = time.perf_counter()
+    found = names(walk_files_async(str(tmp_path), timeout=0.05, retries=0, report=report,
+                                   on_error=lambda p, e: errors.append(e)))
+    assert time.perf_counter() - started < 0.9
+    assert found == ["four.PY", "one.txt", "pkg.js"]
+    assert report["timeouts"] == 1 and isinstance(errors[0], TimeoutError)
+
+
+def test_placeholders_are_skipped_and_recorded(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    monkeypatch.setattr(async_walker, "is_placeholder", lambda st: st.st_size == len("a/one.txt"))
+    skipped, report = [], {}
+    found = names(walk_files_async(str(tmp_path), on_placeholder=skipped.append, report=report))
+    assert "one.txt" not in found and skipped == [str(tmp_path / "a" / "one.txt")]
+    assert report["placeholders"] == 1
+    assert "one.txt" in names(walk_files_async(str(tmp_path), include_placeholders=True))
+
+
+def test_is_placeholder():
+    Stat = namedtuple("Stat", "st_file_attributes st_flags")
+    assert is_placeholder(Stat(async_walker.FILE_ATTRIBUTE_RECALL_ON_DATA_ACCESS | 0x20, 0))
+    assert is_placeholder(Stat(0, async_walker.SF_DATALESS))
+    assert not is_placeholder(Stat(0x20, 0))
+    assert not is_placeholder(os.stat(__file__))
+
+
+def test_scan_table_with_async_walker(tmp_path):
+    make_tree(tmp_path)
+    table, dir_mtimes, _, _ = scan_table(str(tmp_path), walker=walk_files_async)
+    threaded, threaded_mtimes, _, _ = scan_table(str(tmp_path))
+    assert sorted(table.path(i) for i in range(len(table))) == \
+        sorted(threaded.path(i) for i in range(len(threaded)))
+    assert dir_mtimes == threaded_mtimes
+
+
+def test_cli_async_walk(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = tmp_path / "root"
+    make_tree(root)
+    (root / "a" / "b" / "one.txt").write_text("a/one.txt")
+    monkeypatch.setattr(async_walker, "is_placeholder", lambda st: st.st_size == len("a/b/two.jpg"))
+    records = run(["scan", str(root), "--async-walk", "--walk-workers", "4", "--exclude", ""])
+    assert [r["path"] for r in records if r["type"] == "placeholder"] == [str(root / "a" / "b" / "two.jpg")]
+    groups = [r for r in records if r["type"] == "group"]
+    assert len(groups) == 1 and groups[0]["count"] == 2
+    summary = records[-1]
+    assert summary["files_scanned"] == 5 and summary["walk"]["placeholders"] == 1
@@ -0,0 +1,25 @@
+import os
+from benchmarks.run_suite import STAGES, run_suite
+from benchmarks.tree_gen import generate_tree
+from core.normalize import normalize_name
+
+
+def test_tree_is_reproducible_and_copies_match(tmp_path):
+    a = generate_tree(str(tmp_path / "a"), files=300, size_distribution="fixed", mean_size=100, dup_ratio=0.3)
+    b = generate_tree(str(tmp_path / "b"), files=300, size_distribution="fixed", mean_size=100, dup_ratio=0.3)
+    assert a["duplicate_groups"] > 0 and a["duplicate_files"] == b["duplicate_files"]
+    for group in a["groups"]:
+        stems = {normalize_name(os.path.splitext(os.path.basename(p))[0]) for p in group}
+        contents = {open(p, "rb").read() for p in group}
+        assert len(stems) == 1 and len(contents) == 1
+    originals = [open(g[0], "rb").read() for g in a["groups"]]
+    assert len(set(originals)) == len(originals)
+
+
+def test_suite_finds_every_duplicate(tmp_path):
+    manifest = generate_tree(str(tmp_path / "tree"), files=200, mean_size=2000, dup_ratio=0.3, seed=7)
+    results = run_suite(manifest["root"])
+    assert set(results) == set(STAGES)
+    assert results["walk"]["items"] == 200
+    assert results["hash"]["duplicate_groups"] == manifest["duplicate_groups"]
+    assert results["move"]["items"] == manifest["duplicate_files"]
@@ -0,0 +1,71 @@
+import io
+import random
+import pytest
+from core import chunk_index
+from core.chunk_index import ChunkIndex, iter_chunks, update_index
+
+
+def random_bytes(n, seed):
+    return random.Random(seed).getrandbits(8 * n).to_bytes(n, "little")
+
+
+def reference_chunks(data):
+    """The gear chunker written out plainly: one hash step per byte, whole input in memory."""
+    chunks, start = [], 0
+    while start < len(data):
+        end = min(len(data), start + chunk_index.MAX_CHUNK)
+        h, cut = 0, end
+        for i in range(start + chunk_index.MIN_CHUNK, end):
+            h = ((h << 1) + chunk_index.GEAR[data[i]]) & chunk_index.MASK64
+            if not h & chunk_index.CUT_MASK:
+                cut = i + 1
+                break
+        chunks.append(data[start:cut])
+        start = cut
+    return chunks
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+@pytest.mark.parametrize("read_size", [1000, 70_000, 4 * 1024 * 1024])
+def test_boundaries_do_not_depend_on_reads_or_numpy(monkeypatch, vectorized, read_size):
+    if vectorized and chunk_index.np is None:
+        pytest.skip("numpy not installed")
+    if not vectorized:
+        monkeypatch.setattr(chunk_index, "np", None)
+    monkeypatch.setattr(chunk_index, "READ_SIZE", read_size)
+    # Random data cuts on the hash; long zero runs only at MAX_CHUNK
+    data = random_bytes(400_000, 5) + bytes(300_000) + random_bytes(50_000, 6)
+    assert list(iter_chunks(io.BytesIO(data))) == reference_chunks(data)
+
+
+def test_chunks_resync_after_an_insert():
+    data = random_bytes(1_000_000, 1)
+    edited = data[:300_000] + b"a few inserted bytes" + data[300_000:]
+    original = list(iter_chunks(io.BytesIO(data)))
+    changed = list(iter_chunks(io.BytesIO(edited)))
+
+    assert b"".join(original) == data and b"".join(changed) == edited
+    assert all(chunk_index.MIN_CHUNK <= len(c) <= chunk_index.MAX_CHUNK for c in original[:-1])
+    shared = set(original) & set(changed)
+    assert sum(len(c) for c in shared) > 0.8 * len(data)
+
+
+def test_index_reports_similar_pairs_and_savings(tmp_path):
+    base = random_bytes(600_000, 2)
+    (tmp_path / "disk-v1.img").write_bytes(base)
+    (tmp_path / "disk-v2.img").write_bytes(base[:200_000] + random_bytes(5000, 3) + base[200_000:])
+    (tmp_path / "other.img").write_bytes(random_bytes(600_000, 4))
+    paths = sorted(str(p) for p in tmp_path.glob("*.img"))
+
+    with ChunkIndex(str(tmp_path / "chunks.sqlite3")) as index:
+        assert update_index(index, paths) == 3
+        pairs = list(index.similar_pairs(min_ratio=0.5))
+        assert [(p["a"], p["b"]) for p in pairs] == [(paths[0], paths[1])]
+        assert pairs[0]["ratio"] > 0.8
+        savings = index.savings()
+        assert savings["dedupe_savings_bytes"] == pairs[0]["shared_bytes"]
+
+        # Unchanged files are not chunked again; deleted ones leave the index
+        assert update_index(index, paths[1:]) == 0
+        assert list(index.similar_pairs()) == []
+        assert index.savings()["dedupe_savings_bytes"] == 0
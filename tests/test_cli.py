@@ -0,0 +1,126 @@
+import io
+import json
+import subprocess
+import sys
+from core import cli, snapshot
+from core.find_duplicates_hash import PARTIAL_HASH_SIZE
+from core.hash_cache import HashCache
+from core.hashing import algorithm_of
+from core.mover import journal_path_for, move_files
+
+
+def run(args):
+    out = io.StringIO()
+    assert cli.run_scan(cli.build_parser().parse_args(args), out) == 0
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_scan_streams_ndjson(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = tmp_path / "root"
+    (root / "a").mkdir(parents=True)
+    (root / "b").mkdir()
+    (root / "a" / "photo.jpg").write_bytes(b"1" * 100)
+    (root / "b" / "photo (1).jpg").write_bytes(b"1" * 100)
+    (root / "b" / "other.jpg").write_bytes(b"2" * 100)
+    (root / "b" / "skip.py").write_bytes(b"1" * 100)
+
+    records = run(["scan", str(root), "--cache", str(tmp_path / "cache.sqlite3")])
+    assert [r["type"] for r in records] == ["scan", "group", "summary"]
+    group = records[1]
+    assert sorted(f["path"] for f in group["files"]) == [str(root / "a" / "photo.jpg"),
+                                                        str(root / "b" / "photo (1).jpg")]
+    assert group["reclaimable_bytes"] == 100
+
+    records = run(["scan", str(root), "--match", "size", "--hash", "full", "--exclude", "",
+                   "--cache", str(tmp_path / "cache.sqlite3")])
+    groups = [r for r in records if r["type"] == "group"]
+    assert len(groups) == 1 and groups[0]["count"] == 3
+    assert records[-1]["stages"][0]["stage"] == "partial"
+
+    # Matching content without --hash runs the full tier, and the header says so
+    records = run(["scan", str(root), "--match", "size,content", "--exclude", "", "--no-cache"])
+    assert records[0]["hash"] == "full" and records[0]["criteria"] == ["size", "content"]
+
+
+def test_scan_hashes_with_the_chosen_algorithms(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = tmp_path / "root"
+    root.mkdir()
+    for name in ("a.bin", "b.bin"):
+        (root / name).write_bytes(b"x" * 10000)
+    cache_path = str(tmp_path / "cache.sqlite3")
+
+    records = run(["scan", str(root), "--match", "size", "--hash", "full", "--cache", cache_path,
+                   "--partial-algorithm", "blake2b", "--full-algorithm", "blake2b"])
+    assert records[0]["partial_algorithm"] == "blake2b" and records[0]["full_algorithm"] == "blake2b"
+    assert [r["count"] for r in records if r["type"] == "group"] == [2]
+    cache = HashCache(cache_path)
+    try:
+        for kind, edge_size in (("partial", PARTIAL_HASH_SIZE), ("full", None)):
+            digest, _ = cache.lookup(str(root / "a.bin"), kind, edge_size)
+            assert algorithm_of(digest) == "blake2b"
+    finally:
+        cache.close()
+    assert cli.build_parser().parse_args(["scan", str(root)]).partial_algorithm == "sha256"
+
+
+def test_link_command(tmp_path):
+    root = tmp_path / "builds"
+    root.mkdir()
+    (root / "lib.so").write_bytes(b"\x7fELF" * 256)
+    (root / "lib copy.so").write_bytes(b"\x7fELF" * 256)
+    (root / "other.so").write_bytes(b"\x00ELF" * 256)
+
+    out = io.StringIO()
+    args = cli.build_parser().parse_args(["link", str(root), "--mode", "hardlink", "--no-cache"])
+    assert args.run(args, out) == 0
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["type"] for r in records] == ["link", "file", "summary"]
+    assert records[1]["keep"] == str(root / "lib.so") and records[1]["status"] == "linked"
+    assert records[-1]["reclaimed_bytes"] == 1024
+    assert (root / "lib.so").stat().st_ino == (root / "lib copy.so").stat().st_ino
+
+
+def test_link_command_times_one_link_stage(tmp_path):
+    root = tmp_path / "builds"
+    root.mkdir()
+    for i in range(3):
+        for name in ("a", "b"):
+            (root / f"{name}{i}.so").write_bytes(bytes([i]) * (100 + i))
+    stats_path = tmp_path / "stats.json"
+    args = cli.build_parser().parse_args(["link", str(root), "--mode", "hardlink", "--no-cache",
+                                          "--stats", str(stats_path)])
+    assert args.run(args, io.StringIO()) == 0
+    with open(stats_path) as f:
+        link = json.load(f)["stages"]["link"]
+    assert link["calls"] == 1  # not one per group
+    assert link["files_linked"] == 3 and link["bytes_reclaimed"] == 303
+
+
+def test_cli_does_not_import_tkinter():
+    code = "import sys, core.cli; sys.exit('tkinter' in sys.modules or 'customtkinter' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_restore_command(tmp_path):
+    root = tmp_path / "docs"
+    quarantine = root / "_quarantine_docs"
+    moves = []
+    for name in ("a.txt", "b.txt"):
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name)
+        moves.append((str(root / name), str(quarantine / name)))
+    move_files(moves, journal_path_for(str(quarantine)))
+    (root / "b.txt").write_text("took its place")
+
+    out = io.StringIO()
+    args = cli.build_parser().parse_args(["restore", journal_path_for(str(quarantine)), "--verify", "mtime"])
+    assert args.run(args, out) == 0
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["type"] for r in records] == ["restore", "file", "file", "summary"]
+    assert records[0]["quarantine"] == str(quarantine)
+    statuses = {r["src"]: r["status"] for r in records if r["type"] == "file"}
+    assert statuses == {moves[0][0]: "restored", moves[1][0]: "conflict"}
+    assert (records[-1]["restored"], records[-1]["conflict"]) == (1, 1)
+    assert (root / "a.txt").read_text() == "a.txt" and (root / "b.txt").read_text() == "took its place"
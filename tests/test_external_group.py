@@ -0,0 +1,152 @@
+import os
+import json
+import random
+import tracemalloc
+import pytest
+from benchmarks.tree_gen import generate_tree
+from core import cli, external_group, scan, snapshot
+from core.external_group import ExternalGrouper, group_external, parse_memory
+from core.file_table import FileTable
+from core.find_duplicates_hash import find_duplicates_staged
+from core.find_duplicates_size_ext import find_duplicates_by_size_and_ext, iter_duplicates_by_size_and_ext
+from core.grouping import group_rows, iter_groups
+from core.scan import iter_duplicate_groups
+from tests.test_scan_result import run
+
+SPILL = 4096  # bytes: a few dozen records per run, so every test merges many runs
+
+
+def as_sets(groups):
+    return sorted(sorted(group) for group in groups)
+
+
+def test_parse_memory():
+    assert parse_memory("512M") == 512 * 1024 ** 2
+    assert parse_memory("1.5GiB") == 3 * 1024 ** 3 // 2
+    assert parse_memory(" 4096 ") == 4096
+    for bad in ("", "lots", "0", "-1M", "5X"):
+        with pytest.raises(ValueError):
+            parse_memory(bad)
+
+
+@pytest.mark.parametrize("fanin", [2, 64])
+def test_groups_match_a_dict_and_keep_insertion_order(tmp_path, monkeypatch, fanin):
+    monkeypatch.setattr(external_group, "MAX_FANIN", fanin)
+    rng = random.Random(3)
+    records = [((rng.randrange(50), rng.choice(["", ".jpg", ".txt"])), f"file{i}") for i in range(3000)]
+    expected = {}
+    for key, value in records:
+        expected.setdefault(key, []).append(value)
+
+    stats = {}
+    with ExternalGrouper(SPILL, str(tmp_path), stats) as grouper:
+        for key, value in records:
+            grouper.add(key, value)
+        got = list(grouper.groups())
+        assert stats["runs"] > fanin and len(os.listdir(grouper._dir)) <= fanin
+    assert got == sorted((k, v) for k, v in expected.items() if len(v) > 1)
+    assert stats["records"] == 3000 and os.listdir(tmp_path) == []  # close() removed the runs
+
+
+def test_small_input_never_touches_disk(tmp_path):
+    stats = {}
+    groups = list(group_external([("a", 1), ("b", 2), ("a", 3)], 1 << 20, str(tmp_path), stats))
+    assert groups == [("a", [1, 3])] and stats["runs"] == 0 and os.listdir(tmp_path) == []
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("gen") / "tree")
+    generate_tree(root, files=600, size_distribution="fixed", mean_size=300, dup_ratio=0.3, seed=5)
+    return root
+
+
+@pytest.mark.parametrize("criteria", [["size"], ["name", "ext"], ["name", "size", "ext", "modified"]])
+def test_group_rows_spilled_equals_in_memory(tree, criteria):
+    table = FileTable.from_walk(tree)
+    stats = {}
+    spilled = group_rows(table, criteria, group_buffer=SPILL, stats=stats)
+    assert stats["runs"] > 1
+    for rows, offsets in (spilled, group_rows(table, criteria)):
+        groups = [list(g) for g in iter_groups(rows, offsets)]
+        assert all(g == sorted(g) for g in groups)  # rows stay in scan order
+    assert as_sets(iter_groups(*spilled)) == as_sets(iter_groups(*group_rows(table, criteria)))
+
+
+def test_hash_scanners_spilled_equal_in_memory(tree):
+    assert as_sets(find_duplicates_by_size_and_ext(tree, group_buffer=SPILL)) == \
+        as_sets(find_duplicates_by_size_and_ext(tree))
+    assert as_sets(find_duplicates_staged(tree, group_buffer=SPILL)) == as_sets(find_duplicates_staged(tree))
+    table = FileTable.from_walk(tree)
+    totals = {}
+    spilled = list(iter_duplicate_groups(table, ["size", "content"], stage_totals=totals, group_buffer=SPILL))
+    assert as_sets(spilled) == as_sets(iter_duplicate_groups(table, ["size", "content"]))
+    assert totals["group"]["runs"] > 1
+
+
+def test_size_groups_stream_from_the_merge(tree):
+    stats = {}
+    groups = iter_duplicates_by_size_and_ext(tree, stats=stats, group_buffer=SPILL)
+    first = next(groups)
+    assert stats["files"] == 600 and len(first) > 1  # the walk is done, the merge is not
+    assert as_sets([first, *groups]) == as_sets(find_duplicates_by_size_and_ext(tree))
+
+
+def min_budget(tree):
+    """The least --max-memory a CLI scan of tree is allowed to run in."""
+    table = FileTable.from_walk(tree)
+    return (table.estimated_nbytes() + scan.GROUP_INDEX_BYTES * len(table) + scan.WORKING_MEMORY
+            + scan.MIN_GROUP_BUFFER)
+
+
+def scan_groups(records):
+    return as_sets([f["path"] for f in r["files"]] for r in records if r["type"] == "group")
+
+
+def test_cli_scan_with_max_memory(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(scan, "MIN_GROUP_BUFFER", SPILL)  # leave grouping a buffer small enough to spill
+    budget = min_budget(tree)
+    unbounded = scan_groups(run(["scan", tree, "--exclude", "", "--hash", "full"]))
+    records = run(["scan", tree, "--exclude", "", "--hash", "full", "--max-memory", str(budget)])
+    assert scan_groups(records) == unbounded and unbounded
+    assert records[0]["max_memory"] == budget
+    assert next(s for s in records[-1]["stages"] if s["stage"] == "group")["runs"] > 1
+    # The groups spooled to disk end up in the snapshot like the in-memory ones
+    assert as_sets(snapshot.load_snapshot(snapshot.default_snapshot_path([tree]))["groups"]) == unbounded
+    # --group-buffer is the flag's older name
+    assert run(["scan", tree, "--exclude", "", "--group-buffer", str(budget)])[0]["max_memory"] == budget
+
+
+def test_cli_scan_stays_within_max_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = str(tmp_path / "tree")
+    generate_tree(root, files=3000, size_distribution="lognormal", mean_size=200, dup_ratio=0.3, seed=1)
+    args = ["scan", root, "--exclude", "", "--match", "size,content", "--no-cache"]
+    unbounded = scan_groups(run(args))
+    budget = min_budget(root) + 64 * 1024
+    parsed = cli.build_parser().parse_args(args + ["--max-memory", str(budget)])
+    # The output goes to a file: the run helper's StringIO would count against the budget
+    with open(tmp_path / "out.ndjson", "w") as out:
+        tracemalloc.start()
+        try:
+            assert parsed.run(parsed, out) == 0
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    with open(tmp_path / "out.ndjson") as f:
+        assert scan_groups(map(json.loads, f)) == unbounded and unbounded
+    assert peak < budget
+
+
+def test_cli_scan_rejects_a_budget_it_cannot_keep(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    with pytest.raises(ValueError, match="too little memory"):
+        run(["scan", tree, "--exclude", "", "--max-memory", str(min_budget(tree) - scan.MIN_GROUP_BUFFER)])
+    with pytest.raises(ValueError, match="too little memory for a scan"):
+        run(["scan", tree, "--max-memory", "1M"])
+    monkeypatch.setattr(snapshot, "PROGRESS_EVERY", 100)  # the walk checks its budget this often
+    with pytest.raises(ValueError, match="outgrew its memory budget"):
+        run(["scan", tree, "--exclude", "", "--max-memory", str(scan.MIN_GROUP_BUFFER + scan.WORKING_MEMORY + 1024)])
+    with pytest.raises(ValueError, match="--incremental"):
+        run(["scan", tree, "--max-memory", "1G", "--incremental"])
@@ -0,0 +1,20 @@
+from core.file_table import FileTable
+from gui.quarantine_gui import find_medium_safe_duplicates
+
+
+def test_table_round_trips_walk(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    for folder in ("a", "b"):
+        (tmp_path / folder / "Photo.JPG").write_bytes(b"same")
+        (tmp_path / folder / f"unique_{folder}.txt").write_bytes(folder.encode())
+
+    table = FileTable.from_walk(str(tmp_path))
+    assert len(table) == 4
+    assert len(table.dirs) == 2  # directory prefixes are interned
+    assert sorted(e.path for e in table) == sorted(str(p) for p in tmp_path.rglob("*.*"))
+
+    groups = find_medium_safe_duplicates(table)
+    assert len(groups) == 1
+    assert {r["File Name"] for r in groups[0]} == {"photo"}
+    assert {r["Size"] for r in groups[0]} == {4}
@@ -0,0 +1,53 @@
+import random
+from collections import defaultdict
+import pytest
+from core import grouping
+from core.file_table import FileTable
+from core.file_utils import normalize_name
+from core.grouping import group_rows, iter_groups
+
+
+def random_table(n=2000, seed=1):
+    rng = random.Random(seed)
+    table = FileTable()
+    for i in range(n):
+        stem = rng.choice(["a", "b", "c", "a - Copy", "b (1)", "C"])
+        ext = rng.choice([".jpg", ".JPG", ".png"])
+        table.append(f"/root/d{i % 7}/{stem}{ext}", rng.choice([1, 2, 3]), float(rng.choice([10, 20])), 5.0, i)
+    return table
+
+
+def dict_groups(table, criteria):
+    """The original start_scan grouping: one key tuple per file in a defaultdict."""
+    columns = {
+        "name": lambda i: normalize_name(table.names[i].rsplit(".", 1)[0]),
+        "ext": lambda i: "." + table.names[i].rsplit(".", 1)[1].lower(),
+        "size": lambda i: table.size[i],
+        "created": lambda i: table.ctime[i],
+        "modified": lambda i: table.mtime[i],
+    }
+    groups = defaultdict(list)
+    for i in range(len(table)):
+        groups[tuple(columns[c](i) for c in criteria)].append(i)
+    return sorted(g for g in groups.values() if len(g) > 1)
+
+
+@pytest.mark.parametrize("criteria", [["name"], ["name", "size", "ext"], ["size", "modified"],
+                                      ["ext", "created", "name", "modified"]])
+def test_group_rows_matches_dict_grouping(monkeypatch, criteria):
+    table = random_table()
+    expected = dict_groups(table, criteria)
+    rows, offsets = group_rows(table, criteria)
+    assert sorted(list(g) for g in iter_groups(rows, offsets)) == expected
+
+    monkeypatch.setattr(grouping, "np", None)  # pure-Python fallback
+    rows, offsets = group_rows(table, criteria)
+    assert sorted(list(g) for g in iter_groups(rows, offsets)) == expected
+
+
+def test_no_duplicates():
+    table = FileTable()
+    table.append("/x/a.txt", 1, 0.0, 0.0)
+    table.append("/x/b.txt", 2, 0.0, 0.0)
+    rows, offsets = group_rows(table, ["size"])
+    assert list(iter_groups(rows, offsets)) == []
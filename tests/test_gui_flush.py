@@ -0,0 +1,21 @@
+import queue
+import types
+import pytest
+
+pytest.importorskip("customtkinter")
+from gui.dupe_doctor_gui import DupeDoctorApp  # noqa: E402
+
+
+def test_failing_ui_call_keeps_the_queue_draining():
+    logged, scheduled, calls = [], [], []
+
+    def broken():
+        raise RuntimeError("widget gone")
+
+    app = types.SimpleNamespace(ui_queue=queue.Queue(), append_log=logged.extend, render_progress=lambda: None,
+                                after=lambda ms, func: scheduled.append(func), flush_ui=None)
+    for item in ["first", (broken, ()), (calls.append, ("enable buttons",)), "last"]:
+        app.ui_queue.put(item)
+    DupeDoctorApp.flush_ui(app)
+    assert calls == ["enable buttons"] and len(scheduled) == 1
+    assert logged[0] == "first" and "widget gone" in logged[1] and logged[-1] == "last"
@@ -0,0 +1,43 @@
+import os
+from core.find_duplicates_hash import find_duplicates_staged
+from core.hash_cache import HashCache
+
+
+def test_cache_reuses_digests_until_file_changes(tmp_path):
+    target = tmp_path / "tree"
+    target.mkdir()
+    for name in ("a.bin", "b.bin"):
+        (target / name).write_bytes(b"z" * 20_000)
+
+    with HashCache(str(tmp_path / "cache.sqlite3")) as cache:
+        assert len(find_duplicates_staged(str(target), cache=cache)) == 1
+        assert cache.hits == 0
+
+        misses = cache.misses
+        assert len(find_duplicates_staged(str(target), cache=cache)) == 1
+        assert cache.misses == misses  # nothing re-read
+
+        (target / "b.bin").write_bytes(b"y" * 20_000)
+        # Same size, and the rewrite may land in the same mtime tick: move the mtime on explicitly
+        st = os.stat(target / "b.bin")
+        os.utime(target / "b.bin", ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert find_duplicates_staged(str(target), cache=cache) == []
+        assert cache.misses > misses
+
+
+def test_prune_and_evict(tmp_path):
+    files = []
+    for i in range(5):
+        path = tmp_path / f"f{i}.txt"
+        path.write_bytes(str(i).encode())
+        files.append(str(path))
+
+    with HashCache(str(tmp_path / "cache.sqlite3"), max_entries=3) as cache:
+        for path in files:
+            cache.get_digest(path, "full", lambda p: "digest-" + os.path.basename(p))
+        assert len(cache) == 5
+
+        os.remove(files[0])
+        assert cache.prune_missing(str(tmp_path)) == 1
+        assert cache.evict() == 1
+        assert len(cache) == 3
@@ -0,0 +1,25 @@
+from core.find_duplicates_hash import find_duplicates_staged, get_file_hash
+from core.hash_service import HashService
+
+
+def make_tree(tmp_path):
+    for i in range(20):
+        (tmp_path / f"dup_{i % 4}_{i}.bin").write_bytes(bytes([i % 4]) * 30_000)
+    return str(tmp_path)
+
+
+def test_service_matches_serial_pipeline(tmp_path):
+    folder = make_tree(tmp_path)
+    serial = sorted(sorted(g) for g in find_duplicates_staged(folder))
+    with HashService(workers=4, device_limits={"hdd": 1, "ssd": 2, "network": 2}) as service:
+        pooled = sorted(sorted(g) for g in find_duplicates_staged(folder, hash_service=service))
+    assert pooled == serial
+    assert len(serial) == 4
+
+
+def test_process_pool(tmp_path):
+    folder = make_tree(tmp_path)
+    paths = [str(p) for p in tmp_path.iterdir()]
+    with HashService(workers=2, use_processes=True) as service:
+        digests = service.map(get_file_hash, paths)
+    assert digests == {p: get_file_hash(p) for p in paths}
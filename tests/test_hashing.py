@@ -0,0 +1,40 @@
+import hashlib
+import pytest
+from core import hashing
+from core.find_duplicates_hash import find_duplicates_staged
+from core.hash_cache import HashCache
+from core.hashing import algorithm_of, hash_edges, hash_file
+
+
+@pytest.mark.parametrize("method", hashing.METHODS)
+@pytest.mark.parametrize("size", [0, 100, 300_000, 3_000_000])
+def test_methods_agree(tmp_path, method, size, monkeypatch):
+    monkeypatch.setattr(hashing, "MMAP_MIN_SIZE", 1_000_000)  # let "auto" take the mmap path too
+    data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    path = tmp_path / "f.bin"
+    path.write_bytes(data)
+    assert hash_file(str(path), "sha256", method) == hashlib.sha256(data).hexdigest()
+    assert hash_file(str(path), "blake2b", method) == "blake2b:" + hashlib.blake2b(data).hexdigest()
+
+
+def test_edges_and_algorithm_names(tmp_path):
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"a" * 10 + b"b" * 10_000 + b"c" * 10)
+    digest = hash_edges(str(path), 10, "blake2b")
+    assert digest == "blake2b:" + hashlib.blake2b(b"a" * 10 + b"c" * 10).hexdigest()
+    assert algorithm_of(digest) == "blake2b" and algorithm_of(hash_file(str(path))) == "sha256"
+    assert hash_file(str(tmp_path / "missing")) is None
+    with pytest.raises(ValueError):
+        hash_file(str(path), "md4-please")
+
+
+def test_cached_digests_of_another_algorithm_are_not_reused(tmp_path):
+    folder = tmp_path / "files"
+    folder.mkdir()
+    for name in ("a", "b"):
+        (folder / name).write_bytes(b"same" * 5000)
+    with HashCache(str(tmp_path / "cache.sqlite3")) as cache:
+        # a's partial digest is cached with blake2b, b's is made with the default: they must still match
+        cache.get_digest(str(folder / "a"), "partial", lambda p: hash_edges(p, 4096, "blake2b"), 4096)
+        groups = find_duplicates_staged(str(folder), cache=cache)
+    assert len(groups) == 1
@@ -0,0 +1,53 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cumulative import time budgets (µs), roughly 2.5-5x what a warm import takes here
+# (CLI ~100 ms, GUI ~160 ms), so a slow CI machine still passes
+CLI_BUDGET_US = 500_000
+GUI_BUDGET_US = 400_000
+GUI_ONLY = ("tkinter", "customtkinter", "_tkinter")
+
+
+def import_times(code):
+    """{module: cumulative µs} of every module `python -X importtime -c code` imported."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (ROOT, os.environ.get("PYTHONPATH")) if p))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_starts_without_gui_asyncio_or_multiprocessing():
+    times = import_times("import core.cli")
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & {*GUI_ONLY, "asyncio", "multiprocessing"}
+    assert times["core.cli"] < CLI_BUDGET_US
+
+
+def test_api_imports_names_on_first_use():
+    times = import_times("import core.api")
+    assert [name for name in times if name.startswith("core.") and name != "core.api"] == []
+
+    times = import_times("from core import api\nfor name in api.__all__: getattr(api, name)")
+    assert not {name.split(".")[0] for name in times} & set(GUI_ONLY)
+
+
+def test_quarantine_helpers_import_without_tkinter():
+    times = import_times("import gui.quarantine_gui")
+    assert not {name.split(".")[0] for name in times} & set(GUI_ONLY)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("customtkinter") is None, reason="customtkinter not installed")
+def test_gui_import_budget():
+    times = import_times("import gui.dupe_doctor_gui")
+    assert "core.cli" not in times and "asyncio" not in times
+    assert times["gui.dupe_doctor_gui"] < GUI_BUDGET_US
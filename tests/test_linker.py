@@ -0,0 +1,57 @@
+import os
+from core.linker import link_file, link_group, pick_canonical
+
+
+def test_link_group_hardlinks_and_reports_bytes(tmp_path):
+    keep = tmp_path / "song.mp3"
+    copies = [tmp_path / "song - Copy.mp3", tmp_path / "sub" / "song (2).mp3"]
+    (tmp_path / "sub").mkdir()
+    for p in [keep] + copies:
+        p.write_bytes(b"\x01" * 5000)
+    odd = tmp_path / "song (3).mp3"
+    odd.write_bytes(b"\x02" * 5000)  # same size, different bytes
+
+    paths = [str(p) for p in copies + [odd, keep]]
+    assert pick_canonical(paths) == str(keep)
+    results = []
+    reclaimed = link_group(paths, mode="hardlink", on_result=lambda *r: results.append(r))
+
+    assert reclaimed == 10000
+    statuses = {os.path.basename(path): (status, how) for _, path, status, how, _ in results}
+    assert statuses["song (3).mp3"] == ("skipped", "content differs")
+    assert statuses["song - Copy.mp3"] == ("linked", "hardlink")
+    for p in copies:
+        assert os.path.samefile(p, keep)
+    assert not os.path.samefile(odd, keep)
+
+    # Second run: nothing left to link
+    results.clear()
+    assert link_group(paths, mode="hardlink", on_result=lambda *r: results.append(r)) == 0
+    assert {r[3] for r in results} == {"already linked", "content differs"}
+
+
+def test_auto_mode_keeps_content_and_leaves_no_temp_files(tmp_path):
+    a, b = tmp_path / "a.bin", tmp_path / "b.bin"
+    a.write_bytes(b"data" * 1000)
+    b.write_bytes(b"data" * 1000)
+    how = link_file(str(a), str(b), mode="auto")
+    assert how in ("reflink", "hardlink")
+    assert b.read_bytes() == b"data" * 1000
+    assert sorted(os.listdir(tmp_path)) == ["a.bin", "b.bin"]
+
+
+def test_dry_run_changes_nothing(tmp_path):
+    a, b = tmp_path / "a.bin", tmp_path / "a copy.bin"
+    a.write_bytes(b"z" * 100)
+    b.write_bytes(b"z" * 100)
+    assert link_group([str(a), str(b)], dry_run=True) == 100
+    assert not os.path.samefile(a, b)
+
+
+def test_missing_keeper_fails_the_group(tmp_path):
+    a, b, c = (tmp_path / name for name in ("a.bin", "a copy.bin", "a (2).bin"))
+    for p in (b, c):
+        p.write_bytes(b"z" * 100)
+    results = []
+    assert link_group([str(a), str(b), str(c)], keep=str(a), on_result=lambda *r: results.append(r)) == 0
+    assert sorted((path, status) for _, path, status, _, _ in results) == [(str(c), "failed"), (str(b), "failed")]
@@ -1,47 +1,39 @@
 import os
 import time
+from core.walker import walk_files
 
 
 def scan_folder_metadata_only(folder_path, limit=50):
     result = []
-    file_count = 0
-
-    for root, _, _ in os.walk(folder_path):
-        try:
-            with os.scandir(root) as entries:
-                for entry in entries:
-                    if not entry.is_file(follow_symlinks=False):
-                        continue
-
-                    info = {
-                        "Path": entry.path,
-                        "Name": entry.name,
-                        "Extension": os.path.splitext(entry.name)[1].lower()
-                    }
-
-                    try:
-                        stat = entry.stat(follow_symlinks=False)
-                        info["Size"] = stat.st_size
-                        info["Created"] = time.ctime(stat.st_ctime)
-                        info["Modified"] = time.ctime(stat.st_mtime)
-                        info["Stat Success"] = True
-                    except Exception as e:
-                        info["Size"] = "Unavailable"
-                        info["Created"] = "Unavailable"
-                        info["Modified"] = "Unavailable"
-                        info["Stat Success"] = False
-                        info["Error"] = str(e)
-
-                    result.append(info)
-                    file_count += 1
-
-                    if file_count >= limit:
-                        return result
-
-        except Exception as e:
-            print(f"Failed to access {root}: {e}")
-
-    return result
+
+    def failed(path, e):
+        # Directories that can't be listed and files that can't be stat'ed both land here
+        result.append({
+            "Path": path,
+            "Name": os.path.basename(path),
+            "Extension": os.path.splitext(path)[1].lower(),
+            "Size": "Unavailable",
+            "Created": "Unavailable",
+            "Modified": "Unavailable",
+            "Stat Success": False,
+            "Error": str(e)
+        })
+
+    # Single pass: every record comes straight from the scandir listing
+    for entry in walk_files(folder_path, skip_quarantine=False, on_error=failed):
+        result.append({
+            "Path": entry.path,
+            "Name": entry.name,
+            "Extension": os.path.splitext(entry.name)[1].lower(),
+            "Size": entry.size,
+            "Created": time.ctime(entry.ctime),
+            "Modified": time.ctime(entry.mtime),
+            "Stat Success": True
+        })
+        if len(result) >= limit:
+            return result[:limit]
+
+    return result[:limit]
 
 
 # Run the test
@@ -0,0 +1,78 @@
+import json
+import threading
+import time
+from core import snapshot
+from core.metrics import Histogram, Metrics
+from core.mover import move_files
+from core.walker import walk_files
+from tests.test_cli import run
+
+
+def test_histogram_percentiles():
+    h = Histogram()
+    for _ in range(98):
+        h.observe(0.000003)   # 3 µs -> "<= 4 µs" bucket
+    h.observe(0.002)
+    h.observe(0.5)
+    summary = h.summary()
+    assert summary["count"] == 100 and summary["max_ms"] == 500.0
+    assert summary["p50_ms"] == 0.004 and summary["p99_ms"] == 2.048
+    assert Histogram().summary() == {"count": 0}
+
+
+def test_stages_count_walk_and_move(tmp_path):
+    (tmp_path / "src").mkdir()
+    for i in range(5):
+        (tmp_path / "src" / f"f{i}.txt").write_bytes(b"x" * 10)
+    (tmp_path / "src" / "skip.py").write_bytes(b"")
+    updates = []
+    metrics = Metrics(on_update=updates.append)
+    with metrics.stage("walk"):
+        entries = list(walk_files(str(tmp_path / "src"), exclude_exts=["py"], metrics=metrics))
+    with metrics.stage("move"):
+        move_files([(e.path, str(tmp_path / "q" / e.name)) for e in entries], str(tmp_path / "q" / "j.ndjson"),
+                   metrics=metrics)
+
+    snap = metrics.snapshot()
+    assert snap["counters"]["files"] == 5 and snap["counters"]["skipped"] == 1
+    assert snap["histograms"]["stat"]["count"] == 5
+    assert snap["stages"]["walk"]["files"] == 5 and "files_moved" not in snap["stages"]["walk"]
+    assert snap["stages"]["move"]["files_moved"] == 5 and snap["stages"]["move"]["bytes_moved"] == 50
+    assert [u["stage"] for u in updates[-2:]] == [None, None]  # every stage end is reported
+
+
+def test_overlapping_stages_on_threads_end_their_own_entry():
+    metrics = Metrics()
+    b_started, a_done = threading.Event(), threading.Event()
+
+    def run_b():
+        with metrics.stage("b"):
+            b_started.set()
+            a_done.wait(5)
+
+    thread = threading.Thread(target=run_b)
+    with metrics.stage("a"):
+        time.sleep(0.05)
+        thread.start()
+        b_started.wait(5)
+    assert metrics.snapshot()["stage"] == "b"  # "a" ended and removed its own entry, not b's
+    a_done.set()
+    thread.join()
+    snap = metrics.snapshot()
+    assert snap["stage"] is None and snap["stages"]["a"]["seconds"] >= 0.05
+
+
+def test_cli_stats_and_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.bin").write_bytes(b"1" * 10_000)
+    (root / "b.bin").write_bytes(b"1" * 10_000)
+    stats_path = tmp_path / "stats.json"
+    run(["scan", str(root), "--match", "size", "--hash", "full", "--no-cache", "--stats", str(stats_path),
+         "--profile", "cprofile", "--profile-dir", str(tmp_path / "prof")])
+
+    stats = json.loads(stats_path.read_text())
+    assert set(stats["stages"]) == {"walk", "group", "hash"}
+    assert stats["stages"]["hash"]["bytes_hashed"] == 2 * 8192 + 2 * 10_000  # partial edges, then full
+    assert (tmp_path / "prof" / "hash.prof").exists()
@@ -0,0 +1,82 @@
+import os
+from core import mover
+from core.mover import journal_state, move_files, quarantine_path
+
+
+def make_moves(tmp_path, count=5):
+    root = tmp_path / "photos"
+    quarantine = root / "_quarantine_photos"
+    for i in range(count):
+        folder = root / f"album_{i % 2}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"img_{i}.jpg").write_bytes(b"x" * (i + 1))
+    moves = [(str(p), quarantine_path(str(p), str(root), str(quarantine)))
+             for p in sorted(root.rglob("*.jpg"))]
+    return moves, str(quarantine / mover.JOURNAL_NAME)
+
+
+def test_moves_are_renamed_and_journaled(tmp_path):
+    moves, journal = make_moves(tmp_path)
+    stats = move_files(moves, journal, batch_size=2)
+
+    assert stats["moved"] == stats["renamed"] == 5
+    for src, dst in moves:
+        assert not os.path.exists(src) and os.path.exists(dst)
+    state = journal_state(journal)
+    assert {e["op"] for e in state.values()} == {"done"}
+    assert state[moves[0][0]]["size"] == os.path.getsize(moves[0][1])
+
+
+def test_cross_device_moves_copy_on_pool(tmp_path, monkeypatch):
+    moves, journal = make_moves(tmp_path)
+    real_move = mover._move_one
+    monkeypatch.setattr(mover, "_move_one", lambda src, dst, same_device: real_move(src, dst, False))
+    stats = move_files(moves, journal, workers=3)
+    assert stats["moved"] == stats["copied"] == 5
+    assert all(os.path.exists(dst) for _, dst in moves)
+
+
+def test_resume_after_interruption(tmp_path):
+    moves, journal = make_moves(tmp_path)
+    done = []
+    stats = move_files(moves, journal, cancel=lambda: len(done) >= 2,
+                       on_moved=lambda src, dst, how: done.append(src))
+    assert stats["cancelled"]
+    # Simulate a crash right after a rename, before its "done" entry was written
+    src, dst = moves[-1]
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.rename(src, dst)
+
+    stats = move_files(moves, journal)
+    assert stats["skipped"] == 3  # 2 done + 1 recovered from the file system
+    assert stats["moved"] == 2
+    state = journal_state(journal)
+    assert state[src]["how"] == "recovered"
+    assert all(state[s]["op"] == "done" for s, _ in moves)
+
+
+def test_existing_destination_is_not_overwritten(tmp_path):
+    moves, journal = make_moves(tmp_path, count=1)
+    src, dst = moves[0]
+    os.makedirs(os.path.dirname(dst))
+    with open(dst, "wb") as f:
+        f.write(b"keep me")
+    stats = move_files(moves, journal)
+    assert stats["failed"] == 1 and os.path.exists(src)
+    with open(dst, "rb") as f:
+        assert f.read() == b"keep me"
+
+
+def test_folder_that_cannot_be_created_fails_only_its_moves(tmp_path):
+    moves, journal = make_moves(tmp_path, count=4)
+    # A file where album_0's quarantine folder should go
+    blocked = os.path.dirname(moves[0][1])
+    os.makedirs(os.path.dirname(blocked))
+    with open(blocked, "wb"):
+        pass
+    stats = move_files(moves, journal)
+    assert stats["failed"] == 2 and stats["moved"] == 2
+    state = journal_state(journal)
+    for src, dst in moves:
+        assert state[src]["op"] == ("failed" if dst.startswith(blocked) else "done")
+        assert os.path.exists(src) == dst.startswith(blocked)
@@ -0,0 +1,61 @@
+import re
+import ntpath
+import types
+import pytest
+from core import keep
+from core.keep import in_reference, keep_key, pick_keeper
+from core.linker import pick_canonical
+from core.normalize import get_normalizer, normalize_name, parse_rule_sets
+from core.walker import FileEntry
+
+
+def old_normalize_name(name):
+    """The two-regex version normalize_name replaced."""
+    name = re.sub(r" - Copy( \(\d+\))?$", "", name)
+    name = re.sub(r" \(\d+\)$", "", name)
+    return name.strip()
+
+
+@pytest.mark.parametrize("name", ["photo", "photo - Copy", "photo - Copy (2)", "photo (1)", "photo (1) - Copy",
+                                  "photo (1) (2)", "photo - Copy - Copy", "photo (x)", " - Copy", "(1)",
+                                  "Copy of photo", "photo copy 2", ""])
+def test_default_rules_match_old_behaviour(name):
+    assert normalize_name(name) == old_normalize_name(name)
+
+
+def test_extra_rule_sets():
+    normalize = get_normalizer(parse_rule_sets("windows, copy_of, macos, locale"))
+    for name in ["Copy of report", "Copy (2) of report", "report copy", "report copy 3", "report - Kopie (2)",
+                 "Copie de report", "report - コピー", "report (4)"]:
+        assert normalize(name) == "report", name
+    assert normalize("Copycat of mine") == "Copycat of mine"
+    assert get_normalizer(("windows",)) is get_normalizer(("windows",))
+    with pytest.raises(ValueError):
+        parse_rule_sets("windows,klingon")
+
+
+def test_keep_policies(tmp_path):
+    entries = [FileEntry("/p/archive/2019/photo.jpg", "photo.jpg", 1, 0, 30.0, 1, 1),
+               FileEntry("/p/photo - Copy.jpg", "photo - Copy.jpg", 1, 0, 10.0, 2, 1),
+               FileEntry("/p/keep/photo (1).jpg", "photo (1).jpg", 1, 0, 20.0, 3, 1)]
+    assert pick_keeper(entries).name == "photo.jpg"
+    assert pick_keeper(entries, "oldest").name == "photo - Copy.jpg"
+    assert pick_keeper(entries, "shortest_path").path == "/p/photo - Copy.jpg"
+    assert pick_keeper(entries, "preferred_dir", ["/p/keep"]).name == "photo (1).jpg"
+    assert pick_keeper(entries, "preferred_dir", ["/p/none"]).name == "photo.jpg"
+    with pytest.raises(ValueError):
+        keep_key("preferred_dir")
+
+    (tmp_path / "b.txt").write_text("x")
+    (tmp_path / "a - Copy.txt").write_text("x")
+    assert pick_canonical([str(tmp_path / "a - Copy.txt"), str(tmp_path / "b.txt")]) == str(tmp_path / "b.txt")
+
+
+def test_folders_match_case_insensitively_on_windows(monkeypatch):
+    monkeypatch.setattr(keep, "os", types.SimpleNamespace(path=ntpath))
+    entries = [FileEntry(r"C:\Photos\photo.jpg", "photo.jpg", 1, 0, 10.0, 1, 1),
+               FileEntry(r"C:\Archive\2019\photo (1).jpg", "photo (1).jpg", 1, 0, 20.0, 2, 1)]
+    assert in_reference(r"C:\Archive\2019\photo (1).jpg", [r"c:\archive"])
+    assert not in_reference(r"C:\Archive2\photo.jpg", [r"c:\archive"])
+    assert pick_keeper(entries, reference_dirs=[r"c:\ARCHIVE"]).name == "photo (1).jpg"
+    assert pick_keeper(entries, "preferred_dir", [r"c:/archive/2019"]).name == "photo (1).jpg"
@@ -0,0 +1,57 @@
+import random
+import pytest
+from core.perceptual import BKTree, MultiIndexHash, cluster_hashes, dhash_pixels, image_hash, popcount
+
+
+def near_copies(seed=0, originals=300):
+    rng = random.Random(seed)
+    hashes = {}
+    for i in range(originals):
+        value = rng.getrandbits(64)
+        hashes[f"{i}.jpg"] = value
+        hashes[f"{i} (1).jpg"] = value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+    return hashes
+
+
+@pytest.mark.parametrize("index", [lambda: BKTree(), lambda: MultiIndexHash(6, 600)])
+def test_index_queries_match_brute_force(index):
+    hashes = near_copies()
+    tree = index()
+    for item, value in hashes.items():
+        tree.add(value, item)
+    probe = hashes["7.jpg"]
+    expected = sorted(item for item, value in hashes.items() if popcount(value ^ probe) <= 6)
+    assert sorted(item for _, item in tree.query(probe, 6)) == expected
+
+
+@pytest.mark.parametrize("index", [lambda: BKTree(), lambda: MultiIndexHash(6, 600)])
+def test_index_yields_every_item_sharing_a_hash(index):
+    tree = index()
+    for item in ("a.jpg", "a copy.jpg"):
+        tree.add(0xF0F0, item)
+    tree.add(0xF0F1, "b.jpg")
+    assert sorted(tree.query(0xF0F0, 2)) == [(0, "a copy.jpg"), (0, "a.jpg"), (1, "b.jpg")]
+
+
+@pytest.mark.parametrize("index", ["mih", "bktree"])
+def test_cluster_pairs_near_copies(index):
+    groups = cluster_hashes(near_copies(), max_distance=4, index=index)
+    assert sorted(sorted(g) for g in groups) == sorted(sorted([f"{i}.jpg", f"{i} (1).jpg"]) for i in range(300))
+
+
+def test_dhash_pixels():
+    gradient = [x * 10 for _ in range(8) for x in range(9)]
+    assert dhash_pixels(gradient) == 0
+    assert dhash_pixels(gradient[::-1]) == (1 << 64) - 1
+
+
+def test_resized_copy_has_a_close_hash(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    img = Image.new("L", (256, 256))
+    img.putdata([(x * y) % 256 for y in range(256) for x in range(256)])
+    img.save(tmp_path / "a.png")
+    img.resize((128, 128)).save(tmp_path / "a small.jpg", quality=80)
+    for kind in ("dhash", "phash"):
+        a = int(image_hash(str(tmp_path / "a.png"), kind), 16)
+        b = int(image_hash(str(tmp_path / "a small.jpg"), kind), 16)
+        assert popcount(a ^ b) <= 10
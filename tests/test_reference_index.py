@@ -0,0 +1,105 @@
+import os
+import pytest
+from core import snapshot
+from core.find_duplicates_hash import PARTIAL_HASH_SIZE
+from core.reference_index import ReferenceIndex
+from core.scan_result import ScanResult
+from tests.test_scan_result import run
+
+EDGES = b"e" * PARTIAL_HASH_SIZE
+
+
+def write(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def make_archive(tmp_path):
+    archive, drop = tmp_path / "archive", tmp_path / "drop"
+    write(archive, {"2019/photo.jpg": b"p" * 100, "2019/video.mp4": EDGES + b"v" * 5000 + EDGES,
+                    "2020/other.jpg": b"o" * 100, "2020/unrelated.bin": b"u" * 777})
+    write(drop, {"photo.jpg": b"p" * 100, "sub/video copy.mp4": EDGES + b"v" * 5000 + EDGES,
+                 "lookalike.mp4": EDGES + b"x" * 5000 + EDGES, "same size.jpg": b"s" * 100,
+                 "new.txt": b"brand new"})
+    return archive, drop
+
+
+def files_of(folder):
+    return [(os.path.join(d, n), os.path.getsize(os.path.join(d, n))) for d, _, names in os.walk(folder)
+            for n in names]
+
+
+def test_match_hashes_only_size_matches(tmp_path):
+    archive, drop = make_archive(tmp_path)
+    with ReferenceIndex(str(tmp_path / "ref.sqlite3")) as index:
+        assert index.update(str(archive)) == {"files": 4, "added": 4, "changed": 0, "removed": 0, "hashed": 0}
+        stats = {}
+        matches = {os.path.basename(p): os.path.relpath(ref, archive)
+                   for p, ref, _ in index.match(files_of(drop), stats=stats)}
+    assert matches == {"photo.jpg": os.path.join("2019", "photo.jpg"),
+                       "video copy.mp4": os.path.join("2019", "video.mp4")}
+    # new.txt has no size match, so it was never hashed; unrelated.bin was never hashed either
+    assert stats["candidates"] == 4 and stats["reference_hashed"] == 4
+
+    # Digests persist: the second check reads no reference file
+    with ReferenceIndex(str(tmp_path / "ref.sqlite3")) as index:
+        stats = {}
+        assert len(list(index.match(files_of(drop), stats=stats))) == 2
+        assert stats["reference_hashed"] == 0
+
+
+def test_update_drops_changed_and_removed_files(tmp_path):
+    archive, drop = make_archive(tmp_path)
+    with ReferenceIndex(str(tmp_path / "ref.sqlite3")) as index:
+        index.update(str(archive), digests="full")
+        (archive / "2019" / "photo.jpg").write_bytes(b"q" * 100)
+        os.utime(archive / "2019" / "photo.jpg", (1, 1))
+        # Checked before the next update: the changed reference file is not trusted
+        assert [os.path.basename(p) for p, _, _ in index.match(files_of(drop))] == ["video copy.mp4"]
+        os.remove(archive / "2019" / "video.mp4")
+        stats = index.update(str(archive))
+        assert (stats["changed"], stats["removed"], len(index)) == (1, 1, 3)
+        assert list(index.match(files_of(drop))) == []
+
+
+def test_multi_root_move_keeps_reference_copies(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    archive, drop = make_archive(tmp_path)
+    write(archive, {"2021/photo.jpg": b"p" * 100})
+    roots = [str(archive), str(drop)]
+    run(["scan", *roots, "--match", "size,content"])
+    result = ScanResult.load(roots)
+    assert result.roots == roots and len(result) == 2
+
+    quarantine = str(tmp_path / "q")
+    moves = result.plan_moves(quarantine, policy="shortest_path", reference_dirs=[str(archive)])
+    assert sorted(moves) == [(str(drop / "photo.jpg"), os.path.join(quarantine, "drop", "photo.jpg")),
+                             (str(drop / "sub" / "video copy.mp4"),
+                              os.path.join(quarantine, "drop", "sub", "video copy.mp4"))]
+
+    records = run(["move", *roots, "--reference", str(archive), "--quarantine", quarantine])
+    assert records[-1]["moved"] == 2
+    assert (archive / "2021" / "photo.jpg").exists() and not (drop / "photo.jpg").exists()
+
+    with pytest.raises(ValueError, match="Overlapping"):
+        snapshot.scan_table([str(archive), str(archive / "2019")])
+
+
+def test_check_command(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    archive, drop = make_archive(tmp_path)
+    drop2 = tmp_path / "drop2"
+    write(drop2, {"again.jpg": b"o" * 100})
+    index = str(tmp_path / "ref.sqlite3")
+    assert run(["index", str(archive), "--index", index, "--no-cache"])[-1]["added"] == 4
+
+    records = run(["check", str(drop), str(drop2), "--reference", str(archive), "--index", index, "--no-cache",
+                   "--exclude", "", "--move"])
+    matched = sorted(os.path.basename(r["path"]) for r in records if r["type"] == "match")
+    assert matched == ["again.jpg", "photo.jpg", "video copy.mp4"]
+    summary = records[-1]
+    assert summary["matches"] == 3 and summary["moved"] == 3
+    assert (drop / "_quarantine_drop" / "drop2" / "again.jpg").exists()
+    assert (drop / "new.txt").exists() and (drop / "lookalike.mp4").exists()
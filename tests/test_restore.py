@@ -0,0 +1,163 @@
+import errno
+import ntpath
+import os
+from core import restore
+from core.hash_cache import HashCache
+from core.find_duplicates_hash import get_file_hash
+from core.mover import move_files, quarantine_path
+from core.restore import load_moves, restore_quarantine
+
+
+def quarantine_some(tmp_path, count=4):
+    root = tmp_path / "docs"
+    quarantine = root / "_quarantine_docs"
+    for i in range(count):
+        folder = root / f"sub_{i % 2}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"report_{i}.txt").write_text(f"report {i}")
+    originals = sorted(str(p) for p in root.rglob("*.txt"))
+    moves = [(p, quarantine_path(p, str(root), str(quarantine))) for p in originals]
+    move_files(moves, str(quarantine / "move_journal.ndjson"))
+    return str(quarantine), moves
+
+
+def test_restore_puts_files_back(tmp_path):
+    quarantine, moves = quarantine_some(tmp_path)
+    statuses = {}
+    stats = restore_quarantine(quarantine, on_file=lambda src, status, detail: statuses.__setitem__(src, status))
+    assert stats["restored"] == 4
+    assert set(statuses.values()) == {"restored"}
+    assert all(os.path.exists(src) and not os.path.exists(dst) for src, dst in moves)
+    # Journaled: a second run has nothing left to do
+    assert load_moves(quarantine) == []
+
+
+def test_conflicts_and_verification(tmp_path):
+    quarantine, moves = quarantine_some(tmp_path)
+    (src0, _), (src1, dst1), (src2, dst2) = moves[:3]
+    with open(src0, "w") as f:
+        f.write("a new file took its place")
+    with open(dst1, "a") as f:
+        f.write(" edited in quarantine")
+    os.remove(dst2)
+
+    stats = restore_quarantine(quarantine, conflict="skip")
+    assert (stats["conflict"], stats["changed"], stats["missing"], stats["restored"]) == (1, 1, 1, 1)
+    with open(src0) as f:
+        assert f.read() == "a new file took its place"
+
+    stats = restore_quarantine(quarantine, conflict="rename", verify="none")
+    assert stats["restored"] == 2
+    assert os.path.exists(os.path.splitext(src0)[0] + " (restored).txt")
+    assert os.path.exists(src1)
+
+
+def test_hash_verification_uses_cached_digest(tmp_path):
+    root = tmp_path / "docs"
+    root.mkdir()
+    src = root / "a.txt"
+    src.write_text("same size!")
+    with HashCache(str(tmp_path / "cache.sqlite3")) as cache:
+        cache.get_digest(str(src), "full", get_file_hash)
+        quarantine = root / "_quarantine_docs"
+        dst = quarantine_path(str(src), str(root), str(quarantine))
+        move_files([(str(src), dst)], str(quarantine / "move_journal.ndjson"))
+        with open(dst, "w") as f:
+            f.write("other text")  # same size, different content
+        stats = restore_quarantine(str(quarantine), verify="hash", cache=cache)
+    assert stats["changed"] == 1 and not src.exists()
+
+
+def test_legacy_dupe_log(tmp_path):
+    root = tmp_path / "a,b"
+    quarantine = root / "_quarantine_a,b"
+    quarantine.mkdir(parents=True)
+    (quarantine / "x.txt").write_text("x")
+    with open(quarantine / "dupe_log.csv", "w", encoding="utf-8") as f:
+        f.write(f"{root / 'x.txt'},{quarantine / 'x.txt'}\n")
+    stats = restore_quarantine(str(quarantine))
+    assert stats["restored"] == 1 and (root / "x.txt").exists()
+
+
+def test_legacy_log_with_mixed_separators(tmp_path, monkeypatch):
+    # A Windows log: askdirectory gives "/", os.path.join adds "\", and the GUI passes normpath'd folders
+    monkeypatch.setattr(restore, "_path_key", lambda p: ntpath.normcase(ntpath.normpath(p)))
+    lines = ["C:/Users/me/Docs, old\\a,b.txt,C:/Users/me/Docs\\_quarantine_Docs\\ old\\a,b.txt",
+             "C:/Users/me/Docs\\other.txt,D:\\elsewhere\\other.txt"]
+    entries = list(restore._parse_legacy(lines, r"c:\users\me\docs\_quarantine_docs"))
+    assert [(e["src"], e["dst"]) for e in entries] == [
+        (os.path.normpath("C:/Users/me/Docs, old\\a,b.txt"),
+         os.path.normpath("C:/Users/me/Docs\\_quarantine_Docs\\ old\\a,b.txt"))]
+
+    # The same on this platform: an unnormalized quarantine path in the log still matches
+    root = tmp_path / "docs"
+    quarantine = root / "_quarantine_docs"
+    quarantine.mkdir(parents=True)
+    (quarantine / "x.txt").write_text("x")
+    with open(quarantine / "dupe_log.csv", "w", encoding="utf-8") as f:
+        f.write(f"{root}/./x.txt,{root}//_quarantine_docs/./x.txt\n")
+    assert restore_quarantine(str(quarantine))["restored"] == 1 and (root / "x.txt").exists()
+
+
+def test_restore_never_overwrites_a_file_that_appears(tmp_path, monkeypatch):
+    quarantine, moves = quarantine_some(tmp_path, count=2)
+    real_link = os.link
+
+    def racing_link(src, dst, **kwargs):
+        with open(dst, "w") as f:  # something else writes the original path first
+            f.write("new")
+        return real_link(src, dst, **kwargs)
+
+    monkeypatch.setattr(os, "link", racing_link)
+    stats = restore_quarantine(quarantine, workers=1)
+    assert stats["conflict"] == 2
+    for src, dst in moves:
+        assert open(src).read() == "new" and os.path.exists(dst)
+
+
+def test_restore_without_hard_links_copies_exclusively(tmp_path, monkeypatch):
+    quarantine, moves = quarantine_some(tmp_path, count=2)
+
+    def no_link(*args, **kwargs):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", no_link)
+    with open(moves[0][0], "w") as f:
+        f.write("in the way")
+    stats = restore_quarantine(quarantine, conflict="rename")
+    assert stats["restored"] == 2
+    assert open(moves[0][0]).read() == "in the way"
+    renamed = os.path.splitext(moves[0][0])[0] + " (restored).txt"
+    assert open(renamed).read() == "report 0" and not os.path.exists(moves[0][1])
+
+
+def test_folder_that_cannot_be_created_fails_only_its_files(tmp_path):
+    quarantine, moves = quarantine_some(tmp_path)
+    blocked = os.path.dirname(moves[0][0])
+    os.rmdir(blocked)
+    with open(blocked, "w"):
+        pass  # a file where sub_0 was
+    statuses = {}
+    stats = restore_quarantine(quarantine, on_file=lambda src, status, detail: statuses.__setitem__(src, status))
+    assert stats["failed"] == 2 and stats["restored"] == 2
+    assert statuses == {src: "failed" if src.startswith(blocked) else "restored" for src, _ in moves}
+
+
+def test_overwrite_across_devices_replaces_in_one_step(tmp_path, monkeypatch):
+    quarantine, moves = quarantine_some(tmp_path, count=1)
+    src, dst = moves[0]
+    with open(src, "w") as f:
+        f.write("in the way")
+    real_replace = os.replace
+
+    def cross_device(a, b):
+        if a == dst:
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        assert os.path.dirname(a) == os.path.dirname(src)  # the copy lands next to src first
+        return real_replace(a, b)
+
+    monkeypatch.setattr(os, "replace", cross_device)
+    stats = restore_quarantine(quarantine, conflict="overwrite")
+    assert stats["restored"] == 1
+    assert open(src).read() == "report 0" and not os.path.exists(dst)
+    assert os.listdir(os.path.dirname(src)) == [os.path.basename(src)]
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+import os
+from core import cli, snapshot
+from core.scan_result import ScanResult
+
+
+def make_tree(root):
+    (root / "sub").mkdir(parents=True)
+    for name in ["a.txt", "a - Copy.txt", "sub/a (1).txt", "b.txt"]:
+        (root / name).write_bytes(b"12")
+    return str(root)
+
+
+def run(args):
+    out = io.StringIO()
+    parsed = cli.build_parser().parse_args(args)
+    assert parsed.run(parsed, out) == 0
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_scan_result_round_trips_through_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = make_tree(tmp_path / "root")
+    run(["scan", root, "--name-rules", "windows"])
+
+    result = ScanResult.load(root)
+    assert len(result) == 1 and result.name_rules == ["windows"]
+    assert sorted(os.path.basename(p) for p in result.group_paths()[0]) == ["a (1).txt", "a - Copy.txt", "a.txt"]
+    assert ScanResult.load(str(tmp_path)) is None
+
+    # A file changed after the scan is left out; the rest of the group still moves
+    (tmp_path / "root" / "sub" / "a (1).txt").write_bytes(b"changed")
+    stale = []
+    moves = result.plan_moves(str(tmp_path / "q"), on_stale=stale.append)
+    assert stale == [os.path.join(root, "sub", "a (1).txt")]
+    assert moves == [(os.path.join(root, "a - Copy.txt"), str(tmp_path / "q" / "a - Copy.txt"))]
+
+    report = tmp_path / "report.csv"
+    result.write_report(str(report), str(tmp_path / "q"), policy="shortest_path")
+    rows = list(csv.DictReader(report.open(encoding="utf-8")))
+    assert [(r["Action"], os.path.basename(r["Path"])) for r in rows] == [("keep", "a.txt"), ("move", "a - Copy.txt")]
+
+
+def test_move_command_uses_saved_scan(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = make_tree(tmp_path / "root")
+    run(["scan", root])
+
+    planned = run(["move", root, "--dry-run"])
+    assert planned[-1]["planned"] == 2 and len(os.listdir(root)) == 4
+
+    records = run(["move", root, "--keep", "preferred_dir", "--prefer-dir", os.path.join(root, "sub")])
+    assert records[-1]["moved"] == 2
+    assert sorted(os.listdir(root)) == ["_quarantine_root", "b.txt", "sub"]
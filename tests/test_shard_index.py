@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import pytest
+from core import cli
+from core.find_duplicates_hash import PARTIAL_HASH_SIZE, find_duplicates_staged, is_image_file
+from core.shard_index import find_shards, merge_shards, read_meta, shard_folder, shard_name, write_shard
+
+BIG = 3 * PARTIAL_HASH_SIZE
+
+
+def make_archive(root):
+    """Duplicates inside and across subtrees, plus same-size and same-edges decoys."""
+    edges = b"e" * PARTIAL_HASH_SIZE
+    files = {
+        "a/photo.jpg": b"1" * 100, "b/photo copy.jpg": b"1" * 100, "c/deep/x.jpg": b"1" * 100,
+        "a/other.jpg": b"2" * 100,
+        "a/big.bin": edges + b"m" * PARTIAL_HASH_SIZE + edges, "b/big.bin": edges + b"m" * PARTIAL_HASH_SIZE + edges,
+        "c/big_decoy.bin": edges + b"n" * PARTIAL_HASH_SIZE + edges,
+        "a/local1.bin": b"L" * BIG, "a/sub/local2.bin": b"L" * BIG,
+        "top.jpg": b"2" * 100, "empty1": b"", "c/empty2": b"",
+    }
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def as_sets(groups):
+    return sorted(sorted(group) for group in groups)
+
+
+def write_shards(root, out_dir, **kwargs):
+    paths = [str(out_dir / shard_name(root, recursive=False))]
+    write_shard(paths[0], root, recursive=False, **kwargs)
+    for sub in ("a", "b", "c"):
+        paths.append(str(out_dir / shard_name(root / sub)))
+        write_shard(paths[-1], root / sub, **kwargs)
+    return paths
+
+
+@pytest.mark.parametrize("hash_level", ["local", "all", "full"])
+def test_merge_matches_single_process(tmp_path, hash_level):
+    root = tmp_path / "archive"
+    make_archive(root)
+    paths = write_shards(root, tmp_path / "shards", hash_level=hash_level)
+    stats = {}
+    merged = [[p for p, _, _ in g] for g in merge_shards(paths, stats=stats)]
+    assert as_sets(merged) == as_sets(find_duplicates_staged(str(root)))
+    assert stats["groups"] == 5 and stats["unresolved"] == 0
+    if hash_level == "full":
+        assert stats["hashed_at_merge"] == 0  # the merge never had to read a file
+
+
+def test_image_filter_matches_hash_finder(tmp_path):
+    root = tmp_path / "archive"
+    make_archive(root)
+    paths = write_shards(root, tmp_path / "shards", file_filter=is_image_file)
+    merged = [[p for p, _, _ in g] for g in merge_shards(paths)]
+    assert as_sets(merged) == as_sets(find_duplicates_staged(str(root), file_filter=is_image_file))
+
+
+def test_merge_without_file_access(tmp_path):
+    root = tmp_path / "archive"
+    make_archive(root)
+    paths = write_shards(root, tmp_path / "shards", hash_level="local")
+    stats = {}
+    merged = as_sets([p for p, _, _ in g] for g in merge_shards(paths, hash_missing=False, stats=stats))
+    # Only the groups a single shard could prove on its own
+    assert merged == [[str(root / "a" / "local1.bin"), str(root / "a" / "sub" / "local2.bin")]]
+    assert stats["hashed_at_merge"] == 0 and stats["unresolved"] > 0
+
+
+def test_rejects_overlapping_or_mismatched_shards(tmp_path):
+    root = tmp_path / "archive"
+    make_archive(root)
+    whole = str(tmp_path / "whole.shard.sqlite")
+    write_shard(whole, root)
+    part = str(tmp_path / "part.shard.sqlite")
+    write_shard(part, root / "a")
+    with pytest.raises(ValueError, match="overlap"):
+        list(merge_shards([whole, part]))
+    other = str(tmp_path / "other.shard.sqlite")
+    write_shard(other, root / "b", edge_size=1024)
+    with pytest.raises(ValueError, match="edge_size"):
+        list(merge_shards([part, other]))
+
+
+def test_shard_folder_on_processes(tmp_path):
+    root = tmp_path / "archive"
+    make_archive(root)
+    out_dir = tmp_path / "shards"
+    paths = shard_folder(str(root), str(out_dir), jobs=2)
+    assert sorted(paths) == find_shards([str(out_dir)])
+    assert sum(read_meta(p)["files"] for p in paths) == 12
+    assert not [n for n in os.listdir(out_dir) if n.endswith(".tmp")]
+    merged = [[p for p, _, _ in g] for g in merge_shards(paths)]
+    assert as_sets(merged) == as_sets(find_duplicates_staged(str(root)))
+
+
+def test_cli_shard_and_merge(tmp_path):
+    root = tmp_path / "archive"
+    make_archive(root)
+    out_dir = tmp_path / "shards"
+    for sub in ("a", "b"):
+        parsed = cli.build_parser().parse_args(["shard", str(root / sub), "--out-dir", str(out_dir), "--no-cache",
+                                                "--exclude", ""])
+        assert parsed.run(parsed, io.StringIO()) == 0
+    out = io.StringIO()
+    parsed = cli.build_parser().parse_args(["merge", str(out_dir), "--no-cache"])
+    assert parsed.run(parsed, out) == 0
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    groups = as_sets([f["path"] for f in r["files"]] for r in records if r["type"] == "group")
+    assert groups == as_sets([[str(root / "a" / "big.bin"), str(root / "b" / "big.bin")],
+                              [str(root / "a" / "local1.bin"), str(root / "a" / "sub" / "local2.bin")],
+                              [str(root / "a" / "photo.jpg"), str(root / "b" / "photo copy.jpg")]])
+    assert records[-1]["shards"] == 2 and records[-1]["groups"] == 3
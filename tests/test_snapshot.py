@@ -0,0 +1,153 @@
+import os
+import gzip
+from core import snapshot
+from core.snapshot import DELTA_SUFFIX, diff_groups, load_snapshot, save_snapshot, scan_table
+from tests.test_scan_result import run
+
+
+def entries(table):
+    return sorted((e.path, e.size) for e in table)
+
+
+def test_incremental_rescan_matches_full_scan(tmp_path):
+    root = tmp_path / "root"
+    for rel in ("a/x.txt", "a/y.txt", "b/c/z.txt", "d/keep.txt"):
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+    snapshot_path = str(tmp_path / "snap.json.gz")
+
+    table, dir_mtimes, previous, _ = scan_table(str(root), snapshot_path)
+    assert previous is None
+    save_snapshot(snapshot_path, str(root), table, dir_mtimes, [])
+
+    (root / "a" / "y.txt").unlink()
+    (root / "a" / "new.txt").write_text("new")
+    (root / "b" / "c" / "z.txt").unlink()
+    (root / "b" / "c").rmdir()
+    (root / "d" / "e" / "f").mkdir(parents=True)
+    (root / "d" / "e" / "f" / "deep.txt").write_text("deep")
+
+    table, dir_mtimes, previous, stats = scan_table(str(root), snapshot_path, incremental=True)
+    assert stats["incremental"] and previous is not None
+    assert stats["dirs_removed"] == 1 and stats["dirs_added"] == 2
+    assert stats["dirs_relisted"] == 3  # a, b and d; the root itself is unchanged
+
+    full, full_dirs, _, _ = scan_table(str(root))
+    assert entries(table) == entries(full)
+    assert dir_mtimes == full_dirs
+
+
+def make_tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def rows(snap):
+    return sorted((snap["dir_list"][d], *row) for d, *row in snap["files"])
+
+
+def test_incremental_save_appends_a_delta(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    make_tree(root, {f"d{i}/f{j}.txt": b"x" * (i + j) for i in range(10) for j in range(5)})
+    snapshot_path = str(tmp_path / "snap.json.gz")
+    table, dir_mtimes, _, _ = scan_table(str(root), snapshot_path)
+    save_snapshot(snapshot_path, str(root), table, dir_mtimes, [["a", "b"]])
+    with open(snapshot_path, "rb") as f:
+        base_bytes = f.read()
+
+    (root / "d1" / "f0.txt").unlink()
+    make_tree(root, {"d2/new.txt": b"new", "d9/deep.txt": b"deep"})
+    for step in range(2):
+        table, dir_mtimes, previous, stats = scan_table(str(root), snapshot_path, incremental=True)
+        save_snapshot(snapshot_path, str(root), table, dir_mtimes, [["c", "d"]], base=previous)
+    with open(snapshot_path, "rb") as f:
+        assert f.read() == base_bytes  # only the delta file grew
+    with gzip.open(snapshot_path + DELTA_SUFFIX, "rt") as f:
+        assert [len(line) > 0 for line in f] == [True, True]
+
+    full, full_dirs, _, _ = scan_table(str(root))
+    loaded = load_snapshot(snapshot_path)
+    assert loaded["dirs"] == full_dirs and loaded["groups"] == [["c", "d"]] and loaded["deltas"] == 2
+    assert [(os.path.join(d, n), size) for d, n, size, *_ in rows(loaded)] == \
+        sorted((e.path, e.size) for e in full)
+
+    # A torn append is skipped; the deltas before it still apply
+    with open(snapshot_path + DELTA_SUFFIX, "ab") as f:
+        f.write(gzip.compress(b'{"base": 1')[:-8])
+    assert rows(load_snapshot(snapshot_path)) == rows(loaded)
+
+    # Past MAX_DELTAS the snapshot is rewritten in one piece
+    monkeypatch.setattr(snapshot, "MAX_DELTAS", 2)
+    table, dir_mtimes, previous, _ = scan_table(str(root), snapshot_path, incremental=True)
+    save_snapshot(snapshot_path, str(root), table, dir_mtimes, [["e", "f"]], base=previous)
+    assert not os.path.exists(snapshot_path + DELTA_SUFFIX)
+    assert rows(load_snapshot(snapshot_path)) == rows(loaded)
+
+
+def test_append_after_a_torn_delta_is_not_lost(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root, {f"d{i}/f{j}.txt": b"x" * (i + j) for i in range(10) for j in range(5)})
+    snapshot_path = str(tmp_path / "snap.json.gz")
+    table, dir_mtimes, _, _ = scan_table(str(root), snapshot_path)
+    save_snapshot(snapshot_path, str(root), table, dir_mtimes, [])
+    make_tree(root, {"d1/new.txt": b"new"})
+    table, dir_mtimes, previous, _ = scan_table(str(root), snapshot_path, incremental=True)
+    save_snapshot(snapshot_path, str(root), table, dir_mtimes, [["a", "b"]], base=previous)
+    # A crash halfway through the next append
+    with open(snapshot_path + DELTA_SUFFIX, "ab") as f:
+        f.write(gzip.compress(b'{"base": 1')[:-8])
+
+    for step, rel in enumerate(("d2/after_tear.txt", "d3/next.txt")):
+        make_tree(root, {rel: b"later"})
+        table, dir_mtimes, previous, _ = scan_table(str(root), snapshot_path, incremental=True)
+        assert previous.get("delta_torn", False) == (step == 0)
+        save_snapshot(snapshot_path, str(root), table, dir_mtimes, [[rel, "x"]], base=previous)
+        loaded = load_snapshot(snapshot_path)
+        full, _, _, _ = scan_table(str(root))
+        assert [(os.path.join(d, n), size) for d, n, size, *_ in rows(loaded)] == entries(full)
+        assert loaded["groups"] == [[rel, "x"]] and "delta_torn" not in loaded
+    assert loaded["deltas"] == 1  # the torn file was rewritten away, then appends resumed
+
+
+def test_incremental_scan_restats_reported_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    root = tmp_path / "root"
+    make_tree(root, {"a/one.bin": b"1" * 100, "a/two.bin": b"2" * 100, "a/three.bin": b"3" * 100})
+    args = ["scan", str(root), "--match", "size", "--exclude", ""]
+    assert [r["count"] for r in run(args) if r["type"] == "group"] == [3]
+
+    # Rewritten in place: the folder's mtime does not move
+    folder_mtime = os.stat(root / "a").st_mtime_ns
+    (root / "a" / "two.bin").write_bytes(b"2" * 150)
+    os.utime(root / "a", ns=(folder_mtime, folder_mtime))
+    records = run(args + ["--incremental"])
+    assert records[-1]["walk"]["dirs_relisted"] == 0 and records[-1]["walk"]["groups_rechecked"] == 1
+    assert [sorted(f["path"] for f in r["files"]) for r in records if r["type"] == "group"] == \
+        [[str(root / "a" / "one.bin"), str(root / "a" / "three.bin")]]
+
+    # The new size was saved, so the next run agrees without rechecking
+    records = run(args + ["--incremental"])
+    assert [r["count"] for r in records if r["type"] == "group"] == [2]
+    assert records[-1]["walk"]["groups_rechecked"] == 0
+
+
+def test_snapshot_ignored_when_options_differ(tmp_path):
+    (tmp_path / "f.py").write_text("x")
+    snapshot_path = str(tmp_path / "snap.json.gz")
+    table, dir_mtimes, _, _ = scan_table(str(tmp_path), snapshot_path)
+    save_snapshot(snapshot_path, str(tmp_path), table, dir_mtimes, [])
+    _, _, previous, stats = scan_table(str(tmp_path), snapshot_path, incremental=True, exclude_exts=["py"])
+    assert previous is None and not stats["incremental"]
+
+
+def test_diff_groups():
+    old = [["a", "b"], ["c", "d"], ["e", "f"]]
+    new = [["a", "b"], ["c", "d", "g"], ["h", "i"]]
+    assert diff_groups(old, new) == {
+        "added": [["h", "i"]],
+        "removed": [["e", "f"]],
+        "changed": [["c", "d", "g"]],
+    }
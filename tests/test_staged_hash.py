@@ -0,0 +1,39 @@
+import os
+from core.find_duplicates_hash import find_duplicates_staged, get_partial_hash
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_staged_pipeline_matches_full_hash(tmp_path):
+    big = os.urandom(50_000)
+    write(tmp_path / "a" / "big.bin", big)
+    write(tmp_path / "b" / "big - Copy.bin", big)
+    # Same size and same edges, different middle: only the full hash can tell them apart
+    write(tmp_path / "c" / "big_tweaked.bin", big[:20_000] + b"x" + big[20_001:])
+    write(tmp_path / "small1.txt", b"hello")
+    write(tmp_path / "small2.txt", b"hello")
+    write(tmp_path / "small3.txt", b"world")
+    write(tmp_path / "unique.txt", b"only one of these sizes")
+
+    stage_stats = []
+    groups = find_duplicates_staged(str(tmp_path), stage_stats=stage_stats)
+
+    found = sorted(sorted(os.path.basename(p) for p in g) for g in groups)
+    assert found == [["big - Copy.bin", "big.bin"], ["small1.txt", "small2.txt"]]
+
+    size, partial, full = stage_stats
+    assert (size["candidates"], size["removed"]) == (7, 1)
+    assert (partial["candidates"], partial["removed"]) == (6, 1)
+    assert (full["candidates"], full["removed"]) == (5, 1)
+    assert full["bytes_read"] == 3 * 50_000
+
+
+def test_partial_hash_covers_both_ends(tmp_path):
+    data = b"a" * 10_000
+    write(tmp_path / "one", data)
+    write(tmp_path / "two", data[:-1] + b"b")
+    assert get_partial_hash(str(tmp_path / "one")) != get_partial_hash(str(tmp_path / "two"))
@@ -1,9 +1,10 @@
 import os
 import csv
 from datetime import datetime
-from collections import defaultdict
 from core.find_duplicates_hash import find_duplicates_by_hash
 from core.file_utils import get_file_metadata  # only if used
+from core.file_table import FileTable
+from core.grouping import group_rows, iter_groups
 
 # === CONFIG ===
 SOURCE_FOLDER = r"C:\Users\Rick_DellXPS\OneDrive\Pictures"
@@ -15,37 +16,22 @@ def ensure_dir(path):
         os.makedirs(path)
 
 def collect_metadata(folder):
-    metadata = []
-    for root, _, files in os.walk(folder):
-        for file in files:
-            full_path = os.path.join(root, file)
-            try:
-                stat = os.stat(full_path)
-                name, ext = os.path.splitext(file)
-                metadata.append({
-                    "Full Path": full_path,
-                    "File Name": name.lower(),
-                    "Extension": ext.lower(),
-                    "Size": stat.st_size,
-                    "Date Modified": stat.st_mtime,
-                    "Date Created": stat.st_ctime
-                })
-            except Exception as e:
-                print(f"Skipped (no access): {full_path} — {e}")
-    return metadata
+    def skipped(path, e):
+        print(f"Skipped (no access): {path} — {e}")
+
+    return FileTable.from_walk(folder, on_error=skipped)
 
 def find_strict_duplicates(metadata):
-    grouped = defaultdict(list)
-    for entry in metadata:
-        key = (
-            entry["File Name"],
-            entry["Extension"],
-            entry["Size"],
-            # entry["Date Modified"],
-            # entry["Date Created"]
-        )
-        grouped[key].append(entry)
-    return [group for group in grouped.values() if len(group) > 1]
+    """Group a FileTable by (name, extension, size); only duplicate rows are materialized."""
+    criteria = [
+        "name",
+        "ext",
+        "size",
+        # "modified",
+        # "created"
+    ]
+    rows, offsets = group_rows(metadata, criteria, name_key=str.lower)
+    return [[metadata.record(i) for i in group] for group in iter_groups(rows, offsets)]
 
 def dry_run_log(duplicates):
     ensure_dir(LOG_FOLDER)
@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core import walker
+from core.walker import walk_files
+
+
+def make_tree(root):
+    for rel in ("a/one.txt", "a/b/two.jpg", "a/b/c/three.py", "_quarantine_x/moved.txt",
+                "node_modules/pkg.js", "four.PY"):
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(rel)
+
+
+def names(entries):
+    return sorted(e.name for e in entries)
+
+
+def test_walk_prunes_and_excludes(tmp_path):
+    make_tree(tmp_path)
+    entries = list(walk_files(str(tmp_path), exclude_exts=["py"], exclude_dirs=["node_*"]))
+    assert names(entries) == ["one.txt", "two.jpg"]
+    one = next(e for e in entries if e.name == "one.txt")
+    assert one.size == os.path.getsize(one.path) == len("a/one.txt")
+
+    everything = walk_files(str(tmp_path), skip_quarantine=False, workers=1)
+    assert len(list(everything)) == 6
+
+
+def test_parallel_matches_serial(tmp_path):
+    make_tree(tmp_path)
+    assert names(walk_files(str(tmp_path), workers=4)) == names(walk_files(str(tmp_path), workers=1))
+
+
+def test_symlink_policy(tmp_path):
+    make_tree(tmp_path)
+    os.symlink(tmp_path / "a", tmp_path / "link_to_a")
+    os.symlink(tmp_path, tmp_path / "a" / "loop")
+    assert names(walk_files(str(tmp_path))) == ["four.PY", "one.txt", "pkg.js", "three.py", "two.jpg"]
+    # Followed links are walked, but each real directory only once
+    followed = names(walk_files(str(tmp_path), follow_symlinks=True))
+    assert followed == ["four.PY", "one.txt", "pkg.js", "three.py", "two.jpg"]
+
+
+def test_errors_are_reported(tmp_path):
+    errors = []
+    assert list(walk_files(str(tmp_path / "missing"), on_error=lambda p, e: errors.append(p))) == []
+    assert errors == [str(tmp_path / "missing")]
+
+
+def test_stopping_early_cancels_queued_listings(tmp_path, monkeypatch):
+    for i in range(40):
+        (tmp_path / str(i) / "sub").mkdir(parents=True)
+        (tmp_path / str(i) / "f.txt").write_text("x")  # the first of these comes with listings still queued
+    submitted = []
+    real_submit = ThreadPoolExecutor.submit
+
+    def submit(self, *args):
+        submitted.append(real_submit(self, *args))
+        return submitted[-1]
+
+    # Only the root and one subfolder list right away; the rest wait until the walk is closed
+    gate, first = threading.Event(), threading.Lock()
+    real_list_dir = walker.list_dir
+
+    def list_dir(folder, *args):
+        if folder != str(tmp_path) and not first.acquire(blocking=False):
+            gate.wait(5)
+        return real_list_dir(folder, *args)
+
+    monkeypatch.setattr(ThreadPoolExecutor, "submit", submit)
+    monkeypatch.setattr(walker, "list_dir", list_dir)
+    walk = walk_files(str(tmp_path), workers=2)
+    next(walk)
+    walk.close()
+    gate.set()
+    assert all(f.done() for f in submitted if not f.running())
+    assert any(f.cancelled() for f in submitted)
+    assert len(submitted) <= 2 * walker.PENDING_PER_WORKER + 1  # listings are submitted as the walk goes